@@ -25,7 +25,6 @@ import traceback
 from functools import partial
 from copy import deepcopy
 
-import openpyxl
 import cv2
 import numpy as np
 
@@ -43,10 +42,8 @@ from PyQt5.QtGui import (
     QImage,
     QCursor,
     QPixmap,
-    QImageReader,
     QColor,
     QIcon,
-    QFont,
     QFontDatabase,  # QFontDatabase 应该在 QtGui 中导入
 )
 from PyQt5.QtWidgets import (
@@ -74,11 +71,11 @@ from PyQt5.QtWidgets import (
     QMenu,
     QAction,
     QPushButton,
+    QProgressDialog,
 )
 __dir__ = os.path.dirname(__file__)
 sys.path.append(os.path.join(__dir__, ""))
 
-from paddleocr import PaddleOCR, PPStructure
 import libs.resources
 from libs.constants import (
     SETTING_ADVANCE_MODE,
@@ -96,15 +93,14 @@ from libs.constants import (
     SETTING_WIN_STATE,
 )
 from libs.utils import (
+    DEFAULT_REC_BATCH_NUM,
     addActions,
+    batch_recognize,
     boxPad,
-    convert_token,
-    expand_list,
     fmtShortcut,
     get_rotate_crop_image,
     have_qstring,
     keysInfo,
-    natural_sort,
     newAction,
     newIcon,
     rebuild_html_from_ppstructure_label,
@@ -120,6 +116,8 @@ from libs.stringBundle import StringBundle
 from libs.canvas import Canvas
 from libs.zoomWidget import ZoomWidget
 from libs.autoDialog import AutoDialog
+from libs.autoPipeline import AutoLabelPipeline
+from libs.autoSaver import AutoSaveScheduler
 from libs.labelDialog import LabelDialog
 from libs.colorDialog import ColorDialog
 from libs.ustr import ustr
@@ -127,10 +125,47 @@ from libs.hashableQListWidgetItem import HashableQListWidgetItem
 from libs.editinlist import EditInList
 from libs.unique_label_qlist_widget import UniqueLabelQListWidget
 from libs.keyDialog import KeyDialog
+from libs.labelFont import labelFont
+from libs.atomicFile import atomicWrite, isKeyValueLine, recoverFile
+from libs.fileListModel import FileListModel
+from libs.imageList import ImageList
+from libs.imageScanner import forgetImage, scanImages
+from libs.labelIndex import (
+    LABEL_FILE_NAME,
+    LABEL_LOG_SUFFIX,
+    LabelIndex,
+    isLabelFileLine,
+    isLogLine,
+)
+from libs.imageCache import DEFAULT_CACHE_MB, ImageCache
+from libs.recExporter import REC_GT_NAME, RecExporter
+from libs.sqliteStore import CACHE, LABEL, STORE_FILE_NAME, AnnotationStore
+from libs.tableExporter import TABLE_EXCEL_DIR_NAME, TableTokenReader
+from libs.thumbnailCache import THUMBNAIL_SIZE, ThumbnailCache
+from libs.tiledImage import TiledImage
+from libs.modelLoader import ModelLoader, build_ocr, build_table_ocr
 
 __appname__ = "PPOCRLabel"
 
 LABEL_COLORMAP = label_colormap()
+# run through both models once after they are built
+WARMUP_IMAGE = "./data/paddle.png"
+
+
+def default_ocr_params(gpu=True, rec_batch_num=DEFAULT_REC_BATCH_NUM):
+    """PaddleOCR arguments of the default recognition model."""
+    return dict(
+        det=True,
+        cls=False,
+        use_angle_cls=True,
+        use_gpu=gpu,
+        lang="ar",  # 设置为阿拉伯语
+        rec_algorithm="SVTR_LCNet",
+        rec_image_shape="3, 48, 320",
+        rec_batch_num=rec_batch_num,
+        det_limit_side_len=2880,
+        det_limit_type="max",
+    )
 
 
 class MainWindow(QMainWindow):
@@ -152,6 +187,12 @@ class MainWindow(QMainWindow):
         cls_model_dir=None,
         label_font_path=None,
         selected_shape_color=(255, 255, 0),
+        label_log_mode=False,
+        prefetch_num=2,
+        image_cache_mb=DEFAULT_CACHE_MB,
+        rec_batch_num=DEFAULT_REC_BATCH_NUM,
+        show_fps=False,
+        sqlite_store=False,
     ):
         super(MainWindow, self).__init__()
         self.setWindowTitle(__appname__)
@@ -203,30 +244,20 @@ class MainWindow(QMainWindow):
         if cls_model_dir is not None:
             params["cls_model_dir"] = cls_model_dir
 
-        self.ocr = PaddleOCR(
-            det=True,
-            cls=False, 
-            use_angle_cls=True,
-            use_gpu=gpu,
-            lang='ar',  # 设置为阿拉伯语
-            rec_algorithm='SVTR_LCNet',
-            rec_image_shape='3, 48, 320',
-            rec_batch_num=1,
-            det_limit_side_len=2880,
-            det_limit_type='max'
-        )
-        self.table_ocr = PPStructure(
+        self.ocrParams = default_ocr_params(gpu, rec_batch_num)
+        self.tableOcrParams = dict(
             use_pdserving=False, use_gpu=gpu, lang=lang, layout=False, show_log=False
         )
-
-        if os.path.exists("./data/paddle.png"):
-            result = self.ocr.ocr("./data/paddle.png", cls=True, det=True)
-            result = self.table_ocr(
-                "./data/paddle.png", return_ocr_result_in_table=True
-            )
+        # the models are built and warmed up in the background, self.ocr and
+        # self.table_ocr only block when a recognition is requested before that
+        self.models = ModelLoader()
+        self.models.submit("ocr", build_ocr, self.ocrParams, WARMUP_IMAGE)
+        self.models.submit(
+            "table_ocr", build_table_ocr, self.tableOcrParams, WARMUP_IMAGE
+        )
 
         # For loading all image under a directory
-        self.mImgList = []
+        self.mImgList = ImageList()
         self.mImgList5 = []
         self.dirname = None
         self.labelHist = []
@@ -236,6 +267,21 @@ class MainWindow(QMainWindow):
         self.changeFileFolder = False
         self.haveAutoReced = False
         self.labelFile = None
+        self.labelIndex = None  # in-memory index of Label.txt in the opened dir
+        self.labelLogMode = label_log_mode  # append saves to Label.txt.log
+        # annotations.db of the opened dir, replaces the periodic text file rewrites
+        self.useSqliteStore = sqlite_store
+        self.annotationStore = None
+        # decoded images around the current one, filled by a background pool
+        self.imageCache = ImageCache(maxBytes=image_cache_mb * 1024 * 1024)
+        self.prefetchNum = prefetch_num
+        # icon strip thumbnails, persisted per folder and made in the background
+        self.thumbnailCache = ThumbnailCache()
+        self.thumbnailCache.thumbnailReady.connect(self.setThumbnail)
+        self.thumbnailItems = {}  # image path -> icon strip item
+        # annotation files are written by a worker thread, repeated saves are merged
+        self.autoSaver = AutoSaveScheduler()
+        self.recBatchNum = rec_batch_num  # text crops per recognition call
         self.currIndex = 0
 
         # Whether we need to save or not.
@@ -268,10 +314,14 @@ class MainWindow(QMainWindow):
         filelistLayout = QVBoxLayout()
         filelistLayout.setContentsMargins(0, 0, 0, 0)
 
-        self.fileListWidget = QListWidget()
-        self.fileListWidget.itemClicked.connect(self.fileitemDoubleClicked)
-        self.fileListWidget.setIconSize(QSize(25, 25))
-        filelistLayout.addWidget(self.fileListWidget)
+        self.fileListModel = FileListModel(self.validFilestate, self)
+        self.fileListView = QListView()
+        self.fileListView.setModel(self.fileListModel)
+        self.fileListView.setUniformItemSizes(True)
+        self.fileListView.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.fileListView.clicked.connect(self.fileitemDoubleClicked)
+        self.fileListView.setIconSize(QSize(25, 25))
+        filelistLayout.addWidget(self.fileListView)
 
         fileListContainer = QWidget()
         fileListContainer.setLayout(filelistLayout)
@@ -816,6 +866,15 @@ class MainWindow(QMainWindow):
             enabled=False,
         )
 
+        redo = action(
+            "Redo",
+            self.redoShapeEdit,
+            "Ctrl+Y",
+            "undo",
+            "Redo the last undone edit",
+            enabled=False,
+        )
+
         undoLastPoint = action(
             getStr("undoLastPoint"),
             self.canvas.undoLastPoint,
@@ -968,6 +1027,7 @@ class MainWindow(QMainWindow):
             saveLabel=saveLabel,
             change_cls=change_cls,
             undo=undo,
+            redo=redo,
             undoLastPoint=undoLastPoint,
             open_dataset_dir=open_dataset_dir,
             rotateLeft=rotateLeft,
@@ -994,6 +1054,7 @@ class MainWindow(QMainWindow):
                 cellreRec,
                 None,
                 undo,
+                redo,
                 undoLastPoint,
                 None,
                 rotateLeft,
@@ -1215,6 +1276,16 @@ class MainWindow(QMainWindow):
         # Display cursor coordinates at the right of status bar
         self.labelCoordinates = QLabel("")
         self.statusBar().addPermanentWidget(self.labelCoordinates)
+        self.labelAutoSave = QLabel("")
+        self.statusBar().addPermanentWidget(self.labelAutoSave)
+        self.autoSaver.metricsChanged.connect(self.showAutoSaveMetrics)
+        if show_fps:
+            self.labelFps = QLabel("")
+            self.statusBar().addPermanentWidget(self.labelFps)
+            self.canvas.showFps = True
+            self.canvas.fpsChanged.connect(
+                lambda fps, ms: self.labelFps.setText("FPS: %.1f (%.1f ms)" % (fps, ms))
+            )
 
         # Open Dir if deafult file
         if self.filePath and os.path.isdir(self.filePath):
@@ -1515,6 +1586,7 @@ class MainWindow(QMainWindow):
         if box != [(int(p.x()), int(p.y())) for p in shape.points]:
             # shape.points = box
             shape.points = [QPointF(p[0], p[1]) for p in box]
+            self.canvas.shapeIndex.update(shape)
 
             # QPointF(x,y)
             # shape.line_color = generateColorByText(shape.label)
@@ -1587,11 +1659,9 @@ class MainWindow(QMainWindow):
             return self.mImgList[currIndex - 2 : currIndex + 3]
 
     # Tzutalin 20160906 : Add file list and dock to move faster
-    def fileitemDoubleClicked(self, item=None):
-        self.currIndex = self.mImgList.index(
-            ustr(os.path.join(os.path.abspath(self.dirname), item.text()))
-        )
-        filename = self.mImgList[self.currIndex]
+    def fileitemDoubleClicked(self, index=None):
+        self.currIndex = index.row()
+        filename = self.fileListModel.path(self.currIndex)
         if filename:
             self.mImgList5 = self.indexTo5Files(self.currIndex)
             # self.additems5(None)
@@ -1647,52 +1717,48 @@ class MainWindow(QMainWindow):
         """
         添加标签到列表
         """
-        shape.paintLabel = self.displayLabelOption.isChecked()
-        shape.paintIdx = self.displayIndexOption.isChecked()
-        
-        # 创建标签项，特殊处理空文本框
-        display_label = "[空文本框]" if shape.label == "[Empty]" else shape.label
-        item = HashableQListWidgetItem(display_label)
-        
-        # 设置字体
-        font = QFont()
-        # 尝试使用支持叙利亚文的字体
-        font_families = [
-            "Estrangelo Edessa",
-            "Noto Sans Syriac",
-            "East Syriac Adiabene",
-            "Serto Jerusalem",
-            "Microsoft Sans Serif",
-            "Arial Unicode MS",
-            "Arial"
-        ]
-        
-        # 修正字体检查方法
-        db = QFontDatabase()
-        available_families = db.families()
-        for family in font_families:
-            if family in available_families:
-                font.setFamily(family)
-                break
-        
-        font.setPointSize(12)
-        item.setFont(font)
-        
-        # 设置文本方向为从右到左
-        item.setTextAlignment(Qt.AlignRight)
-        
-        # 其他设置保持不变
-        self.labelList.addItem(item)
-        self.shapesToItems[shape] = item
-        self.itemsToShapes[item] = shape
-        
-        # 为框列表创建项
-        item = HashableQListWidgetItem(str([(int(p.x()), int(p.y())) for p in shape.points]))
-        item.setFont(font)  # 使用相同的字体
-        self.BoxList.addItem(item)
-        self.itemsToShapesbox[item] = shape
-        self.shapesToItemsbox[shape] = item
-        
+        self.addLabels([shape])
+
+    def addLabels(self, shapes):
+        """
+        批量添加标签到列表, 所有列表项一次创建完成, 期间屏蔽列表的信号和重绘
+        """
+        paintLabel = self.displayLabelOption.isChecked()
+        paintIdx = self.displayIndexOption.isChecked()
+        # 设置字体, 使用支持叙利亚文的字体
+        font = labelFont(12)
+        lists = (self.labelList, self.BoxList)
+        for widget in lists:
+            widget.setUpdatesEnabled(False)
+            widget.blockSignals(True)
+        try:
+            for shape in shapes:
+                shape.paintLabel = paintLabel
+                shape.paintIdx = paintIdx
+
+                # 创建标签项，特殊处理空文本框
+                display_label = "[空文本框]" if shape.label == "[Empty]" else shape.label
+                item = HashableQListWidgetItem(display_label)
+                item.setFont(font)
+                # 设置文本方向为从右到左
+                item.setTextAlignment(Qt.AlignRight)
+                self.labelList.addItem(item)
+                self.shapesToItems[shape] = item
+                self.itemsToShapes[item] = shape
+
+                # 为框列表创建项
+                item = HashableQListWidgetItem(
+                    str([(int(p.x()), int(p.y())) for p in shape.points])
+                )
+                item.setFont(font)  # 使用相同的字体
+                self.BoxList.addItem(item)
+                self.itemsToShapesbox[item] = shape
+                self.shapesToItemsbox[shape] = item
+        finally:
+            for widget in lists:
+                widget.blockSignals(False)
+                widget.setUpdatesEnabled(True)
+
         # 更新显示计数
         self.BoxListDock.setWindowTitle(
             self.BoxListDockName + f" ({self.BoxList.count()})"
@@ -1779,11 +1845,18 @@ class MainWindow(QMainWindow):
         # self.comboBox.update_items(uniqueTextList)
 
     def updateIndexList(self):
-        self.indexList.clear()
-        for i in range(self.labelList.count()):
+        # the rows are just 0..n-1, only add or drop the difference
+        count = self.labelList.count()
+        self.indexList.setUpdatesEnabled(False)
+        self.indexList.blockSignals(True)
+        while self.indexList.count() > count:
+            self.indexList.takeItem(self.indexList.count() - 1)
+        for i in range(self.indexList.count(), count):
             string = QListWidgetItem(str(i))
             string.setTextAlignment(Qt.AlignHCenter)
             self.indexList.addItem(string)
+        self.indexList.blockSignals(False)
+        self.indexList.setUpdatesEnabled(True)
 
     def saveLabels(self, annotationFilePath, mode="Auto"):
         # Mode is Auto means that labels will be loaded from self.result_dic totally, which is the output of ocr model
@@ -1834,6 +1907,9 @@ class MainWindow(QMainWindow):
             self.PPlabel[annotationFilePath] = trans_dic
             if mode == "Auto":
                 self.Cachelabel[annotationFilePath] = trans_dic
+            if self.annotationStore is not None:
+                kinds = (LABEL, CACHE) if mode == "Auto" else (LABEL,)
+                self.annotationStore.saveShapes(annotationFilePath, trans_dic, kinds)
 
             # else:
             #     self.labelFile.save(annotationFilePath, shapes, self.filePath, self.imageData,
@@ -1845,8 +1921,7 @@ class MainWindow(QMainWindow):
             return False
 
     def copySelectedShape(self):
-        for shape in self.canvas.copySelectedShape():
-            self.addLabel(shape)
+        self.addLabels(self.canvas.copySelectedShape())
         # fix copy and delete
         # self.shapeSelectionChanged(True)
 
@@ -2107,10 +2182,8 @@ class MainWindow(QMainWindow):
         # 加载图片
         if unicodeFilePath and os.path.exists(unicodeFilePath):
             self.canvas.verified = False
-            cvimg = cv2.imdecode(np.fromfile(unicodeFilePath, dtype=np.uint8), 1)
-            height, width, depth = cvimg.shape
-            cvimg = cv2.cvtColor(cvimg, cv2.COLOR_BGR2RGB)
-            image = QImage(cvimg.data, width, height, width * depth, QImage.Format_RGB888)
+            # image is a view over imageData, keep both for the current file
+            image, imageData = self.imageCache.load(unicodeFilePath)
 
             if image.isNull():
                 self.errorMessage(
@@ -2122,82 +2195,33 @@ class MainWindow(QMainWindow):
             
             self.status("Loaded %s" % os.path.basename(unicodeFilePath))
             self.image = image
+            self.imageData = imageData
             self.filePath = unicodeFilePath
-            self.canvas.loadPixmap(QPixmap.fromImage(image))
+            if TiledImage.wants(image):
+                # no full size QPixmap, the canvas draws tiles of the buffer
+                self.canvas.loadPixmap(TiledImage(imageData, image.format()))
+            else:
+                self.canvas.loadPixmap(QPixmap.fromImage(image))
 
             # 加载缓存的标注数据
-            label_file = os.path.join(os.path.dirname(filename), "Label.txt")
-            if os.path.exists(label_file):
-                try:
-                    with open(label_file, 'r', encoding='utf8') as f:
-                        lines = f.readlines()
-                        current_file_labels = []
-                        reading_current_file = False
-                        
-                        for line in lines:
-                            line = line.strip()
-                            if not line:  # 跳过空行
-                                continue
-                            
-                            if line.startswith("# "):
-                                reading_current_file = line[2:].strip() == filename.strip()
-                            elif line and reading_current_file:
-                                try:
-                                    # 尝试不同的分隔符
-                                    if '\t' in line:
-                                        parts = line.split('\t')
-                                    else:
-                                        parts = line.split(',')
-                                        
-                                    # 清理每个部分的空白
-                                    parts = [p.strip() for p in parts]
-                                    
-                                    # 检查是否有足够的部分
-                                    if len(parts) >= 5:
-                                        x1, y1, x2, y2 = map(float, parts[:4])
-                                        label = parts[4]
-                                        
-                                        # 创建矩形框
-                                        shape = Shape(label=label)
-                                        shape.addPoint(QPointF(x1, y1))
-                                        shape.addPoint(QPointF(x2, y1))
-                                        shape.addPoint(QPointF(x2, y2))
-                                        shape.addPoint(QPointF(x1, y2))
-                                        shape.close()
-                                        
-                                        # 设置形状属性
-                                        shape.difficult = False
-                                        shape.paintLabel = self.displayLabelOption.isChecked()
-                                        shape.line_color = QColor("#00FF00")
-                                        shape.fill_color = QColor(0, 255, 0, 128)
-                                        shape.selected = False
-                                        shape.key_cls = "None"  # 添加 key_cls 属性
-                                        
-                                        # 为 loadLabels 准备数据
-                                        shape_tuple = (
-                                            shape.label,
-                                            [[p.x(), p.y()] for p in shape.points],  # 转换 QPointF 为坐标列表
-                                            shape.line_color.getRgb()[:3],  # 只取 RGB 值
-                                            shape.key_cls,
-                                            shape.difficult
-                                        )
-                                        current_file_labels.append(shape_tuple)
-                                    else:
-                                        print(f"Warning: Invalid line format (not enough values): {line}")
-                                except (ValueError, IndexError) as e:
-                                    print(f"Warning: Error parsing line: {line}")
-                                    print(f"Error details: {str(e)}")
-                                    continue
-                            
-                        # 添加所有形状到画布
-                        if current_file_labels:
-                            self.loadLabels(current_file_labels)
-                            print(f"Successfully loaded {len(current_file_labels)} labels for {filename}")
-                except Exception as e:
-                    print(f"Error loading labels from cache: {str(e)}")
-                    print(f"File: {label_file}")
-                    import traceback
-                    traceback.print_exc()
+            labelIndex = self.getLabelIndex(filename)
+            current_file_labels = []
+            for x1, y1, x2, y2, label in labelIndex.boxes(filename):
+                current_file_labels.append(
+                    (
+                        label,
+                        [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+                        (0, 255, 0),
+                        "None",
+                        False,
+                    )
+                )
+            # 添加所有形状到画布
+            if current_file_labels:
+                self.loadLabels(current_file_labels)
+                print(
+                    f"Successfully loaded {len(current_file_labels)} labels for {filename}"
+                )
 
             if self.validFilestate(filename):
                 self.setClean()
@@ -2220,9 +2244,23 @@ class MainWindow(QMainWindow):
                 self.labelList.item(self.labelList.count() - 1).setSelected(True)
 
             self.canvas.setFocus(True)
+            self.prefetchImages(unicodeFilePath)
             return True
         return False
 
+    def prefetchImages(self, filename):
+        """Decode the next and previous images in the background."""
+        if self.prefetchNum <= 0 or filename not in self.mImgList:
+            return
+        currIndex = self.mImgList.index(filename)
+        paths = []
+        for offset in range(1, self.prefetchNum + 1):
+            # the next image is the most likely one, queue it first
+            for index in (currIndex + offset, currIndex - offset):
+                if 0 <= index < len(self.mImgList):
+                    paths.append(self.mImgList[index])
+        self.imageCache.prefetch(paths)
+
     def showBoundingBoxFromPPlabel(self, filename):
         width, height = self.image.width(), self.image.height()
         imgidx = self.getImglabelidx(filename)
@@ -2347,6 +2385,15 @@ class MainWindow(QMainWindow):
                 self.saveLabelFile()
             except Exception:
                 pass
+            # write everything still queued before the files are closed
+            self.autoSaver.close()
+            if self.labelIndex is not None:
+                self.labelIndex.close()
+            if self.annotationStore is not None:
+                self.annotationStore.close()
+            self.imageCache.shutdown()
+            self.thumbnailCache.close()
+            self.models.shutdown()
 
     def loadRecent(self, filename):
         if self.mayContinue():
@@ -2354,22 +2401,7 @@ class MainWindow(QMainWindow):
             self.loadFile(filename)
 
     def scanAllImages(self, folderPath):
-        extensions = [
-            ".%s" % fmt.data().decode("ascii").lower()
-            for fmt in QImageReader.supportedImageFormats()
-        ]
-        images = []
-
-        for file in os.listdir(folderPath):
-            if file.lower().endswith(tuple(extensions)):
-                relativePath = os.path.join(folderPath, file)
-                path = ustr(os.path.abspath(relativePath))
-                images.append(path)
-        if self.img_list_natural_sort:
-            natural_sort(images, key=lambda x: x.lower())
-        else:
-            images.sort()
-        return images
+        return scan_all_images(folderPath, self.img_list_natural_sort)
 
     def openDirDialog(self, _value=False, dirpath=None, silent=False):
         if not self.mayContinue():
@@ -2456,6 +2488,15 @@ class MainWindow(QMainWindow):
             self.saveLabelFile()
 
         if not isDelete:
+            # the files are read back below
+            self.autoSaver.flush()
+            # repair annotation files left truncated by a crash during a save
+            recoverFile(os.path.join(dirpath, "fileState.txt"), isKeyValueLine)
+            recoverFile(os.path.join(dirpath, CACHE_FILE_NAME), isKeyValueLine)
+            recoverFile(os.path.join(dirpath, LABEL_FILE_NAME), isLabelFileLine)
+            recoverFile(
+                os.path.join(dirpath, LABEL_FILE_NAME + LABEL_LOG_SUFFIX), isLogLine
+            )
             self.loadFilestate(dirpath)
             self.PPlabelpath = dirpath + "/Label.txt"
             self.PPlabel = self.loadLabelFile(self.PPlabelpath)
@@ -2464,8 +2505,12 @@ class MainWindow(QMainWindow):
             if self.Cachelabel:
                 self.PPlabel = dict(self.Cachelabel, **self.PPlabel)
 
+            if self.useSqliteStore:
+                self.openAnnotationStore(dirpath)
+
             self.init_key_list(self.PPlabel)
 
+        self.openLabelIndex(os.path.join(dirpath, LABEL_FILE_NAME))
         self.lastOpenDir = dirpath
         self.dirname = dirpath
 
@@ -2481,19 +2526,10 @@ class MainWindow(QMainWindow):
             imgListCurrIndex = self.mImgList.index(self.filePath)
 
         self.filePath = None
-        self.fileListWidget.clear()
-        self.mImgList = self.scanAllImages(dirpath)
+        self.mImgList = ImageList(self.scanAllImages(dirpath))
+        self.fileListModel.setImages(self.mImgList)
         self.mImgList5 = self.mImgList[:5]
         self.openNextImg(imgListCurrIndex=imgListCurrIndex)
-        doneicon = newIcon("done")
-        closeicon = newIcon("close")
-        for imgPath in self.mImgList:
-            filename = os.path.basename(imgPath)
-            if self.validFilestate(imgPath) is True:
-                item = QListWidgetItem(doneicon, filename)
-            else:
-                item = QListWidgetItem(closeicon, filename)
-            self.fileListWidget.addItem(item)
 
         print("DirPath in importDirImages is", dirpath)
         self.iconlist.clear()
@@ -2513,15 +2549,15 @@ class MainWindow(QMainWindow):
         fileListWidgetCurrentRow = 0
         if imgListCurrIndex is not None:
             fileListWidgetCurrentRow = imgListCurrIndex
-            if fileListWidgetCurrentRow >= self.fileListWidget.count():
+            if fileListWidgetCurrentRow >= len(self.mImgList):
                 fileListWidgetCurrentRow = fileListWidgetCurrentRow - 1
 
-        self.fileListWidget.setCurrentRow(
-            fileListWidgetCurrentRow
-        )  # set list index to first
+        self.setFileListRow(fileListWidgetCurrentRow)  # set list index to first
+
+    def setFileListRow(self, row):
+        self.fileListView.setCurrentIndex(self.fileListModel.index(row))
         self.fileDock.setWindowTitle(
-            self.fileListName
-            + f" ({fileListWidgetCurrentRow+1}/{self.fileListWidget.count()})"
+            self.fileListName + f" ({row+1}/{len(self.mImgList)})"
         )  # show image count
 
     def openPrevImg(self, _value=False):
@@ -2596,27 +2632,11 @@ class MainWindow(QMainWindow):
             }
             shapes.append(shape_info)
 
-        # 读取已有的JSON文件(如果存在)
+        # 在后台线程保存到JSON文件, 写入失败会显示在状态栏
         json_file = os.path.splitext(self.filePath)[0] + '.json'
-        try:
-            if os.path.exists(json_file):
-                with open(json_file, 'r', encoding='utf8') as f:
-                    json_data = json.load(f)
-            else:
-                json_data = {}
-        except:
-            json_data = {}
-
-        # 更新当前图片的标注信息
-        json_data[self.filePath] = shapes
-
-        # 保存到JSON文件
-        try:
-            with open(json_file, 'w', encoding='utf8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.errorMessage('Error saving label data', str(e))
-            return False
+        self.autoSaver.schedule(
+            ("json", json_file), write_image_json, json_file, self.filePath, shapes
+        )
 
         # 同时保存到 Label.txt 作为缓存
         self.saveLabelFile()
@@ -2666,15 +2686,13 @@ class MainWindow(QMainWindow):
                 self.statusBar().showMessage("Saved to  %s" % annotationFilePath)
                 self.statusBar().show()
                 currIndex = self.mImgList.index(self.filePath)
-                item = self.fileListWidget.item(currIndex)
-                item.setIcon(newIcon("done"))
-
                 self.fileStatedict[self.getImglabelidx(self.filePath)] = 1
-                if len(self.fileStatedict) % self.autoSaveNum == 0:
-                    self.saveFilestate()
-                    self.savePPlabel(mode="Auto")
+                self.fileListModel.refreshRow(currIndex)
+                if self.annotationStore is not None:
+                    self.annotationStore.setState(self.getImglabelidx(self.filePath))
+                elif len(self.fileStatedict) % self.autoSaveNum == 0:
+                    self.scheduleStateSave()
 
-                self.fileListWidget.insertItem(int(currIndex), item)
                 if not self.canvas.isInTheSameImage:
                     self.openNextImg()
                 self.actions.saveRec.setEnabled(True)
@@ -2730,13 +2748,54 @@ class MainWindow(QMainWindow):
                     print(cmd)
                     subprocess.call(cmd, stdout=open(os.devnull, "w"))
 
+                if os.path.exists(deletePath):
+                    # e.g. the trash command is missing, keep the image and its labels
+                    self.errorMessage(
+                        "Error deleting image", "Can not delete %s" % deletePath
+                    )
+                    return
+
                 if self.filePath in self.fileStatedict.keys():
                     self.fileStatedict.pop(self.filePath)
                 imgidx = self.getImglabelidx(self.filePath)
                 if imgidx in self.PPlabel.keys():
                     self.PPlabel.pop(imgidx)
+                if self.annotationStore is not None:
+                    self.annotationStore.removeImage(imgidx)
 
-                self.importDirImages(self.lastOpenDir, isDelete=True)
+                self.removeImageFromList(deletePath)
+
+    def removeImageFromList(self, path):
+        """
+        从列表中移除已删除的图片并打开下一张, 不重新导入整个目录
+        """
+        forgetImage(path)
+        self.imageCache.forget(path)
+        self.thumbnailCache.forget(path)
+        labelIndex = self.getLabelIndex(path)
+        if path in labelIndex:
+            labelIndex.remove(path, persist=False)
+            self.autoSaver.schedule(
+                ("label", labelIndex.labelPath), labelIndex.persist
+            )
+        if path not in self.mImgList:
+            return
+        index = self.mImgList.index(path)
+        self.fileListModel.takeRow(index)
+
+        self.filePath = None
+        if not self.mImgList:
+            self.resetState()
+            self.canvas.setEnabled(False)
+            self.iconlist.clear()
+            self.fileDock.setWindowTitle(self.fileListName + " (0/0)")
+            return
+        index = min(index, len(self.mImgList) - 1)
+        self.mImgList5 = self.indexTo5Files(index)
+        self.iconlist.clear()
+        self.additems5(None)
+        self.loadFile(self.mImgList[index])
+        self.setFileListRow(index)
 
     def deleteImgDialog(self):
         yes, cancel = QMessageBox.Yes, QMessageBox.Cancel
@@ -2839,7 +2898,6 @@ class MainWindow(QMainWindow):
                         
         except Exception as e:
             print(f"Warning: Failed to delete shape - {str(e)}")
-            import traceback
             traceback.print_exc()
 
     def chshapeLineColor(self):
@@ -2898,23 +2956,39 @@ class MainWindow(QMainWindow):
     def toogleDrawSquare(self):
         self.canvas.setDrawingShapeToSquare(self.drawSquaresOption.isChecked())
 
+    def thumbnailPlaceholder(self):
+        pix = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        pix.fill(QColor(232, 232, 232))
+        return QIcon(pix)
+
+    def requestThumbnails(self, dirpath, files):
+        """Show the cached thumbnails of files, the others arrive through setThumbnail."""
+        if dirpath:
+            self.thumbnailCache.open(dirpath)
+        for file, image in self.thumbnailCache.request(files).items():
+            self.setThumbnail(file, image)
+
+    def setThumbnail(self, file, image):
+        item = self.thumbnailItems.get(file)
+        if item is not None:
+            item.setIcon(QIcon(QPixmap.fromImage(image)))
+
     def additems(self, dirpath):
+        self.thumbnailItems = {}
+        placeholder = self.thumbnailPlaceholder()
         for file in self.mImgList:
-            pix = QPixmap(file)
             _, filename = os.path.split(file)
             filename, _ = os.path.splitext(filename)
-            item = QListWidgetItem(
-                QIcon(
-                    pix.scaled(100, 100, Qt.IgnoreAspectRatio, Qt.FastTransformation)
-                ),
-                filename[:10],
-            )
+            item = QListWidgetItem(placeholder, filename[:10])
             item.setToolTip(file)
             self.iconlist.addItem(item)
+            self.thumbnailItems[file] = item
+        self.requestThumbnails(dirpath, self.mImgList)
 
     def additems5(self, dirpath):
+        self.thumbnailItems = {}
+        placeholder = self.thumbnailPlaceholder()
         for file in self.mImgList5:
-            pix = QPixmap(file)
             _, filename = os.path.split(file)
             filename, _ = os.path.splitext(filename)
             pfilename = filename[:10]
@@ -2923,15 +2997,12 @@ class MainWindow(QMainWindow):
                 prelen = lentoken // 2
                 bfilename = prelen * " " + pfilename + (lentoken - prelen) * " "
             # item = QListWidgetItem(QIcon(pix.scaled(100, 100, Qt.KeepAspectRatio, Qt.SmoothTransformation)),filename[:10])
-            item = QListWidgetItem(
-                QIcon(
-                    pix.scaled(100, 100, Qt.IgnoreAspectRatio, Qt.FastTransformation)
-                ),
-                pfilename,
-            )
+            item = QListWidgetItem(placeholder, pfilename)
             # item.setForeground(QBrush(Qt.white))
             item.setToolTip(file)
             self.iconlist.addItem(item)
+            self.thumbnailItems[file] = item
+        self.requestThumbnails(dirpath, self.mImgList5)
         owidth = 0
         for index in range(len(self.mImgList5)):
             item = self.iconlist.item(index)
@@ -2999,10 +3070,49 @@ class MainWindow(QMainWindow):
         self.AutoRecognition.setEnabled(False)
         self.actions.AutoRec.setEnabled(False)
         self.setDirty()
-        self.saveCacheLabel()
+        if self.annotationStore is None:
+            self.autoSaver.schedule(
+                ("cache", self.Cachelabelpath),
+                write_label_dict,
+                self.Cachelabelpath,
+                dict(self.Cachelabel),
+            )
 
         self.init_key_list(self.Cachelabel)
 
+    def saveAutoResult(self, imgPath, result):
+        """
+        保存一张图片的自动标注结果, 由 AutoDialog 在主线程中调用
+        """
+        self.result_dic = result
+        self.filePath = imgPath
+        self._saveFile(self.getImglabelidx(imgPath), mode="Auto")
+
+    def recognizeShapes(self, img, shapes):
+        """
+        Crop every shape out of img and recognise the crops in batches.
+        Return one (box, (text, score)) per shape, or None if a box can not be cropped.
+        """
+        boxes, crops = [], []
+        for shape in shapes:
+            box = [[int(p.x()), int(p.y())] for p in shape.points]
+            if len(box) > 4:
+                box = self.gen_quad_from_poly(np.array(box))
+            assert len(box) == 4
+
+            img_crop = get_rotate_crop_image(img, np.array(box, np.float32))
+            if img_crop is None:
+                msg = (
+                    "Can not recognise the detection box in "
+                    + self.filePath
+                    + ". Please change manually"
+                )
+                QMessageBox.information(self, "Information", msg)
+                return None
+            boxes.append(box)
+            crops.append(img_crop)
+        return list(zip(boxes, batch_recognize(self.ocr, crops, self.recBatchNum)))
+
     def reRecognition(self):
         img = cv2.imdecode(np.fromfile(self.filePath, dtype=np.uint8), 1)
         # org_box = [dic['points'] for dic in self.PPlabel[self.getImglabelidx(self.filePath)]]
@@ -3011,110 +3121,59 @@ class MainWindow(QMainWindow):
             self.result_dic_locked = (
                 []
             )  # result_dic_locked stores the ocr result of self.canvas.lockedShapes
-            rec_flag = 0
-            for shape in self.canvas.shapes:
-                box = [[int(p.x()), int(p.y())] for p in shape.points]
-                kie_cls = shape.key_cls
-
-                if len(box) > 4:
-                    box = self.gen_quad_from_poly(np.array(box))
-                assert len(box) == 4
-
-                img_crop = get_rotate_crop_image(img, np.array(box, np.float32))
-                if img_crop is None:
-                    msg = (
-                        "Can not recognise the detection box in "
-                        + self.filePath
-                        + ". Please change manually"
-                    )
-                    QMessageBox.information(self, "Information", msg)
-                    return
-                result = self.ocr.ocr(img_crop, cls=True, det=False)[0]
-                if result[0][0] != "":
-                    if shape.line_color == DEFAULT_LOCK_COLOR:
-                        shape.label = result[0][0]
-                        result.insert(0, box)
-                        if self.kie_mode:
-                            result.append(kie_cls)
-                        self.result_dic_locked.append(result)
-                    else:
-                        result.insert(0, box)
-                        if self.kie_mode:
-                            result.append(kie_cls)
-                        self.result_dic.append(result)
-                else:
-                    print("Can not recognise the box")
-                    if shape.line_color == DEFAULT_LOCK_COLOR:
-                        shape.label = result[0][0]
-                        if self.kie_mode:
-                            self.result_dic_locked.append(
-                                [box, (self.noLabelText, 0), kie_cls]
-                            )
-                        else:
-                            self.result_dic_locked.append([box, (self.noLabelText, 0)])
-                    else:
-                        if self.kie_mode:
-                            self.result_dic.append(
-                                [box, (self.noLabelText, 0), kie_cls]
-                            )
-                        else:
-                            self.result_dic.append([box, (self.noLabelText, 0)])
-                try:
-                    if self.noLabelText == shape.label or result[1][0] == shape.label:
-                        print("label no change")
-                    else:
-                        rec_flag += 1
-                except IndexError as e:
+            shapes = list(self.canvas.shapes)
+            recognized = self.recognizeShapes(img, shapes)
+            if recognized is None:
+                return
+            changed = []
+            for shape, (box, (text, score)) in zip(shapes, recognized):
+                if text == "":
                     print("Can not recognise the box")
-            if (len(self.result_dic) > 0 and rec_flag > 0) or self.canvas.lockedShapes:
-                self.canvas.isInTheSameImage = True
-                self.saveFile(mode="Auto")
-                self.loadFile(self.filePath, isAdjustScale=False)
-                self.canvas.isInTheSameImage = False
+                    text, score = self.noLabelText, 0
+                result = [box, (text, score)]
+                if self.kie_mode:
+                    result.append(shape.key_cls)
+                if shape.line_color == DEFAULT_LOCK_COLOR:
+                    self.result_dic_locked.append(result)
+                else:
+                    self.result_dic.append(result)
+                if text == shape.label:
+                    print("label no change")
+                else:
+                    changed.append((shape, text))
+
+            if changed:
+                # update the shapes in place, the view and zoom stay as they are
+                for shape, text in changed:
+                    shape.label = text
+                    self.singleLabel(shape)
                 self.setDirty()
-            elif len(self.result_dic) == len(self.canvas.shapes) and rec_flag == 0:
+            else:
                 if self.lang == "ch":
                     QMessageBox.information(self, "Information", "识别结果保持一致！")
                 else:
                     QMessageBox.information(
                         self, "Information", "The recognition result remains unchanged!"
                     )
-            else:
-                print("Can not recgonise in ", self.filePath)
         else:
             QMessageBox.information(self, "Information", "Draw a box!")
 
     def singleRerecognition(self):
         img = cv2.imdecode(np.fromfile(self.filePath, dtype=np.uint8), 1)
-        for shape in self.canvas.selectedShapes:
-            box = [[int(p.x()), int(p.y())] for p in shape.points]
-            if len(box) > 4:
-                box = self.gen_quad_from_poly(np.array(box))
-            assert len(box) == 4
-            img_crop = get_rotate_crop_image(img, np.array(box, np.float32))
-            if img_crop is None:
-                msg = (
-                    "Can not recognise the detection box in "
-                    + self.filePath
-                    + ". Please change manually"
-                )
-                QMessageBox.information(self, "Information", msg)
-                return
-            result = self.ocr.ocr(img_crop, cls=True, det=False)[0]
-            if result[0][0] != "":
-                result.insert(0, box)
-                print("result in reRec is ", result)
-                if result[1][0] == shape.label:
-                    print("label no change")
-                else:
-                    shape.label = result[1][0]
-            else:
+        shapes = list(self.canvas.selectedShapes)
+        recognized = self.recognizeShapes(img, shapes)
+        if recognized is None:
+            return
+        for shape, (box, (text, score)) in zip(shapes, recognized):
+            if text == "":
                 print("Can not recognise the box")
-                if self.noLabelText == shape.label:
-                    print("label no change")
-                else:
-                    shape.label = self.noLabelText
+                text = self.noLabelText
+            if text == shape.label:
+                print("label no change")
+            else:
+                shape.label = text
             self.singleLabel(shape)
+        if shapes:
             self.setDirty()
 
     def TableRecognition(self):
@@ -3201,8 +3260,8 @@ class MainWindow(QMainWindow):
                     order_index += 1
                     # shape.locked = False
                     shape.close()
-                    self.addLabel(shape)
                     shapes.append(shape)
+                self.addLabels(shapes)
                 self.setDirty()
                 self.canvas.loadShapes(shapes)
 
@@ -3320,56 +3379,55 @@ class MainWindow(QMainWindow):
         self.saveFilestate()
         self.savePPlabel(mode="auto")
 
-        # load box annotations
-        labeldict = {}
         if not os.path.exists(self.PPlabelpath):
             msg = "ERROR, Can not find Label.txt"
             QMessageBox.information(self, "Information", msg)
             return
-        else:
-            with open(self.PPlabelpath, "r", encoding="utf-8") as f:
-                data = f.readlines()
-                for each in data:
-                    file, label = each.split("\t")
-                    if label:
-                        label = label.replace("false", "False")
-                        label = label.replace("true", "True")
-                        label = label.replace("null", "None")
-                        labeldict[file] = eval(label)
-                    else:
-                        labeldict[file] = []
 
         # read table recognition output
-        TableRec_excel_dir = os.path.join(self.lastOpenDir, "tableRec_excel_output")
+        TableRec_excel_dir = os.path.join(self.lastOpenDir, TABLE_EXCEL_DIR_NAME)
+
+        def excel_path(image_path):
+            filename, _ = os.path.splitext(os.path.basename(image_path))
+            return os.path.join(TableRec_excel_dir, filename + ".xlsx")
+
+        # parse the workbooks of the labelled images in worker processes,
+        # unchanged workbooks come from the token cache
+        csv_paths = [
+            path
+            for path in map(excel_path, iter_label_keys(self.PPlabelpath))
+            if os.path.exists(path)
+        ]
+        reader = TableTokenReader(TableRec_excel_dir)
+        progress = QProgressDialog(
+            "Reading table structures...", "Cancel", 0, len(csv_paths), self
+        )
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+        read = reader.run(csv_paths)
+        for done in read:
+            progress.setValue(done)
+            if progress.wasCanceled():
+                break
+        read.close()
+        # closing the dialog counts as canceling it
+        canceled = progress.wasCanceled()
+        progress.close()
+        if canceled:
+            return
 
         # save txt
         fid = open("{}/gt.txt".format(self.lastOpenDir), "w", encoding="utf-8")
-        for image_path in labeldict.keys():
+        # box annotations are read one image at a time
+        for image_path, annos in iter_label_file(self.PPlabelpath):
             # load csv annotations
-            filename, _ = os.path.splitext(os.path.basename(image_path))
-            csv_path = os.path.join(TableRec_excel_dir, filename + ".xlsx")
-            if not os.path.exists(csv_path):
+            token_list = reader.tokens.get(excel_path(image_path))
+            if token_list is None:
                 continue
 
-            excel = openpyxl.load_workbook(csv_path, data_only=True)
-            sheet0 = excel.worksheets[0]  # only sheet 0
-            merged_cells = sheet0.merged_cells.ranges  # list of merged cell ranges
-
-            html_list = [["td"] * sheet0.max_column for i in range(sheet0.max_row)]
-
-            for merged in merged_cells:
-                # Convert merged cell range to start row, end row, start col, end col
-                sr = merged.min_row - 1
-                er = merged.max_row - 1
-                sc = merged.min_col - 1
-                ec = merged.max_col - 1
-                html_list = expand_list((sr, er, sc, ec), html_list)
-
-            token_list = convert_token(html_list)
-
             # load box annotations
             cells = []
-            for anno in labeldict[image_path]:
+            for anno in annos:
                 tokens = list(anno["transcription"])
                 cells.append({"tokens": tokens, "bbox": anno["points"]})
 
@@ -3382,6 +3440,13 @@ class MainWindow(QMainWindow):
 
         # convert to PP-Structure label format
         fid.close()
+        if reader.failed:
+            QMessageBox.information(
+                self,
+                "Information",
+                "The following table files can not be read, their images are not exported.\n"
+                + "".join(str(i) + "\n" for i in reader.failed),
+            )
         msg = "JSON sucessfully saved in {}/gt.txt".format(self.lastOpenDir)
         QMessageBox.information(self, "Information", msg)
 
@@ -3419,6 +3484,26 @@ class MainWindow(QMainWindow):
             self.AutoRecognition.setEnabled(True)
             self.actions.AutoRec.setEnabled(True)
 
+    @property
+    def ocr(self):
+        return self.waitModel("ocr")
+
+    @property
+    def table_ocr(self):
+        return self.waitModel("table_ocr")
+
+    def waitModel(self, name):
+        """Return a model, waiting for the background build if it is not done yet."""
+        if self.models.isReady(name):
+            return self.models.get(name)
+        self.status("Loading %s model..." % name)
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            return self.models.get(name)
+        finally:
+            QApplication.restoreOverrideCursor()
+            self.status("Loaded %s model" % name)
+
     def modelChoose(self):
         current_text = self.comboBox.currentText()
         print(current_text)
@@ -3432,26 +3517,25 @@ class MainWindow(QMainWindow):
         }
         if current_text in lg_idx:
             choose_lang = lg_idx[current_text]
-            if hasattr(self, "ocr"):
-                del self.ocr
-            self.ocr = PaddleOCR(
+            ocrParams = dict(
                 use_pdserving=False,
                 use_angle_cls=True,
                 det=True,
                 cls=True,
                 use_gpu=self.gpu,
                 lang=choose_lang,
+                rec_batch_num=self.recBatchNum,
             )
+            self.models.submit("ocr", build_ocr, ocrParams)
             if choose_lang in ["ch", "en"]:
-                if hasattr(self, "table_ocr"):
-                    del self.table_ocr
-                self.table_ocr = PPStructure(
+                tableOcrParams = dict(
                     use_pdserving=False,
                     use_gpu=self.gpu,
                     lang=choose_lang,
                     layout=False,
                     show_log=False,
                 )
+                self.models.submit("table_ocr", build_table_ocr, tableOcrParams)
         else:
             print("Invalid language selection")
         self.dialog.close()
@@ -3475,10 +3559,39 @@ class MainWindow(QMainWindow):
                 self.actions.exportJSON.setEnabled(True)
 
     def saveFilestate(self):
-        with open(self.fileStatepath, "w", encoding="utf-8") as f:
-            for key in self.fileStatedict:
-                f.write(key + "\t")
-                f.write(str(self.fileStatedict[key]) + "\n")
+        # a queued write of an older state must not land after this one
+        self.autoSaver.flush()
+        if self.annotationStore is not None:
+            self.annotationStore.exportFileState(self.fileStatepath)
+            return
+        write_file_state(self.fileStatepath, self.fileStatedict)
+
+    def scheduleStateSave(self):
+        """
+        在后台线程保存 fileState.txt 和 Label.txt, 连续的保存只写入最后一次
+        """
+        if self.annotationStore is not None:
+            return
+        self.autoSaver.schedule(
+            ("fileState", self.fileStatepath),
+            write_file_state,
+            self.fileStatepath,
+            dict(self.fileStatedict),
+        )
+        self.autoSaver.schedule(
+            ("PPlabel", self.PPlabelpath),
+            write_checked_labels,
+            self.PPlabelpath,
+            dict(self.PPlabel),
+            list(self.fileStatedict),
+        )
+
+    def showAutoSaveMetrics(self, pending, written, merged, failed):
+        text = "Saving %d file(s)" % pending if pending else "Saved"
+        text += " (%d writes, %d merged)" % (written, merged)
+        if failed:
+            text += ", %d failed, see the console" % failed
+        self.labelAutoSave.setText(text)
 
     def loadLabelFile(self, labelpath):
         """
@@ -3501,6 +3614,15 @@ class MainWindow(QMainWindow):
                     if not line:  # 跳过空行
                         continue
                     
+                    if "\t" in line and line.split("\t", 1)[1].startswith("["):
+                        # "key\tjson" 行, saveCacheLabel/savePPlabel 的格式
+                        key, value = line.split("\t", 1)
+                        try:
+                            labeldict[key] = json.loads(value)
+                        except ValueError:
+                            continue
+                        continue
+
                     if line.startswith("# "):  # 文件标识行
                         if current_file and current_labels:
                             # 保存前一个文件的标注
@@ -3534,12 +3656,11 @@ class MainWindow(QMainWindow):
         return labeldict
 
     def savePPlabel(self, mode="Manual"):
-        savedfile = [self.getImglabelidx(i) for i in self.fileStatedict.keys()]
-        with open(self.PPlabelpath, "w", encoding="utf-8") as f:
-            for key in self.PPlabel:
-                if key in savedfile and self.PPlabel[key] != []:
-                    f.write(key + "\t")
-                    f.write(json.dumps(self.PPlabel[key], ensure_ascii=False) + "\n")
+        self.autoSaver.flush()
+        if self.annotationStore is not None:
+            self.annotationStore.exportLabels(self.PPlabelpath, LABEL, checkedOnly=True)
+        else:
+            write_checked_labels(self.PPlabelpath, self.PPlabel, self.fileStatedict)
 
         if mode == "Manual":
             if self.lang == "ch":
@@ -3549,37 +3670,55 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "Information", msg)
 
     def saveCacheLabel(self):
-        with open(self.Cachelabelpath, "w", encoding="utf-8") as f:
-            for key in self.Cachelabel:
-                f.write(key + "\t")
-                f.write(json.dumps(self.Cachelabel[key], ensure_ascii=False) + "\n")
+        self.autoSaver.flush()
+        if self.annotationStore is not None:
+            self.annotationStore.exportLabels(self.Cachelabelpath, CACHE, checkedOnly=False)
+            return
+        write_label_dict(self.Cachelabelpath, self.Cachelabel)
+
+    def openAnnotationStore(self, dirpath):
+        """
+        打开目录的 annotations.db, 第一次打开时导入 Label.txt, Cache.cach 和 fileState.txt
+        """
+        if self.annotationStore is not None:
+            self.annotationStore.close()
+        self.annotationStore = AnnotationStore(os.path.join(dirpath, STORE_FILE_NAME))
+        if self.annotationStore.isEmpty():
+            self.annotationStore.importDicts(
+                self.PPlabel, self.Cachelabel, self.fileStatedict
+            )
+            return
+        self.Cachelabel = self.annotationStore.labels(CACHE)
+        self.PPlabel = dict(self.Cachelabel, **self.annotationStore.labels(LABEL))
+        self.fileStatedict = self.annotationStore.states()
+        if self.fileStatedict:
+            self.actions.saveLabel.setEnabled(True)
+            self.actions.saveRec.setEnabled(True)
+            self.actions.exportJSON.setEnabled(True)
+
+    def getLabelIndex(self, filename):
+        """
+        获取图片所在目录的 Label.txt 索引, 只在切换目录时重新解析文件
+        """
+        if self.labelIndex is None or not self.labelIndex.belongsTo(filename):
+            self.openLabelIndex(
+                os.path.join(os.path.dirname(filename), LABEL_FILE_NAME)
+            )
+        return self.labelIndex
+
+    def openLabelIndex(self, labelPath):
+        # compact the log of the previous directory before switching
+        if self.labelIndex is not None:
+            self.autoSaver.flush()
+            self.labelIndex.close()
+        self.labelIndex = LabelIndex(labelPath, logMode=self.labelLogMode)
 
     def saveLabelFile(self):
         """
         保存标注到 Label.txt 文件
         """
         if self.filePath and self.canvas.shapes:
-            label_file = os.path.join(os.path.dirname(self.filePath), "Label.txt")
             curr_file_labels = []
-            
-            # 读取现有的标注
-            existing_labels = {}
-            if os.path.exists(label_file):
-                with open(label_file, 'r', encoding='utf8') as f:
-                    lines = f.readlines()
-                    current_file = None
-                    current_labels = []
-                    for line in lines:
-                        line = line.strip()
-                        if line.startswith("# "):  # 文件标识行
-                            if current_file and current_labels:
-                                existing_labels[current_file] = current_labels
-                            current_file = line[2:]  # 去掉"# "
-                            current_labels = []
-                        elif line:  # 标注行
-                            current_labels.append(line)
-                    if current_file and current_labels:
-                        existing_labels[current_file] = current_labels
 
             # 获取当前文件的标注
             for shape in self.canvas.shapes:
@@ -3590,18 +3729,16 @@ class MainWindow(QMainWindow):
                 y2 = max(p.y() for p in points)
                 # 特殊处理空文本框
                 label = "" if shape.label == "[Empty]" else shape.label
-                line = f"{x1},{y1},{x2},{y2},{label}\n"
-                curr_file_labels.append(line)
-
-            # 更新当前文件的标注
-            existing_labels[self.filePath] = curr_file_labels
-
-            # 写入所有标注
-            with open(label_file, 'w', encoding='utf8') as f:
-                for file_path, labels in existing_labels.items():
-                    f.write(f"# {file_path}\n")  # 写入文件标识
-                    f.writelines(labels)  # 写入该文件的所有标注
-                    f.write("\n")  # 文件之间空一行
+                curr_file_labels.append(f"{x1},{y1},{x2},{y2},{label}")
+
+            # 只更新索引中当前文件的标注, 不再重新读取整个 Label.txt
+            labelIndex = self.getLabelIndex(self.filePath)
+            if labelIndex.lines(self.filePath) == [l.strip() for l in curr_file_labels]:
+                return  # 没有修改, 不需要写入
+            labelIndex.update(self.filePath, curr_file_labels, persist=False)
+            self.autoSaver.schedule(
+                ("label", labelIndex.labelPath), labelIndex.persist
+            )
 
     def saveRecResult(self):
         if {} in [self.PPlabelpath, self.PPlabel, self.fileStatedict]:
@@ -3609,52 +3746,49 @@ class MainWindow(QMainWindow):
             return
 
         base_dir = os.path.dirname(self.PPlabelpath)
-        rec_gt_dir = base_dir + "/rec_gt.txt"
-        crop_img_dir = base_dir + "/crop_img/"
-        ques_img = []
-        if not os.path.exists(crop_img_dir):
-            os.mkdir(crop_img_dir)
-
-        with open(rec_gt_dir, "w", encoding="utf-8") as f:
-            for key in self.fileStatedict:
-                idx = self.getImglabelidx(key)
-                try:
-                    img_path = os.path.dirname(base_dir) + "/" + key
-                    img = cv2.imdecode(np.fromfile(img_path, dtype=np.uint8), -1)
-                    for i, label in enumerate(self.PPlabel[idx]):
-                        if label["difficult"]:
-                            continue
-                        img_crop = get_rotate_crop_image(
-                            img, np.array(label["points"], np.float32)
-                        )
-                        img_name = (
-                            os.path.splitext(os.path.basename(idx))[0]
-                            + "_crop_"
-                            + str(i)
-                            + ".jpg"
-                        )
-                        cv2.imencode(".jpg", img_crop)[1].tofile(
-                            crop_img_dir + img_name
-                        )
-                        f.write("crop_img/" + img_name + "\t")
-                        f.write(label["transcription"] + "\n")
-                except KeyError as e:
-                    pass
-                except Exception as e:
-                    ques_img.append(key)
-                    traceback.print_exc()
-        if ques_img:
+        items = []
+        for key in self.fileStatedict:
+            idx = self.getImglabelidx(key)
+            if idx not in self.PPlabel:
+                continue
+            img_path = os.path.dirname(base_dir) + "/" + key
+            items.append((idx, img_path, self.PPlabel[idx]))
+
+        exporter = RecExporter(base_dir)
+        progress = QProgressDialog(
+            "Exporting cropped images...", "Cancel", 0, len(items), self
+        )
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(500)
+        export = exporter.run(items)
+        for done in export:
+            # setValue keeps the window responsive while the workers run
+            progress.setValue(done)
+            if progress.wasCanceled():
+                break
+        # writes the manifest, also when the export was canceled
+        export.close()
+        # closing the dialog counts as canceling it
+        canceled = progress.wasCanceled()
+        progress.close()
+
+        if exporter.failed:
             QMessageBox.information(
                 self,
                 "Information",
                 "The following images can not be saved, please check the image path and labels.\n"
-                + "".join(str(i) + "\n" for i in ques_img),
+                + "".join(str(i) + "\n" for i in exporter.failed),
             )
-        QMessageBox.information(
-            self,
-            "Information",
-            "Cropped images have been saved in " + str(crop_img_dir),
-        )
+        if canceled:
+            msg = (
+                "Export canceled, " + REC_GT_NAME + " is unchanged. "
+                "The next export continues from the images already cropped"
+            )
+        else:
+            msg = "Cropped images have been saved in " + str(exporter.cropDir)
+            if exporter.skipped:
+                msg += " (%d unchanged images skipped)" % exporter.skipped
+        QMessageBox.information(self, "Information", msg)
 
     def speedChoose(self):
         if self.labelDialogOption.isChecked():
@@ -3702,16 +3836,32 @@ class MainWindow(QMainWindow):
 
     def undoShapeEdit(self):
         self.canvas.restoreShape()
+        self.reloadShapeLists()
+
+    def redoShapeEdit(self):
+        self.canvas.redoShape()
+        self.reloadShapeLists()
+
+    def reloadShapeLists(self):
+        """Rebuild the label lists from the canvas shapes after an undo or redo."""
         self.labelList.clear()
         self.indexList.clear()
         self.BoxList.clear()
-        self.loadShapes(self.canvas.shapes)
+        self.itemsToShapes.clear()
+        self.shapesToItems.clear()
+        self.itemsToShapesbox.clear()
+        self.shapesToItemsbox.clear()
+        self._noSelectionSlot = True
+        self.addLabels(self.canvas.shapes)
+        self.labelList.clearSelection()
+        self._noSelectionSlot = False
         self.actions.undo.setEnabled(self.canvas.isShapeRestorable)
+        self.actions.redo.setEnabled(self.canvas.isShapeRedoable)
+        self.setDirty()
 
     def loadShapes(self, shapes, replace=True):
         self._noSelectionSlot = True
-        for shape in shapes:
-            self.addLabel(shape)
+        self.addLabels(shapes)
         self.labelList.clearSelection()
         self.indexList.clearSelection()
         self._noSelectionSlot = False
@@ -3781,6 +3931,7 @@ class MainWindow(QMainWindow):
                 QPointF(box[2][0], box[2][1]),
                 QPointF(box[3][0], box[3][1]),
             ]
+            self.canvas.shapeIndex.update(shape)
             print(shape.points)
             self.updateBoxlist()
             self.setDirty()
@@ -3789,26 +3940,7 @@ class MainWindow(QMainWindow):
         if self.canvas.current_text():
             text = self.canvas.current_text()
             # 设置支持多语言的字体
-            font = QFont()
-            font_families = [
-                "Estrangelo Edessa",
-                "Noto Sans Syriac",
-                "East Syriac Adiabene",
-                "Serto Jerusalem",
-                "Microsoft Sans Serif",
-                "Arial Unicode MS",
-                "Arial"
-            ]
-            
-            # 修正字体检查方法
-            db = QFontDatabase()
-            available_families = db.families()
-            for family in font_families:
-                if family in available_families:
-                    font.setFamily(family)
-                    break
-                
-            font.setPointSize(12)  # 设置合适的字体大小
+            font = labelFont(12)
             
             # 启用复杂文本布局
             self.result_text.setLayoutDirection(Qt.RightToLeft)  
@@ -3819,24 +3951,7 @@ class MainWindow(QMainWindow):
     def setRecResult(self, text):
         if text:
             # 设置支持多语言的字体
-            font = QFont()
-            # 尝试使用支持叙利亚文的字体
-            font_families = [
-                "Estrangelo Edessa",
-                "Noto Sans Syriac",
-                "East Syriac Adiabene", 
-                "Serto Jerusalem",
-                "Microsoft Sans Serif",
-                "Arial Unicode MS",
-                "Arial"
-            ]
-            
-            for family in font_families:
-                if QFontDatabase().hasFamily(family):
-                    font.setFamily(family)
-                    break
-                
-            font.setPointSize(12)
+            font = labelFont(12)
             
             # 启用复杂文本布局
             self.result_text.setLayoutDirection(Qt.RightToLeft)
@@ -3861,36 +3976,29 @@ class MainWindow(QMainWindow):
         从 Label.txt 中提取当前文件的标注并保存为 JSON
         """
         if self.filePath:
-            label_file = os.path.join(os.path.dirname(self.filePath), "Label.txt")
-            if not os.path.exists(label_file):
+            labelIndex = self.getLabelIndex(self.filePath)
+            if not os.path.exists(labelIndex.labelPath):
                 return
-                
-            # 从 Label.txt 中读取当前文件的标注
+
+            # 从 Label.txt 索引中读取当前文件的标注
             shapes = []
-            with open(label_file, 'r', encoding='utf8') as f:
-                lines = f.readlines()
-                reading_current_file = False
-                for line in lines:
-                    line = line.strip()
-                    if line.startswith("# "):
-                        reading_current_file = line[2:] == self.filePath
-                    elif line and reading_current_file:
-                        x1, y1, x2, y2, label = line.split(',')
-                        shape_info = {
-                            "x1": float(x1),
-                            "y1": float(y1),
-                            "x2": float(x2),
-                            "y2": float(y2),
-                            "text": label,
-                            "color": "#00ff00"  # 使用默认颜色
-                        }
-                        shapes.append(shape_info)
-
-            # 保存到 JSON 文件
+            for x1, y1, x2, y2, label in labelIndex.boxes(self.filePath):
+                shape_info = {
+                    "x1": x1,
+                    "y1": y1,
+                    "x2": x2,
+                    "y2": y2,
+                    "text": label,
+                    "color": "#00ff00"  # 使用默认颜色
+                }
+                shapes.append(shape_info)
+
+            # 保存到 JSON 文件, 先写完队列中同一文件的保存
+            self.autoSaver.flush()
             json_file = os.path.splitext(self.filePath)[0] + '.json'
             json_data = {self.filePath: shapes}
             try:
-                with open(json_file, 'w', encoding='utf8') as f:
+                with atomicWrite(json_file, encoding='utf8') as f:
                     json.dump(json_data, f, ensure_ascii=False, indent=2)
             except Exception as e:
                 self.errorMessage('Error saving label data', str(e))
@@ -3908,6 +4016,10 @@ def read(filename, default=None):
         return default
 
 
+def scan_all_images(folderPath, naturalSort=True):
+    return scanImages(folderPath, naturalSort)
+
+
 def str2bool(v):
     return v.lower() in ("true", "t", "1")
 
@@ -3951,6 +4063,49 @@ def get_main_app(argv=[]):
         "--bbox_auto_zoom_center", type=str2bool, default=False, nargs="?"
     )
     arg_parser.add_argument("--label_font_path", type=str, default=None, nargs="?")
+    arg_parser.add_argument(
+        "--label_log_mode",
+        type=str2bool,
+        default=False,
+        nargs="?",
+        help="Append saves to Label.txt.log and compact them into Label.txt in the background.",
+    )
+    arg_parser.add_argument(
+        "--prefetch_num",
+        type=int,
+        default=2,
+        nargs="?",
+        help="Number of next/previous images decoded in the background.",
+    )
+    arg_parser.add_argument(
+        "--image_cache_mb",
+        type=int,
+        default=DEFAULT_CACHE_MB,
+        nargs="?",
+        help="Memory budget of the decoded image cache in MB.",
+    )
+    arg_parser.add_argument(
+        "--rec_batch_num",
+        type=int,
+        default=DEFAULT_REC_BATCH_NUM,
+        nargs="?",
+        help="Number of text crops recognised per model call.",
+    )
+    arg_parser.add_argument(
+        "--show_fps",
+        type=str2bool,
+        default=False,
+        nargs="?",
+        help="Show the canvas frame rate and paint time in the status bar.",
+    )
+    arg_parser.add_argument(
+        "--sqlite_store",
+        type=str2bool,
+        default=False,
+        nargs="?",
+        help="Keep the annotations of a folder in annotations.db and write Label.txt, "
+        "Cache.cach and fileState.txt only when exporting.",
+    )
     arg_parser.add_argument(
         "--selected_shape_color",
         type=parse_rgb,
@@ -3974,6 +4129,12 @@ def get_main_app(argv=[]):
         bbox_auto_zoom_center=args.bbox_auto_zoom_center,
         label_font_path=args.label_font_path,
         selected_shape_color=args.selected_shape_color,
+        label_log_mode=args.label_log_mode,
+        prefetch_num=args.prefetch_num,
+        image_cache_mb=args.image_cache_mb,
+        rec_batch_num=args.rec_batch_num,
+        show_fps=args.show_fps,
+        sqlite_store=args.sqlite_store,
     )
     win.show()
     return app, win
@@ -3985,5 +4146,251 @@ def main():
     return app.exec_()
 
 
+CACHE_FILE_NAME = "Cache.cach"
+SHARD_SUFFIX = ".shard-"
+
+
+def img_label_idx(imgPath):
+    """Key of an image in Cache.cach, same as MainWindow.getImglabelidx."""
+    return os.path.basename(os.path.dirname(imgPath)) + "/" + os.path.basename(imgPath)
+
+
+def iter_label_file(path):
+    """
+    Yield (key, boxes) for each line of a "key\tjson" file as written by
+    saveCacheLabel/savePPlabel, reading one line at a time.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if "\t" not in line:
+                continue
+            key, value = line.rstrip("\n").split("\t", 1)
+            if not value.strip():
+                yield key, []
+                continue
+            try:
+                yield key, json.loads(value)
+            except ValueError:
+                print("Ignore invalid line of", path, ":", key)
+
+
+def iter_label_keys(path):
+    """Keys of a "key\tjson" file, without parsing the labels."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if "\t" in line:
+                yield line.split("\t", 1)[0]
+
+
+def read_label_dict(path):
+    """Read a "key\tjson" file as written by saveCacheLabel/savePPlabel."""
+    return dict(iter_label_file(path))
+
+
+def write_label_dict(path, labels, backup=True):
+    with atomicWrite(path, backup=backup) as f:
+        for key in labels:
+            f.write(key + "\t")
+            f.write(json.dumps(labels[key], ensure_ascii=False) + "\n")
+
+
+def write_file_state(path, states):
+    """Write fileState.txt, as MainWindow.saveFilestate."""
+    with atomicWrite(path, backup=True) as f:
+        for key in states:
+            f.write(key + "\t")
+            f.write(str(states[key]) + "\n")
+
+
+def write_checked_labels(path, labels, checked):
+    """Write the labels of the checked images to Label.txt, as MainWindow.savePPlabel."""
+    checked = {img_label_idx(i) for i in checked}
+    with atomicWrite(path, backup=True) as f:
+        for key in labels:
+            if key in checked and labels[key] != []:
+                f.write(key + "\t")
+                f.write(json.dumps(labels[key], ensure_ascii=False) + "\n")
+
+
+def write_image_json(json_file, imgPath, shapes):
+    """Update the shapes of one image in its .json file, as MainWindow.saveFile."""
+    try:
+        if os.path.exists(json_file):
+            with open(json_file, "r", encoding="utf8") as f:
+                json_data = json.load(f)
+        else:
+            json_data = {}
+    except Exception:
+        json_data = {}
+    json_data[imgPath] = shapes
+    with atomicWrite(json_file, encoding="utf8") as f:
+        json.dump(json_data, f, ensure_ascii=False, indent=2)
+
+
+def read_checked_keys(dirpath):
+    """Keys of the images listed in the fileState.txt of dirpath."""
+    fileStatePath = os.path.join(dirpath, "fileState.txt")
+    if not os.path.exists(fileStatePath):
+        return set()
+    with open(fileStatePath, "r", encoding="utf-8") as f:
+        return {img_label_idx(line.split("\t")[0]) for line in f if line.strip()}
+
+
+def write_label_txt(dirpath, labels):
+    """
+    Merge labels into the "key\tjson" Label.txt of dirpath, as savePPlabel
+    writes it. The labels of checked images are kept as they are, and so are
+    the "# path" blocks of LabelIndex, which follow the "key\tjson" lines.
+    """
+    labelPath = os.path.join(dirpath, LABEL_FILE_NAME)
+    merged = read_label_dict(labelPath)
+    blockLines = []
+    if os.path.exists(labelPath):
+        with open(labelPath, "r", encoding="utf-8") as f:
+            blockLines = [line.rstrip("\n") for line in f if not isKeyValueLine(line)]
+    checked = read_checked_keys(dirpath)
+    for key, boxes in labels.items():
+        if boxes and not (key in checked and key in merged):
+            merged[key] = boxes
+    with atomicWrite(labelPath, backup=True) as f:
+        for key in merged:
+            f.write(key + "\t")
+            f.write(json.dumps(merged[key], ensure_ascii=False) + "\n")
+        for line in blockLines:
+            f.write(line + "\n")
+
+
+def parse_shard(value):
+    try:
+        index, count = map(int, value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError('Shard must be given as "i/n".')
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("Shard index must be in [0, n).")
+    return index, count
+
+
+def headless_main(argv=None):
+    """
+    Auto label a directory without the GUI.
+
+    Results go to Cache.cach, as with AutoRecognition, and are shown in the
+    GUI for checking. With --shard i/n every process labels every n-th image
+    into its own Cache.cach.shard-i-of-n file, --merge folds the shard files
+    into Cache.cach afterwards. Images already checked or already in the
+    output file are skipped, an interrupted run can simply be restarted.
+    """
+    arg_parser = argparse.ArgumentParser(
+        description="Auto label a directory of images without the GUI."
+    )
+    arg_parser.add_argument("dir", type=str, help="Directory of the images.")
+    arg_parser.add_argument("--gpu", type=str2bool, default=True, nargs="?")
+    arg_parser.add_argument("--kie", type=str2bool, default=False, nargs="?")
+    arg_parser.add_argument(
+        "--img_list_natural_sort", type=str2bool, default=True, nargs="?"
+    )
+    arg_parser.add_argument(
+        "--rec_batch_num", type=int, default=DEFAULT_REC_BATCH_NUM, nargs="?"
+    )
+    arg_parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=8,
+        nargs="?",
+        help="Number of images recognised together.",
+    )
+    arg_parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        nargs="?",
+        help='Only label the i-th of n shards, as "i/n".',
+    )
+    arg_parser.add_argument(
+        "--merge",
+        type=str2bool,
+        default=False,
+        const=True,
+        nargs="?",
+        help="Merge the shard files into Cache.cach and exit.",
+    )
+    arg_parser.add_argument(
+        "--label_txt",
+        type=str2bool,
+        default=False,
+        const=True,
+        nargs="?",
+        help="Also write the results into Label.txt.",
+    )
+    args = arg_parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    dirpath = os.path.abspath(args.dir)
+    cachePath = os.path.join(dirpath, CACHE_FILE_NAME)
+    if args.merge:
+        merged = read_label_dict(cachePath)
+        prefix = CACHE_FILE_NAME + SHARD_SUFFIX
+        parts = sorted(f for f in os.listdir(dirpath) if f.startswith(prefix))
+        for part in parts:
+            merged.update(read_label_dict(os.path.join(dirpath, part)))
+        write_label_dict(cachePath, merged)
+        if args.label_txt:
+            write_label_txt(dirpath, merged)
+        for part in parts:
+            os.remove(os.path.join(dirpath, part))
+        print("Merged %d shard files into %s" % (len(parts), cachePath))
+        return 0
+
+    done = set(read_label_dict(cachePath)) | read_checked_keys(dirpath)
+
+    if args.shard is None:
+        outPath = cachePath
+    else:
+        outPath = cachePath + SHARD_SUFFIX + "%d-of-%d" % args.shard
+    results = read_label_dict(outPath)
+    done.update(results)
+
+    images = scan_all_images(dirpath, args.img_list_natural_sort)
+    if args.shard is not None:
+        index, count = args.shard
+        images = images[index::count]
+    images = [p for p in images if img_label_idx(p) not in done]
+    print("Auto labelling %d images in %s" % (len(images), dirpath))
+
+    ocr = build_ocr(default_ocr_params(args.gpu, args.rec_batch_num))
+    pipeline = AutoLabelPipeline(
+        ocr, images, batchSize=args.batch_size, recBatchNum=args.rec_batch_num
+    )
+    for findex, (imgPath, result) in enumerate(pipeline.run(), 1):
+        if result:
+            # the same content saveLabels writes for mode="Auto"
+            boxes = []
+            for box in result:
+                if box[1][0] == "":
+                    continue
+                trans_dict = {
+                    "transcription": box[1][0],
+                    "points": box[0],
+                    "difficult": False,
+                }
+                if args.kie:
+                    trans_dict["key_cls"] = "None"
+                boxes.append(trans_dict)
+            results[img_label_idx(imgPath)] = boxes
+        else:
+            print("Can not recognise file", imgPath)
+        if findex % 100 == 0:
+            write_label_dict(outPath, results, backup=args.shard is None)
+            print("%d/%d images done" % (findex, len(images)))
+    write_label_dict(outPath, results, backup=args.shard is None)
+    if args.label_txt and args.shard is None:
+        write_label_txt(dirpath, results)
+    print("Saved to", outPath)
+    return 0
+
+
 if __name__ == "__main__":
     sys.exit(main())
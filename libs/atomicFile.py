@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+TMP_SUFFIX = ".tmp"
+BACKUP_SUFFIX = ".bak"
+BROKEN_SUFFIX = ".broken"
+
+
+def _syncDir(dirpath):
+    # makes the rename itself durable, not supported on Windows
+    if os.name != "posix":
+        return
+    fd = os.open(dirpath or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _keepBackup(path):
+    """Make path.bak the current content of path, before path is replaced."""
+    backupPath = path + BACKUP_SUFFIX
+    if os.path.exists(backupPath):
+        os.remove(backupPath)
+    try:
+        # a hard link keeps the old file alive after the rename, without a copy
+        os.link(path, backupPath)
+    except OSError:
+        shutil.copy2(path, backupPath)
+
+
+@contextmanager
+def atomicWrite(path, mode="w", encoding="utf-8", backup=False):
+    """
+    Open a temporary file next to path for writing and move it over path
+    once the block succeeds and the data is on disk, so path always holds
+    either the old or the new content. With backup, the replaced content
+    stays in path.bak, only used for the annotation files of a folder. The
+    temporary file is removed if the block fails.
+    """
+    tmpPath = path + TMP_SUFFIX
+    f = open(tmpPath, mode, encoding=None if "b" in mode else encoding)
+    try:
+        yield f
+        f.flush()
+        os.fsync(f.fileno())
+    except BaseException:
+        f.close()
+        os.remove(tmpPath)
+        raise
+    f.close()
+    if backup and os.path.exists(path):
+        _keepBackup(path)
+    os.replace(tmpPath, path)
+    _syncDir(os.path.dirname(path))
+
+
+def isKeyValueLine(line):
+    """
+    Whether line is a complete "key\tjson" line of fileState.txt, Cache.cach
+    or a Label.txt written by savePPlabel. An empty value reads as no boxes.
+    """
+    if "\t" not in line:
+        return False
+    value = line.split("\t", 1)[1].strip()
+    if not value:
+        return True
+    try:
+        json.loads(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _completeLines(text, isLine=None):
+    """
+    The leading lines of an annotation text file that were fully written.
+
+    A crash during an in-place write leaves a prefix of the file, so only a
+    last line without newline can be cut off. It is kept if isLine accepts
+    it, isLine checks a line against the format of the file. Lines with
+    NUL bytes are the unwritten blocks some filesystems leave after a crash.
+    """
+    # split on "\n" only, labels may contain other line breaks like "\u2028"
+    lines = [line + "\n" for line in text.split("\n")]
+    last = lines.pop()[:-1]
+    if last:
+        lines.append(last)
+    complete = []
+    for line in lines:
+        if "\x00" in line:
+            break
+        if not line.endswith("\n") and isLine is not None and not isLine(line):
+            break
+        complete.append(line)
+    return complete
+
+
+def isComplete(path, isLine=None):
+    """
+    Whether an annotation file was fully written: a .json file has to parse,
+    a text file must not end in a line isLine rejects.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        text = data.decode("utf-8")
+    except (OSError, UnicodeDecodeError):
+        return False
+    if path.endswith(".json"):
+        try:
+            json.loads(text)
+        except ValueError:
+            return False
+        return True
+    return len("".join(_completeLines(text, isLine))) == len(text)
+
+
+def recoverFile(path, isLine=None):
+    """
+    Repair an annotation file left truncated by a crash during an in-place
+    write, isLine checks a line against the format of the file. It is
+    restored from path.bak when that is complete, otherwise a text file is
+    cut back to its last complete line. The damaged file is kept as
+    path.broken. Return True if the file was repaired.
+    """
+    tmpPath = path + TMP_SUFFIX
+    if os.path.exists(tmpPath):
+        # an interrupted atomicWrite, path itself is intact
+        os.remove(tmpPath)
+    backupPath = path + BACKUP_SUFFIX
+    if not os.path.exists(path):
+        if os.path.exists(backupPath) and isComplete(backupPath, isLine):
+            shutil.copy2(backupPath, path)
+            print("Restored missing", path, "from", backupPath)
+            return True
+        return False
+    if isComplete(path, isLine):
+        return False
+
+    brokenPath = path + BROKEN_SUFFIX
+    shutil.copy2(path, brokenPath)
+    if os.path.exists(backupPath) and isComplete(backupPath, isLine):
+        shutil.copy2(backupPath, path)
+        print("Restored truncated", path, "from", backupPath)
+        return True
+    if path.endswith(".json"):
+        print("Can not repair", path, ", the damaged file is kept as", brokenPath)
+        return False
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8", errors="ignore")
+    with atomicWrite(path) as f:
+        f.writelines(_completeLines(text, isLine))
+    print(
+        "Dropped the incomplete end of",
+        path,
+        ", the damaged file is kept as",
+        brokenPath,
+    )
+    return True
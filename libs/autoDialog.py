@@ -9,9 +9,8 @@ except ImportError:
 import time
 import datetime
 import json
-import cv2
-import numpy as np
 
+from libs.autoPipeline import AutoLabelPipeline
 from libs.utils import newIcon
 
 BB = QDialogButtonBox
@@ -20,6 +19,7 @@ BB = QDialogButtonBox
 class Worker(QThread):
     progressBarValue = pyqtSignal(int)
     listValue = pyqtSignal(str)
+    resultValue = pyqtSignal(str, list)
     endsignal = pyqtSignal(int, str)
     handle = 0
 
@@ -29,57 +29,44 @@ class Worker(QThread):
         self.mImgList = mImgList
         self.mainThread = mainThread
         self.model = model
+        self.pipeline = AutoLabelPipeline(
+            self.ocr, self.mImgList, recBatchNum=mainThread.recBatchNum
+        )
         self.setStackSize(1024 * 1024)
 
     def run(self):
         try:
             findex = 0
-            for Imgpath in self.mImgList:
-                if self.handle == 0:
-                    self.listValue.emit(Imgpath)
-                    if self.model == "paddle":
-                        h, w, _ = cv2.imdecode(
-                            np.fromfile(Imgpath, dtype=np.uint8), 1
-                        ).shape
-                        if h > 32 and w > 32:
-                            self.result_dic = self.ocr.ocr(Imgpath, cls=True, det=True)[
-                                0
-                            ]
-                        else:
-                            print(
-                                "The size of", Imgpath, "is too small to be recognised"
-                            )
-                            self.result_dic = None
-
-                    # 结果保存
-                    if self.result_dic is None or len(self.result_dic) == 0:
-                        print("Can not recognise file", Imgpath)
-                        pass
-                    else:
-                        strs = ""
-                        for res in self.result_dic:
-                            chars = res[1][0]
-                            cond = res[1][1]
-                            posi = res[0]
-                            strs += (
-                                "Transcription: "
-                                + chars
-                                + " Probability: "
-                                + str(cond)
-                                + " Location: "
-                                + json.dumps(posi)
-                                + "\n"
-                            )
-                        # Sending large amounts of data repeatedly through pyqtSignal may affect the program efficiency
-                        self.listValue.emit(strs)
-                        self.mainThread.result_dic = self.result_dic
-                        self.mainThread.filePath = Imgpath
-                        # 保存
-                        self.mainThread.saveFile(mode="Auto")
-                    findex += 1
-                    self.progressBarValue.emit(findex)
-                else:
+            for Imgpath, result_dic in self.pipeline.run():
+                if self.handle != 0:
+                    self.pipeline.stop()
                     break
+                self.listValue.emit(Imgpath)
+
+                # 结果保存
+                if result_dic is None or len(result_dic) == 0:
+                    print("Can not recognise file", Imgpath)
+                else:
+                    strs = ""
+                    for res in result_dic:
+                        chars = res[1][0]
+                        cond = res[1][1]
+                        posi = res[0]
+                        strs += (
+                            "Transcription: "
+                            + chars
+                            + " Probability: "
+                            + str(cond)
+                            + " Location: "
+                            + json.dumps(posi)
+                            + "\n"
+                        )
+                    # Sending large amounts of data repeatedly through pyqtSignal may affect the program efficiency
+                    self.listValue.emit(strs)
+                    # the main thread is the only writer of the label files
+                    self.resultValue.emit(Imgpath, result_dic)
+                findex += 1
+                self.progressBarValue.emit(findex)
             self.endsignal.emit(0, "readAll")
             self.exec()
         except Exception as e:
@@ -124,6 +111,7 @@ class AutoDialog(QDialog):
         self.thread_1 = Worker(self.ocr, self.mImgList, self.parent, "paddle")
         self.thread_1.progressBarValue.connect(self.handleProgressBarSingal)
         self.thread_1.listValue.connect(self.handleListWidgetSingal)
+        self.thread_1.resultValue.connect(self.handleResultSignal)
         self.thread_1.endsignal.connect(self.handleEndsignalSignal)
         self.time_start = time.time()  # save start time
 
@@ -141,6 +129,9 @@ class AutoDialog(QDialog):
         ]  # Remove microseconds
         self.setWindowTitle("PPOCRLabel  --  " + f"Time Left: {time_left}")  # show
 
+    def handleResultSignal(self, imgPath, result):
+        self.parent.saveAutoResult(imgPath, result)
+
     def handleListWidgetSingal(self, i):
         self.listWidget.addItem(i)
         titem = self.listWidget.item(self.listWidget.count() - 1)
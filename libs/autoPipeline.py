@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from libs.utils import (
+    DEFAULT_REC_BATCH_NUM,
+    batch_recognize,
+    get_rotate_crop_image,
+    sorted_boxes,
+)
+
+MIN_IMAGE_SIZE = 32  # images this small are skipped, as before
+
+
+def decodeFile(path):
+    try:
+        return cv2.imdecode(np.fromfile(path, dtype=np.uint8), 1)
+    except Exception as e:
+        print("Can not read file", path, e)
+        return None
+
+
+class AutoLabelPipeline(object):
+    """
+    Staged auto recognition over a list of images.
+
+    A thread pool decodes images ahead of the model, decoded images wait in a
+    bounded queue, and every batch of images gets one detection call per
+    image followed by width-sorted recognition batches of recBatchNum crops
+    over all their text boxes. run() yields (image path, result) in input
+    order, result is a list of [box, (text, score)] like PaddleOCR.ocr(), or
+    None when nothing could be recognised. The pipeline has no Qt dependency.
+    """
+
+    def __init__(
+        self,
+        ocr,
+        imgPaths,
+        batchSize=8,
+        decodeWorkers=None,
+        queueSize=None,
+        recBatchNum=DEFAULT_REC_BATCH_NUM,
+    ):
+        self.ocr = ocr
+        self.imgPaths = list(imgPaths or [])
+        self.batchSize = max(1, batchSize)
+        self.decodeWorkers = decodeWorkers or os.cpu_count() or 1
+        # bounds the number of decoded images held in memory
+        self.queueSize = queueSize or 2 * self.batchSize
+        self.recBatchNum = recBatchNum
+        self.dropScore = getattr(ocr, "drop_score", 0.5)
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+
+    def run(self):
+        self._stopped = False
+        executor = ThreadPoolExecutor(max_workers=self.decodeWorkers)
+        decoded = queue.Queue(maxsize=self.queueSize)
+
+        def produce():
+            for path in self.imgPaths:
+                if self._stopped:
+                    break
+                decoded.put((path, executor.submit(decodeFile, path)))
+            decoded.put(None)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            finished = False
+            while not finished and not self._stopped:
+                batch = []
+                while len(batch) < self.batchSize:
+                    item = decoded.get()
+                    if item is None:
+                        finished = True
+                        break
+                    batch.append(item)
+                for result in self._recognizeBatch(batch):
+                    yield result
+                    if self._stopped:
+                        break
+        finally:
+            self._stopped = True
+            # unblock the producer if it waits on a full queue
+            while producer.is_alive():
+                try:
+                    decoded.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            executor.shutdown(wait=False)
+
+    def recognize(self, crops):
+        """Recognise a list of text crops with batched model calls."""
+        return batch_recognize(self.ocr, crops, self.recBatchNum)
+
+    def _recognizeBatch(self, batch):
+        results = {}
+        crops, owners = [], []
+        for path, future in batch:
+            img = future.result()
+            if img is None:
+                results[path] = None
+                continue
+            h, w = img.shape[:2]
+            if h <= MIN_IMAGE_SIZE or w <= MIN_IMAGE_SIZE:
+                print("The size of", path, "is too small to be recognised")
+                results[path] = None
+                continue
+            boxes = self.ocr.ocr(img, det=True, rec=False, cls=False)[0]
+            results[path] = []
+            if not boxes:
+                continue
+            for box in sorted_boxes(boxes):
+                crop = get_rotate_crop_image(img, np.array(box, np.float32))
+                if crop is None:
+                    continue
+                crops.append(crop)
+                owners.append((path, box))
+
+        for (path, box), (text, score) in zip(owners, self.recognize(crops)):
+            if score >= self.dropScore:
+                results[path].append([box, (text, score)])
+
+        for path, _ in batch:
+            yield path, results[path]
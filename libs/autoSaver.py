@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import traceback
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+AUTOSAVE_DELAY = 0.5  # seconds a save waits for newer saves of the same file
+
+
+class AutoSaveScheduler(QObject):
+    """
+    Writes annotation files on a worker thread.
+
+    schedule() queues a write under a key, usually the file it writes. The
+    write waits AUTOSAVE_DELAY seconds, a newer write under the same key
+    replaces it and restarts the wait, so a burst of edits on one image costs
+    one write. Writes run in the order their keys were last scheduled.
+    flush() writes everything pending at once and waits for it, call it
+    before reading the files back. Writes must capture their data when
+    scheduled, they run without the GUI.
+    """
+
+    # pending writes, writes done, writes merged into a newer one, failed writes
+    metricsChanged = pyqtSignal(int, int, int, int)
+
+    def __init__(self, delay=AUTOSAVE_DELAY):
+        super(AutoSaveScheduler, self).__init__()
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._pending = {}  # key -> (due time, func, args)
+        self._running = 0
+        self._flushing = 0
+        self._stopped = False
+        self.written = 0
+        self.merged = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def schedule(self, key, func, *args):
+        with self._cond:
+            if self._pending.pop(key, None) is not None:
+                self.merged += 1
+            self._pending[key] = (time.monotonic() + self.delay, func, args)
+            self._cond.notify_all()
+        self._emitMetrics()
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending) + self._running
+
+    def _emitMetrics(self):
+        with self._cond:
+            metrics = (
+                len(self._pending) + self._running,
+                self.written,
+                self.merged,
+                self.failed,
+            )
+        self.metricsChanged.emit(*metrics)
+
+    def _takeDue(self):
+        while True:
+            if self._stopped and not self._pending:
+                return None
+            now = time.monotonic()
+            due = [
+                key
+                for key, (dueTime, _, _) in self._pending.items()
+                if self._flushing or dueTime <= now
+            ]
+            if due:
+                tasks = [self._pending.pop(key) for key in due]
+                self._running = len(tasks)
+                return tasks
+            if self._pending:
+                self._cond.wait(min(t for t, _, _ in self._pending.values()) - now)
+            else:
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                tasks = self._takeDue()
+            if tasks is None:
+                return
+            for _, func, args in tasks:
+                try:
+                    func(*args)
+                    failed = False
+                except Exception:
+                    traceback.print_exc()
+                    failed = True
+                with self._cond:
+                    self._running -= 1
+                    self.written += 1
+                    self.failed += failed
+                    self._cond.notify_all()
+                self._emitMetrics()
+
+    def flush(self):
+        """Write everything pending now and wait until it is done."""
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            while self._pending or self._running:
+                self._cond.wait()
+            self._flushing -= 1
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
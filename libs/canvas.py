@@ -11,12 +11,17 @@
 # CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-import copy
+import time
+from collections import deque
 
-from PyQt5.QtCore import Qt, pyqtSignal, QPointF, QPoint, QRectF
-from PyQt5.QtGui import QPainter, QBrush, QColor, QPixmap, QFontDatabase
+from PyQt5.QtCore import Qt, pyqtSignal, QPointF, QPoint, QRect, QRectF
+from PyQt5.QtGui import QPainter, QBrush, QColor, QPixmap
 from PyQt5.QtWidgets import QWidget, QMenu, QApplication
-from libs.shape import Shape
+from libs.labelFont import labelFont, labelFontMetrics
+from libs.shape import MIN_Y_LABEL, Shape
+from libs.spatialIndex import GridIndex
+from libs.tiledImage import TiledImage
+from libs.undoStack import UndoStack
 from libs.utils import distance
 
 CURSOR_DEFAULT = Qt.ArrowCursor
@@ -34,6 +39,8 @@ class Canvas(QWidget):
     selectionChanged = pyqtSignal(list)
     shapeMoved = pyqtSignal()
     drawingPolygon = pyqtSignal(bool)
+    # frames per second and mean paint time in ms, only emitted when showFps is set
+    fpsChanged = pyqtSignal(float, float)
 
     CREATE, EDIT = list(range(2))
     _fill_drawing = False  # draw shadows
@@ -46,8 +53,10 @@ class Canvas(QWidget):
         super(Canvas, self).__init__(*args, **kwargs)
         # Initialise local state.
         self.mode = self.EDIT
+        # grid over the shape bounding boxes for hover hit-testing
+        self.shapeIndex = GridIndex()
         self.shapes = []
-        self.shapesBackups = []
+        self.undoStack = UndoStack()
         self.current = None
         self.selectedShapes = []
         self.selectedShape = None  # save the selected shape here
@@ -96,11 +105,38 @@ class Canvas(QWidget):
 
         # initialisation for panning
         self.pan_initial_pos = QPoint()
+        self.panning = False
+
+        # frame timing for the FPS counter
+        self.showFps = False
+        self._frameTimes = deque(maxlen=120)  # (end time, paint duration)
+        self._fpsReported = 0.0
 
         # lockedshapes related
         self.lockedShapes = []
         self.isInTheSameImage = False
 
+    @property
+    def shapes(self):
+        return self._shapes
+
+    @shapes.setter
+    def shapes(self, shapes):
+        # a new list, rebuild the index on the next lookup
+        self._shapes = shapes
+        self._shapeIndexDirty = True
+
+    def shapesAt(self, pos):
+        """Visible shapes whose bounding box is near pos, topmost first."""
+        # in place list changes made outside of the canvas change the length
+        if self._shapeIndexDirty or len(self.shapeIndex) != len(self.shapes):
+            self.shapeIndex.rebuild(self.shapes)
+            self._shapeIndexDirty = False
+        near = self.shapeIndex.query(pos, self.epsilon)
+        if not near:
+            return []
+        return [s for s in reversed(self.shapes) if id(s) in near and self.isVisible(s)]
+
     def setDrawingColor(self, qColor):
         self.drawingLineColor = qColor
         self.drawingRectColor = qColor
@@ -139,7 +175,7 @@ class Canvas(QWidget):
                 self.drawingPolygon.emit(False)
                 self.update()
         self.prevPoint = QPointF()
-        self.repaint()
+        self.update()
 
     def unHighlight(self):
         if self.hShape:
@@ -206,47 +242,53 @@ class Canvas(QWidget):
                 self.current.highlightClear()
             else:
                 self.prevPoint = pos
-            self.repaint()
+            # the cross hair spans the whole image
+            self.update()
             return
 
         # Polygon copy moving.
         if Qt.RightButton & ev.buttons():
             if self.selectedShapesCopy and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
+                oldRects = self.shapeRects(self.selectedShapesCopy)
                 self.boundedMoveShape(self.selectedShapesCopy, pos)
-                self.repaint()
+                self.updateShapes(self.selectedShapesCopy, oldRects)
+                self.movingShape = True
             elif self.selectedShapes:
                 self.selectedShapesCopy = [s.copy() for s in self.selectedShapes]
-                self.repaint()
+                self.updateShapes(self.selectedShapesCopy)
             return
 
         # Polygon/Vertex moving.
         if Qt.LeftButton & ev.buttons():
             if self.selectedVertex():
+                oldRects = self.shapeRects([self.hShape])
                 self.boundedMoveVertex(pos)
                 self.shapeMoved.emit()
-                self.repaint()
                 self.movingShape = True
+                self.updateShapes([self.hShape], oldRects)
             elif self.selectedShapes and self.prevPoint:
                 self.overrideCursor(CURSOR_MOVE)
+                oldRects = self.shapeRects(self.selectedShapes)
                 self.boundedMoveShape(self.selectedShapes, pos)
                 self.shapeMoved.emit()
-                self.repaint()
                 self.movingShape = True
+                self.updateShapes(self.selectedShapes, oldRects)
             else:
-                # pan
+                # pan, the scroll area repaints the exposed strips itself
+                self.panning = True
                 delta_x = pos.x() - self.pan_initial_pos.x()
                 delta_y = pos.y() - self.pan_initial_pos.y()
                 self.scrollRequest.emit(delta_x, Qt.Horizontal)
                 self.scrollRequest.emit(delta_y, Qt.Vertical)
-                self.update()
             return
 
         # Just hovering over the canvas, 2 posibilities:
         # - Highlight shapes
         # - Highlight vertex
         # Update shape/vertex fill and tooltip value accordingly.
-        for shape in reversed([s for s in self.shapes if self.isVisible(s)]):
+        previous = self.hShape
+        for shape in self.shapesAt(pos):
             # Look for a nearby vertex to highlight. If that fails,
             # check if we happen to be inside a shape.
             index = shape.nearestVertex(pos, self.epsilon)
@@ -256,23 +298,21 @@ class Canvas(QWidget):
                 self.hVertex, self.hShape = index, shape
                 shape.highlightVertex(index, shape.MOVE_VERTEX)
                 self.overrideCursor(CURSOR_POINT)
-                self.update()
+                self.updateShapes([shape, previous])
                 break
-            else:
-                for shape in reversed([s for s in self.shapes if self.isVisible(s)]):
-                    if shape.containsPoint(pos):
-                        if self.selectedVertex():
-                            self.hShape.highlightClear()
-                        self.hVertex, self.hShape = None, shape
-                        self.overrideCursor(CURSOR_GRAB)
-                        self.update()
-                        break
-                else:  # Nothing found, clear highlights, reset state.
-                    if self.hShape:
-                        self.hShape.highlightClear()
-                        self.update()
-                    self.hVertex, self.hShape = None, None
-                    self.overrideCursor(CURSOR_DEFAULT)
+            elif shape.containsPoint(pos):
+                if self.selectedVertex():
+                    self.hShape.highlightClear()
+                self.hVertex, self.hShape = None, shape
+                self.overrideCursor(CURSOR_GRAB)
+                self.updateShapes([shape, previous])
+                break
+        else:  # Nothing found, clear highlights, reset state.
+            if self.hShape:
+                self.hShape.highlightClear()
+                self.updateShapes([self.hShape])
+            self.hVertex, self.hShape = None, None
+            self.overrideCursor(CURSOR_DEFAULT)
 
     def mousePressEvent(self, ev):
         pos = self.transformPos(ev.pos())
@@ -319,16 +359,9 @@ class Canvas(QWidget):
                 self.menu.exec_(self.mapToGlobal(ev.pos()))
         
         elif ev.button() == Qt.LeftButton:
-            if self.selectedShapes and self.shapesBackups:
-                # 检查移动的形状
-                try:
-                    index = self.shapes.index(self.selectedShape)
-                    if len(self.shapesBackups[-1]) > index:
-                        if self.shapesBackups[-1][index].points != self.shapes[index].points:
-                            self.storeShapes()
-                            self.shapeMoved.emit()
-                except (IndexError, ValueError):
-                    pass
+            # 记录拖动顶点或形状造成的修改
+            if self.selectedShapes and self.storeShapes():
+                self.shapeMoved.emit()
 
             if self.drawing():
                 if self.current:
@@ -355,8 +388,12 @@ class Canvas(QWidget):
                     self.overrideCursor(CURSOR_GRAB)
                 else:
                     self.restoreCursor()
-                
+
+            if self.movingShape or self.panning:
+                # the fast frames were drawn without antialiasing
+                self.update()
             self.movingShape = False
+            self.panning = False
 
     def endMove(self, copy=False):
         assert self.selectedShapes and self.selectedShapesCopy
@@ -365,13 +402,15 @@ class Canvas(QWidget):
             for i, shape in enumerate(self.selectedShapesCopy):
                 shape.idx = len(self.shapes)  # add current box index
                 self.shapes.append(shape)
+                self.shapeIndex.insert(shape)
                 self.selectedShapes[i].selected = False
                 self.selectedShapes[i] = shape
         else:
             for i, shape in enumerate(self.selectedShapesCopy):
                 self.selectedShapes[i].points = shape.points
+                self.shapeIndex.update(self.selectedShapes[i])
         self.selectedShapesCopy = []
-        self.repaint()
+        self.update()
         self.storeShapes()
         return True
 
@@ -381,7 +420,7 @@ class Canvas(QWidget):
             # Only hide other shapes if there is a current selection.
             # Otherwise the user will not be able to select a shape.
             self.setHiding(True)
-            self.repaint()
+            self.update()
 
     def handleDrawing(self, pos):
         """Handle drawing of shapes"""
@@ -522,6 +561,7 @@ class Canvas(QWidget):
 
         else:
             shape.moveVertexBy(index, shiftPos)
+        self.shapeIndex.update(shape)
 
     def boundedMoveShape(self, shapes, pos):
         if type(shapes).__name__ != "list":
@@ -547,6 +587,7 @@ class Canvas(QWidget):
             for shape in shapes:
                 shape.moveBy(dp)
                 shape.close()
+                self.shapeIndex.update(shape)
             self.prevPoint = pos
             return True
         return False
@@ -570,6 +611,7 @@ class Canvas(QWidget):
             for shape in self.selectedShapes:
                 if shape in self.shapes:
                     self.shapes.remove(shape)
+                    self.shapeIndex.remove(shape)
                     deleted.append(shape)
             self.selectedShapes = []
             self.update()
@@ -588,13 +630,17 @@ class Canvas(QWidget):
 
     def storeShapes(self):
         """
-        存储形状的备份
+        记录形状的修改到撤销栈, 没有修改时返回 False
         """
-        shapesBackup = []
-        shapesBackup = copy.deepcopy(self.shapes)
-        if len(self.shapesBackups) >= 10:
-            self.shapesBackups = self.shapesBackups[-9:]
-        self.shapesBackups.append(shapesBackup)
+        return self.undoStack.record(self.shapes)
+
+    @property
+    def isShapeRestorable(self):
+        return self.undoStack.canUndo()
+
+    @property
+    def isShapeRedoable(self):
+        return self.undoStack.canRedo()
 
     def copySelectedShape(self):
         if self.selectedShapes:
@@ -614,25 +660,47 @@ class Canvas(QWidget):
             if not self.boundedMoveShape(shape, point - offset):
                 self.boundedMoveShape(shape, point + offset)
 
+    def fastRender(self):
+        """Drop the expensive render hints while a shape is dragged or the view is panned."""
+        return self.movingShape or self.panning
+
     def paintEvent(self, event):
         if not self.pixmap:
             return super(Canvas, self).paintEvent(event)
 
+        start = time.perf_counter()
         p = self._painter
         p.begin(self)
-        p.setRenderHint(QPainter.Antialiasing)
-        p.setRenderHint(QPainter.HighQualityAntialiasing)
-        p.setRenderHint(QPainter.SmoothPixmapTransform)
+        if not self.fastRender():
+            p.setRenderHint(QPainter.Antialiasing)
+            p.setRenderHint(QPainter.HighQualityAntialiasing)
+            p.setRenderHint(QPainter.SmoothPixmapTransform)
 
         p.scale(self.scale, self.scale)
         p.translate(self.offsetToCenter())
 
-        p.drawPixmap(0, 0, self.pixmap)
+        # only the part of the image inside the invalidated region is drawn
+        exposed = self.toImageRect(event.rect())
+        if isinstance(self.pixmap, TiledImage):
+            # large scans, only the tiles of the current zoom level and viewport
+            self.pixmap.paint(p, exposed, self.scale)
+        else:
+            source = exposed.intersected(QRectF(self.pixmap.rect()))
+            p.drawPixmap(source, self.pixmap, source)
+
+        # adaptive BBOX label & index font size
+        h, w = self.pixmap.size().height(), self.pixmap.size().width()
+        fontszie = int(max(h, w) / 48)
+        for s in self.shapes:
+            s.fontsize = fontszie
 
         # 绘制所有形状
         for shape in self.shapes:
-            if (shape.selected or not self._hideBackround) and \
-               self.isVisible(shape):
+            if (
+                (shape.selected or not self._hideBackround)
+                and self.isVisible(shape)
+                and self.shapePaintRect(shape).intersects(exposed)
+            ):
                 shape.paint(p)
                 # 在框的上方绘制文本
                 if shape.label:  # 如果有标签文本就显示
@@ -705,14 +773,75 @@ class Canvas(QWidget):
             pal.setColor(self.backgroundRole(), QColor(232, 232, 232, 255))
             self.setPalette(pal)
 
-        # adaptive BBOX label & index font size
-        if self.pixmap:
-            h, w = self.pixmap.size().height(), self.pixmap.size().width()
-            fontszie = int(max(h, w) / 48)
-            for s in self.shapes:
-                s.fontsize = fontszie
-
         p.end()
+        if self.showFps:
+            self.recordFrame(time.perf_counter() - start)
+
+    def recordFrame(self, duration):
+        now = time.perf_counter()
+        self._frameTimes.append((now, duration))
+        # report twice a second, the counter must not cause extra repaints
+        if now - self._fpsReported < 0.5:
+            return
+        self._fpsReported = now
+        recent = [(t, d) for t, d in self._frameTimes if now - t <= 1.0]
+        span = now - recent[0][0]
+        fps = (len(recent) - 1) / span if span > 0 else 0.0
+        paintMs = sum(d for _, d in recent) / len(recent) * 1000
+        self.fpsChanged.emit(fps, paintMs)
+
+    def toImageRect(self, rect):
+        """Map a rect in widget coordinates to image coordinates."""
+        rect = QRectF(rect)
+        return QRectF(
+            rect.topLeft() / self.scale - self.offsetToCenter(), rect.size() / self.scale
+        )
+
+    def toWidgetRect(self, rect):
+        """Map a rect in image coordinates to the widget pixels covering it."""
+        return (
+            QRectF((rect.topLeft() + self.offsetToCenter()) * self.scale, rect.size() * self.scale)
+            .toAlignedRect()
+            .adjusted(-1, -1, 1, 1)
+        )
+
+    def shapePaintRect(self, shape):
+        """Image area painted for a shape: outline, vertices and labels."""
+        if not shape.points:
+            return QRectF()
+        rect = shape.boundingRect()
+        # a highlighted vertex is drawn 4 times point_size wide
+        d = 2 * shape.point_size / self.scale + 1
+        rect.adjust(-d, -d, d, d)
+        if shape.label:
+            # the label of paintShapeLabel, centered above the box
+            fm = labelFontMetrics(10)
+            w = fm.width(shape.label) + 6
+            h = fm.height() + 9
+            center = rect.center().x()
+            rect = rect.united(QRectF(center - w / 2, rect.top() - h, w, h))
+        if shape.paintLabel or shape.paintIdx:
+            # the label and index Shape.paint draws at the top left corner
+            fm = labelFontMetrics(shape.fontsize, True, shape.font_family)
+            w = fm.width(shape.label or "") + fm.width(str(shape.idx)) + 2
+            rect = rect.united(
+                QRectF(rect.left(), rect.top() - fm.height(), w, fm.height() + MIN_Y_LABEL)
+            )
+        return rect
+
+    def shapeRects(self, shapes):
+        return [self.shapePaintRect(s) for s in shapes if s is not None]
+
+    def updateShapes(self, shapes, oldRects=()):
+        """
+        Schedule a repaint of the area of shapes, and of oldRects, the areas
+        they covered before they moved. update() calls are merged by Qt.
+        """
+        region = QRect()
+        for rect in list(oldRects) + self.shapeRects(shapes):
+            region = region.united(self.toWidgetRect(rect))
+        if not region.isEmpty():
+            self.update(region)
 
     def fillDrawing(self):
         return self._fill_drawing
@@ -746,6 +875,7 @@ class Canvas(QWidget):
         self.current.close()
         self.current.idx = len(self.shapes)  # add current box index
         self.shapes.append(self.current)
+        self.shapeIndex.insert(self.current)
         self.current = None
         self.setHiding(False)
         self.newShape.emit()
@@ -841,11 +971,25 @@ class Canvas(QWidget):
         """
         恢复到上一个状态
         """
-        if not self.shapesBackups:
+        # edits made outside the canvas, e.g. relabeling, are undone first
+        self.storeShapes()
+        if not self.isShapeRestorable:
+            return
+        self.setUndoneShapes(self.undoStack.undo())
+
+    def redoShape(self):
+        """
+        重做上一次撤销的修改
+        """
+        if not self.isShapeRedoable:
             return
-        shapes = self.shapesBackups[-1]
+        self.setUndoneShapes(self.undoStack.redo())
+
+    def setUndoneShapes(self, shapes):
         self.shapes = shapes
         self.selectedShapes = []
+        self.hShape = None
+        self.hVertex = None
         for shape in self.shapes:
             shape.selected = False
         self.update()
@@ -868,20 +1012,18 @@ class Canvas(QWidget):
             elif direction == "Down" and not self.moveOutOfBound(QPointF(0, 1.0)):
                 # print("move Down one pixel")
                 self.move_points(QPointF(0, 1.0))
-        shapesBackup = []
-        shapesBackup = copy.deepcopy(self.shapes)
-        self.shapesBackups.append(shapesBackup)
+        self.storeShapes()
         self.shapeMoved.emit()
-        self.repaint()
+        self.update()
 
     def move_points(self, p: QPointF):
+        # go through the shape so that its cached geometry is dropped, += on
+        # the points would also move the points shared with a copied shape
         if self.shape_move_index is None:
-            self.selectedShape.points[0] += p
-            self.selectedShape.points[1] += p
-            self.selectedShape.points[2] += p
-            self.selectedShape.points[3] += p
+            self.selectedShape.moveBy(p)
         else:
-            self.selectedShape.points[self.shape_move_index] += p
+            self.selectedShape.moveVertexBy(self.shape_move_index, p)
+        self.shapeIndex.update(self.selectedShape)
 
     def moveOutOfBound(self, step):
         points = [p1 + p2 for p1, p2 in zip(self.selectedShape.points, [step] * 4)]
@@ -899,6 +1041,7 @@ class Canvas(QWidget):
     def undoLastLine(self):
         assert self.shapes
         self.current = self.shapes.pop()
+        self.shapeIndex.remove(self.current)
         self.current.setOpen()
         self.line.points = [self.current[-1], self.current[0]]
         self.drawingPolygon.emit(True)
@@ -912,11 +1055,12 @@ class Canvas(QWidget):
         else:
             self.current = None
             self.drawingPolygon.emit(False)
-        self.repaint()
+        self.update()
 
     def resetAllLines(self):
         assert self.shapes
         self.current = self.shapes.pop()
+        self.shapeIndex.remove(self.current)
         self.current.setOpen()
         self.line.points = [self.current[-1], self.current[0]]
         self.drawingPolygon.emit(True)
@@ -925,26 +1069,28 @@ class Canvas(QWidget):
         self.update()
 
     def loadPixmap(self, pixmap):
+        """pixmap is a QPixmap, or a TiledImage for very large images."""
         self.pixmap = pixmap
         self.shapes = []
-        self.repaint()
+        self.update()
 
     def loadShapes(self, shapes, replace=True):
         if replace:
             self.shapes = list(shapes)
         else:
             self.shapes.extend(shapes)
+        self.shapeIndex.rebuild(self.shapes)
+        self._shapeIndexDirty = False
         self.current = None
         self.hShape = None
         self.hVertex = None
         # self.hEdge = None
         self.storeShapes()
         self.updateShapeIndex()
-        self.repaint()
 
     def setShapeVisible(self, shape, value):
         self.visible[shape] = value
-        self.repaint()
+        self.updateShapes([shape])
 
     def currentCursor(self):
         cursor = QApplication.overrideCursor()
@@ -966,7 +1112,7 @@ class Canvas(QWidget):
         self.restoreCursor()
         self.pixmap = None
         self.update()
-        self.shapesBackups = []
+        self.undoStack.reset()
 
     def setDrawingShapeToSquare(self, status):
         self.drawSquare = status
@@ -982,29 +1128,10 @@ class Canvas(QWidget):
         xmax = max(p.x() for p in points)
         
         # 设置字体
-        font = painter.font()
-        font_families = [
-            "Estrangelo Edessa",
-            "Noto Sans Syriac",
-            "East Syriac Adiabene",
-            "Serto Jerusalem",
-            "Microsoft Sans Serif",
-            "Arial Unicode MS",
-            "Arial"
-        ]
-        
-        db = QFontDatabase()
-        available_families = db.families()
-        for family in font_families:
-            if family in available_families:
-                font.setFamily(family)
-                break
-            
-        font.setPointSize(10)  # 调整字体大小
-        painter.setFont(font)
-        
+        painter.setFont(labelFont(10))
+
         # 获取文本度量
-        fm = painter.fontMetrics()
+        fm = labelFontMetrics(10)
         text_width = fm.width(shape.label)
         text_height = fm.height()
         
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 from PyQt5.QtCore import QModelIndex
 from PyQt5.QtWidgets import QListWidget
-from PyQt5.QtGui import QFont, QFontDatabase
+from libs.labelFont import labelFont
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QAbstractItemView, QListView
 
@@ -12,29 +12,8 @@ class EditInList(QListWidget):
         super(EditInList, self).__init__()
         self.edited_item = None
         
-        # 设置字体
-        font = QFont()
-        # 尝试使用支持叙利亚文的字体
-        font_families = [
-            "Estrangelo Edessa",
-            "Noto Sans Syriac",
-            "East Syriac Adiabene",
-            "Serto Jerusalem",
-            "Microsoft Sans Serif",
-            "Arial Unicode MS",
-            "Arial"
-        ]
-        
-        # 修正字体检查方法
-        db = QFontDatabase()
-        available_families = db.families()
-        for family in font_families:
-            if family in available_families:
-                font.setFamily(family)
-                break
-        
-        font.setPointSize(12)
-        self.setFont(font)
+        # 设置字体, 使用支持叙利亚文的字体
+        self.setFont(labelFont(12))
         
         # 设置文本方向为从右到左
         self.setLayoutDirection(Qt.RightToLeft)
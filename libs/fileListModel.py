@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import os
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+from libs.utils import newIcon
+
+
+class FileListModel(QAbstractListModel):
+    """
+    Model of the file list dock.
+
+    Rows are the image paths of a list shared with the main window, nothing is
+    allocated per image: the view asks only for the visible rows, and the done
+    or close icon of a row is decided by isDone(path) when it is painted.
+    """
+
+    def __init__(self, isDone, parent=None):
+        super(FileListModel, self).__init__(parent)
+        self.isDone = isDone
+        self.images = []
+        self.doneIcon = newIcon("done")
+        self.closeIcon = newIcon("close")
+
+    def setImages(self, images):
+        self.beginResetModel()
+        self.images = images
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.images)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.images):
+            return None
+        path = self.images[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(path)
+        if role == Qt.DecorationRole:
+            return self.doneIcon if self.isDone(path) else self.closeIcon
+        if role == Qt.ToolTipRole:
+            return path
+        return None
+
+    def path(self, row):
+        return self.images[row]
+
+    def refreshRow(self, row):
+        """Repaint one row after its file state changed."""
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def takeRow(self, row):
+        """Remove a row from the model and the shared list, return its path."""
+        self.beginRemoveRows(QModelIndex(), row, row)
+        path = self.images.pop(row)
+        self.endRemoveRows()
+        return path
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PyQt5.QtGui import QImage
+
+DEFAULT_CACHE_MB = 512
+# QImage.Format_BGR888 was added in Qt 5.14
+HAVE_BGR888 = hasattr(QImage, "Format_BGR888")
+
+
+def decodeImage(path):
+    """
+    Decode an image file into a QImage.
+
+    Return (image, buffer): the QImage is a view over buffer, so the caller
+    has to keep buffer alive as long as the image is used. A file that can
+    not be decoded gives (QImage(), None).
+    """
+    cvimg = cv2.imdecode(np.fromfile(path, dtype=np.uint8), 1)
+    if cvimg is None:
+        return QImage(), None
+    height, width, _ = cvimg.shape
+    if HAVE_BGR888:
+        # wrap the decoded BGR buffer as is, no RGB copy
+        fmt = QImage.Format_BGR888
+    else:
+        # Qt < 5.14, swap the channels in place instead of allocating a copy
+        cv2.cvtColor(cvimg, cv2.COLOR_BGR2RGB, dst=cvimg)
+        fmt = QImage.Format_RGB888
+    image = QImage(cvimg.data, width, height, cvimg.strides[0], fmt)
+    return image, cvimg
+
+
+class ImageCache(object):
+    """
+    LRU cache of decoded images, bounded by the size of the pixel buffers.
+
+    prefetch() decodes images on a thread pool so that loadFile only has to
+    pick up a ready QImage when the user moves to the next/previous image.
+    Entries are keyed by path, mtime and size, a rotated or replaced file is
+    decoded again.
+    """
+
+    def __init__(self, maxBytes=DEFAULT_CACHE_MB * 1024 * 1024, workers=2):
+        self.maxBytes = maxBytes
+        self._entries = OrderedDict()  # key -> (image, buffer)
+        self._futures = {}  # key -> Future of a running decode
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    @staticmethod
+    def _key(path):
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def load(self, path):
+        """Return (image, buffer) of path, decoding it now if it is not cached."""
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            future = self._futures.get(key)
+        if future is not None and not future.cancelled():
+            # wait for the prefetch instead of decoding the same file twice
+            return future.result()
+        return self._decode(key)
+
+    def prefetch(self, paths):
+        """Decode paths in the background, dropping queued stale requests."""
+        keys = []
+        for path in paths:
+            try:
+                keys.append(self._key(path))
+            except OSError:
+                continue
+        with self._lock:
+            for key, future in list(self._futures.items()):
+                if key not in keys and future.cancel():
+                    del self._futures[key]
+            for key in keys:
+                if key in self._entries or key in self._futures:
+                    continue
+                self._futures[key] = self._executor.submit(self._decode, key)
+
+    def _decode(self, key):
+        try:
+            entry = decodeImage(key[0])
+        finally:
+            with self._lock:
+                self._futures.pop(key, None)
+        if entry[1] is not None:
+            with self._lock:
+                self._put(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        if key in self._entries:
+            return
+        self._entries[key] = entry
+        self._bytes += entry[1].nbytes
+        # always keep the newest entry, even if it alone exceeds the budget
+        while self._bytes > self.maxBytes and len(self._entries) > 1:
+            _, (_, buffer) = self._entries.popitem(last=False)
+            self._bytes -= buffer.nbytes
+
+    def forget(self, path):
+        """Drop the decoded image of a deleted file."""
+        with self._lock:
+            for key in [k for k in self._futures if k[0] == path]:
+                self._futures.pop(key).cancel()
+            for key in [k for k in self._entries if k[0] == path]:
+                _, buffer = self._entries.pop(key)
+                self._bytes -= buffer.nbytes
+
+    def clear(self):
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+            self._entries.clear()
+            self._bytes = 0
+
+    def shutdown(self):
+        self.clear()
+        self._executor.shutdown(wait=False)
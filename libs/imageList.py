@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+
+class ImageList(list):
+    """
+    List of image paths with constant time index() and membership tests.
+
+    A path -> index dict is built on the first lookup and dropped by every
+    method that changes the list, so lookups stay O(1) while navigating and
+    saving, and a deletion costs one rebuild. Only the first position of a
+    duplicated path is recorded, like list.index().
+    """
+
+    def __init__(self, iterable=()):
+        super(ImageList, self).__init__(iterable)
+        self._positions = None
+
+    def _lookup(self):
+        if self._positions is None:
+            positions = {}
+            for i, path in enumerate(self):
+                positions.setdefault(path, i)
+            self._positions = positions
+        return self._positions
+
+    def index(self, path, *args):
+        if args:
+            return super(ImageList, self).index(path, *args)
+        try:
+            return self._lookup()[path]
+        except (KeyError, TypeError):
+            raise ValueError("%r is not in list" % (path,))
+
+    def __contains__(self, path):
+        try:
+            return path in self._lookup()
+        except TypeError:
+            return False
+
+
+def _invalidating(name):
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        self._positions = None
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(ImageList, _name, _invalidating(_name))
+del _name
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from PyQt5.QtGui import QImageReader
+
+from libs.utils import natural_sort
+
+_extensions = None
+_scans = {}  # (folder, naturalSort) -> (folder mtime_ns, sorted image paths)
+_lock = threading.Lock()
+
+
+def imageExtensions():
+    """Extensions Qt can read, queried once."""
+    global _extensions
+    if _extensions is None:
+        _extensions = tuple(
+            ".%s" % fmt.data().decode("ascii").lower()
+            for fmt in QImageReader.supportedImageFormats()
+        )
+    return _extensions
+
+
+def scanImages(folderPath, naturalSort=True):
+    """
+    Sorted absolute paths of the images in folderPath.
+
+    The result is cached with the mtime of the folder, scanning an unchanged
+    folder again is a single stat. A copy is returned.
+    """
+    folderPath = os.path.abspath(folderPath)
+    mtime = os.stat(folderPath).st_mtime_ns
+    key = (folderPath, naturalSort)
+    with _lock:
+        cached = _scans.get(key)
+        if cached is not None and cached[0] == mtime:
+            return list(cached[1])
+
+    extensions = imageExtensions()
+    with os.scandir(folderPath) as it:
+        images = [
+            os.path.join(folderPath, entry.name)
+            for entry in it
+            if entry.name.lower().endswith(extensions)
+        ]
+    if naturalSort:
+        natural_sort(images, key=lambda x: x.lower())
+    else:
+        images.sort()
+    with _lock:
+        _scans[key] = (mtime, images)
+    return list(images)
+
+
+def forgetImage(path):
+    """Remove a deleted image from the cached scans of its folder."""
+    path = os.path.abspath(path)
+    folderPath = os.path.dirname(path)
+    try:
+        mtime = os.stat(folderPath).st_mtime_ns
+    except OSError:
+        mtime = None
+    with _lock:
+        for key, (_, images) in list(_scans.items()):
+            if key[0] != folderPath:
+                continue
+            if path in images:
+                images.remove(path)
+            # the deletion changed the folder mtime, the patched list is current
+            _scans[key] = (mtime, images)
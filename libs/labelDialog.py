@@ -19,6 +19,7 @@ except ImportError:
     from PyQt4.QtCore import *
 
 from libs.utils import newIcon, labelValidator
+from libs.labelFont import labelFont
 
 BB = QDialogButtonBox
 
@@ -28,28 +29,8 @@ class LabelDialog(QDialog):
         super(LabelDialog, self).__init__(parent)
         self.setWindowTitle("输入文本")
         
-        # 设置对话框字体
-        font = QFont()
-        # 尝试使用支持叙利亚文的字体
-        font_families = [
-            "Estrangelo Edessa",
-            "Noto Sans Syriac",
-            "East Syriac Adiabene",
-            "Serto Jerusalem",
-            "Microsoft Sans Serif",
-            "Arial Unicode MS",
-            "Arial"
-        ]
-        
-        # 修正字体检查方法
-        db = QFontDatabase()
-        available_families = db.families()
-        for family in font_families:
-            if family in available_families:
-                font.setFamily(family)
-                break
-        
-        font.setPointSize(12)
+        # 设置对话框字体, 使用支持叙利亚文的字体
+        font = labelFont(12)
         self.setFont(font)
         
         # 设置文本框
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from PyQt5.QtGui import QFont, QFontDatabase, QFontMetrics
+
+# 支持叙利亚文/阿拉伯文的字体, 按优先级排列
+LABEL_FONT_FAMILIES = [
+    "Estrangelo Edessa",
+    "Noto Sans Syriac",
+    "East Syriac Adiabene",
+    "Serto Jerusalem",
+    "Microsoft Sans Serif",
+    "Arial Unicode MS",
+    "Arial",
+]
+
+_labelFamily = False  # False until resolved, None if no family is installed
+_fonts = {}  # (pointSize, bold, family) -> QFont
+_metrics = {}  # (pointSize, bold, family) -> QFontMetrics
+
+
+def labelFontFamily():
+    """
+    First installed family of LABEL_FONT_FAMILIES, or None.
+    The font database is only walked once per application.
+    """
+    global _labelFamily
+    if _labelFamily is False:
+        available = set(QFontDatabase().families())
+        _labelFamily = next((f for f in LABEL_FONT_FAMILIES if f in available), None)
+    return _labelFamily
+
+
+def labelFont(pointSize=12, bold=False, family=None):
+    """Shared label font of the given size, family defaults to labelFontFamily()."""
+    key = (pointSize, bold, family)
+    font = _fonts.get(key)
+    if font is None:
+        font = QFont()
+        family = family or labelFontFamily()
+        if family is not None:
+            font.setFamily(family)
+        font.setPointSize(pointSize)
+        font.setBold(bold)
+        _fonts[key] = font
+    # QFont is implicitly shared, the copy is cheap and keeps the cache intact
+    return QFont(font)
+
+
+def labelFontMetrics(pointSize=12, bold=False, family=None):
+    key = (pointSize, bold, family)
+    metrics = _metrics.get(key)
+    if metrics is None:
+        metrics = QFontMetrics(labelFont(pointSize, bold, family))
+        _metrics[key] = metrics
+    return metrics
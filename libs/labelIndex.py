@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+
+from libs.atomicFile import atomicWrite, isKeyValueLine
+from libs.constants import DEFAULT_ENCODING
+
+LABEL_FILE_NAME = "Label.txt"
+LABEL_LOG_SUFFIX = ".log"
+# compact the append-only log into Label.txt once it grows past this size
+LOG_COMPACT_SIZE = 8 * 1024 * 1024
+
+
+def parseLabelLine(line):
+    """
+    Parse one "x1,y1,x2,y2,label" line of a Label.txt block, the fields may
+    also be tab separated. Return (x1, y1, x2, y2, label), or None if the
+    line is malformed.
+    """
+    # a comma separated line may have a tab in its label
+    for sep in ("\t", ","):
+        parts = [p.strip() for p in line.split(sep)]
+        if len(parts) < 5:
+            continue
+        try:
+            x1, y1, x2, y2 = map(float, parts[:4])
+        except ValueError:
+            continue
+        return x1, y1, x2, y2, parts[4]
+    return None
+
+
+def isLogLine(line):
+    """Whether line is a complete record of Label.txt.log."""
+    try:
+        return isinstance(json.loads(line), dict)
+    except ValueError:
+        return False
+
+
+def isLabelFileLine(line):
+    """
+    Whether line is a complete line of Label.txt, which holds either the
+    "# path" blocks of LabelIndex or the "key\tjson" lines of savePPlabel.
+    """
+    line = line.strip()
+    if not line or line.startswith("# "):
+        return True
+    if "\t" in line and line.split("\t", 1)[1].lstrip().startswith("["):
+        return isKeyValueLine(line)
+    return parseLabelLine(line) is not None
+
+
+class LabelIndex(object):
+    """
+    In-memory index of the "# <image path>" blocks of a Label.txt file.
+
+    The file is parsed once when the directory is opened, after that every
+    lookup is a dict access instead of a scan over the whole file.
+
+    In log mode a save only appends one versioned record for the saved image
+    to Label.txt.log. The log is folded back into Label.txt by a background
+    compaction once it passes LOG_COMPACT_SIZE, and by close().
+
+    update(persist=False) only changes the index in memory, the next persist()
+    writes all such updates at once, e.g. from an autosave thread.
+    """
+
+    def __init__(self, labelPath, logMode=False, compactSize=LOG_COMPACT_SIZE):
+        self.labelPath = os.path.abspath(labelPath)
+        self.logPath = self.labelPath + LABEL_LOG_SUFFIX
+        self.logMode = logMode
+        self.compactSize = compactSize
+        self.blocks = {}  # image path -> list of raw label lines
+        self.version = 0  # version of the latest record in memory
+        self._pending = []  # log records not yet folded into Label.txt
+        self._unlogged = {}  # image path -> log record not written yet
+        self._unsaved = False  # memory differs from Label.txt, without log
+        self._lock = threading.Lock()
+        self._compactLock = threading.Lock()
+        self._compactThread = None
+        self.load()
+
+    def load(self):
+        self.blocks = {}
+        self.version = 0
+        self._pending = []
+        self._unlogged = {}
+        self._unsaved = False
+        if os.path.exists(self.labelPath):
+            with open(self.labelPath, "r", encoding=DEFAULT_ENCODING) as f:
+                current_file = None
+                current_labels = []
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    if line.startswith("# "):
+                        if current_file and current_labels:
+                            self.blocks[current_file] = current_labels
+                        current_file = line[2:].strip()
+                        current_labels = []
+                    elif current_file:
+                        current_labels.append(line)
+                if current_file and current_labels:
+                    self.blocks[current_file] = current_labels
+        self._replayLog()
+
+    def _replayLog(self):
+        """
+        Apply the records of a log left over by an earlier session. A record
+        cut off by a crash is removed from the file, so the next record is
+        not appended to its broken bytes.
+        """
+        if not os.path.exists(self.logPath):
+            return
+        valid = 0  # bytes of the complete records
+        missingNewline = False
+        with open(self.logPath, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # everything before the cut off record is valid
+                    print("Warning: Ignore truncated record in %s" % self.logPath)
+                    break
+                self.version = max(self.version, record["v"])
+                self._setBlock(record["path"], record["lines"])
+                self._pending.append(record)
+                valid += len(line)
+                missingNewline = not line.endswith(b"\n")
+            size = f.seek(0, os.SEEK_END)
+        if valid < size or missingNewline:
+            with open(self.logPath, "r+b") as f:
+                f.truncate(valid)
+                if missingNewline:
+                    f.seek(valid)
+                    f.write(b"\n")
+
+    def belongsTo(self, imgPath):
+        return os.path.dirname(os.path.abspath(imgPath)) == os.path.dirname(
+            self.labelPath
+        )
+
+    def __contains__(self, imgPath):
+        return imgPath.strip() in self.blocks
+
+    def lines(self, imgPath):
+        return self.blocks.get(imgPath.strip(), [])
+
+    def boxes(self, imgPath):
+        """Return the parsed (x1, y1, x2, y2, label) boxes of one image."""
+        boxes = []
+        for line in self.lines(imgPath):
+            box = parseLabelLine(line)
+            if box is None:
+                print(f"Warning: Invalid line format (not enough values): {line}")
+                continue
+            boxes.append(box)
+        return boxes
+
+    def update(self, imgPath, lines, persist=True):
+        """
+        Replace the block of one image, and write it unless persist is False.
+        Empty lines drop the block.
+        """
+        imgPath = imgPath.strip()
+        lines = [line.strip() for line in lines]
+        with self._lock:
+            self.version += 1
+            self._setBlock(imgPath, lines)
+            if self.logMode:
+                # a newer update of the same image replaces the unwritten record
+                self._unlogged.pop(imgPath, None)
+                self._unlogged[imgPath] = {
+                    "v": self.version,
+                    "path": imgPath,
+                    "lines": lines,
+                }
+            else:
+                self._unsaved = True
+        if persist:
+            self.persist()
+
+    def remove(self, imgPath, persist=True):
+        """Drop the block of a deleted image."""
+        self.update(imgPath, [], persist)
+
+    def _setBlock(self, imgPath, lines):
+        if lines:
+            self.blocks[imgPath] = lines
+        else:
+            self.blocks.pop(imgPath, None)
+
+    def persist(self):
+        """Write the updates made since the last call."""
+        if not self.logMode:
+            if self._unsaved:
+                self.save()
+            return
+        with self._lock:
+            records = list(self._unlogged.values())
+            self._unlogged = {}
+            if not records:
+                return
+            self._pending.extend(records)
+            with open(self.logPath, "a", encoding=DEFAULT_ENCODING) as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                logSize = f.tell()
+        if logSize >= self.compactSize:
+            self.compactAsync()
+
+    def _writeBlocks(self, blocks):
+        with atomicWrite(self.labelPath, encoding=DEFAULT_ENCODING, backup=True) as f:
+            for file_path, labels in blocks.items():
+                f.write(f"# {file_path}\n")
+                for label in labels:
+                    f.write(label + "\n")
+                f.write("\n")
+
+    def save(self):
+        """Rewrite Label.txt from memory and drop the log."""
+        with self._compactLock:
+            with self._lock:
+                self._writeBlocks(self.blocks)
+                self._unsaved = False
+                self._unlogged = {}
+                self._pending = []
+                if os.path.exists(self.logPath):
+                    os.remove(self.logPath)
+
+    def compact(self):
+        """Fold the log into Label.txt, keeping records appended meanwhile."""
+        with self._compactLock:
+            with self._lock:
+                if not self._pending:
+                    return
+                blocks = dict(self.blocks)
+                version = self.version
+            # the slow full rewrite runs without blocking update()
+            self._writeBlocks(blocks)
+            with self._lock:
+                self._pending = [r for r in self._pending if r["v"] > version]
+                with atomicWrite(self.logPath, encoding=DEFAULT_ENCODING) as f:
+                    for record in self._pending:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if not self._pending:
+                    os.remove(self.logPath)
+
+    def compactAsync(self):
+        if self._compactThread is not None and self._compactThread.is_alive():
+            return
+        self._compactThread = threading.Thread(target=self.compact, daemon=True)
+        self._compactThread.start()
+
+    def close(self):
+        """Wait for a running compaction and leave a canonical Label.txt."""
+        self.persist()
+        if self._compactThread is not None:
+            self._compactThread.join()
+        self.compact()
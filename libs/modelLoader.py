@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def build_ocr(params, warmup_image=None):
+    # paddleocr pulls in paddle, import it only when a model is really needed
+    from paddleocr import PaddleOCR
+
+    ocr = PaddleOCR(**params)
+    if warmup_image and os.path.exists(warmup_image):
+        ocr.ocr(warmup_image, cls=True, det=True)
+    return ocr
+
+
+def build_table_ocr(params, warmup_image=None):
+    from paddleocr import PPStructure
+
+    table_ocr = PPStructure(**params)
+    if warmup_image and os.path.exists(warmup_image):
+        table_ocr(warmup_image, return_ocr_result_in_table=True)
+    return table_ocr
+
+
+class ModelLoader(object):
+    """
+    Build models on a background thread.
+
+    submit() queues the construction of a named model, get() waits for it.
+    Models are built one at a time, in the order they were submitted, so the
+    first one needed should be submitted first.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = {}
+
+    def submit(self, name, factory, *args):
+        old = self._futures.get(name)
+        if old is not None:
+            old.cancel()
+        self._futures[name] = self._executor.submit(factory, *args)
+
+    def isReady(self, name):
+        future = self._futures.get(name)
+        return future is not None and future.done()
+
+    def get(self, name):
+        """Return the model, blocking until it is built. Build errors are raised here."""
+        return self._futures[name].result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
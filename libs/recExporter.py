@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from libs.atomicFile import atomicWrite
+from libs.utils import get_rotate_crop_image
+
+REC_GT_NAME = "rec_gt.txt"
+CROP_DIR_NAME = "crop_img"
+MANIFEST_NAME = ".manifest.json"
+
+
+def labelDigest(data, labels):
+    """Content hash of one image and its labels."""
+    sha = hashlib.sha1(data)
+    sha.update(json.dumps(labels, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return sha.hexdigest()
+
+
+def exportImageCrops(task):
+    """
+    Crop the labelled boxes of one image into crop_dir.
+
+    Runs in a worker process. Return (key, manifest entry, error), the entry
+    holds the content hash and the rec_gt.txt lines of the image. An image
+    whose hash matches the cached entry is not decoded again.
+    """
+    key, img_path, labels, crop_dir, cached = task
+    try:
+        with open(img_path, "rb") as f:
+            data = f.read()
+        digest = labelDigest(data, labels)
+        if (
+            cached is not None
+            and cached["hash"] == digest
+            and all(os.path.exists(os.path.join(crop_dir, n)) for n in cached["crops"])
+        ):
+            return key, cached, None
+
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), -1)
+        stem = os.path.splitext(os.path.basename(key))[0]
+        crops, lines = [], []
+        for i, label in enumerate(labels):
+            if label["difficult"]:
+                continue
+            img_crop = get_rotate_crop_image(img, np.array(label["points"], np.float32))
+            img_name = stem + "_crop_" + str(i) + ".jpg"
+            cv2.imencode(".jpg", img_crop)[1].tofile(os.path.join(crop_dir, img_name))
+            crops.append(img_name)
+            lines.append(CROP_DIR_NAME + "/" + img_name + "\t" + label["transcription"])
+        return key, {"hash": digest, "crops": crops, "lines": lines}, None
+    except Exception:
+        return key, None, traceback.format_exc()
+
+
+class RecExporter(object):
+    """
+    Export recognition crops and rec_gt.txt with a process pool.
+
+    run() is a generator yielding after every image so the caller can show
+    progress and stop early. rec_gt.txt is written in input order while the
+    workers proceed, an export stopped early keeps the previous rec_gt.txt.
+    crop_img/.manifest.json remembers the content hash of every exported
+    image, unchanged images are skipped by the next export.
+    """
+
+    def __init__(self, baseDir, workers=None):
+        self.baseDir = baseDir
+        self.recGtPath = os.path.join(baseDir, REC_GT_NAME)
+        self.cropDir = os.path.join(baseDir, CROP_DIR_NAME)
+        self.manifestPath = os.path.join(self.cropDir, MANIFEST_NAME)
+        self.workers = workers
+        self.failed = []  # keys of the images that could not be exported
+        self.skipped = 0  # images reused from the manifest
+
+    def loadManifest(self):
+        try:
+            with open(self.manifestPath, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def saveManifest(self, manifest):
+        with atomicWrite(self.manifestPath) as f:
+            json.dump(manifest, f, ensure_ascii=False)
+
+    def run(self, items):
+        """
+        items is a list of (key, image path, labels). Yield the number of
+        images done so far.
+        """
+        os.makedirs(self.cropDir, exist_ok=True)
+        old = self.loadManifest()
+        manifest = {}
+        self.failed = []
+        self.skipped = 0
+        tasks = [
+            (key, img_path, labels, self.cropDir, old.get(key))
+            for key, img_path, labels in items
+        ]
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        finished = False
+        try:
+            # rec_gt.txt is only replaced once every image is exported
+            with atomicWrite(self.recGtPath) as f:
+                results = executor.map(exportImageCrops, tasks, chunksize=4)
+                for done, (key, entry, error) in enumerate(results, 1):
+                    if error is not None:
+                        print("Can not export crops of", key)
+                        print(error)
+                        self.failed.append(key)
+                    else:
+                        if entry == old.get(key):
+                            self.skipped += 1
+                        manifest[key] = entry
+                        for line in entry["lines"]:
+                            f.write(line + "\n")
+                    yield done
+            finished = True
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            if not finished:
+                # an interrupted export keeps the older entries to resume from
+                for key, entry in old.items():
+                    manifest.setdefault(key, entry)
+            self.saveManifest(manifest)
@@ -13,12 +13,11 @@
 # !/usr/bin/python
 # -*- coding: utf-8 -*-
 import math
-import sys
 
-from PyQt5.QtCore import QPointF
-from PyQt5.QtGui import QColor, QPen, QPainterPath, QFont
+from PyQt5.QtCore import QPointF, QRectF
+from PyQt5.QtGui import QColor, QPen, QPainterPath
+from libs.labelFont import labelFont
 from libs.utils import distance
-from ppocr.utils.logging import get_logger
 
 DEFAULT_LINE_COLOR = QColor(0, 255, 0, 128)
 DEFAULT_FILL_COLOR = QColor(255, 0, 0, 128)
@@ -89,9 +88,32 @@ class Shape(object):
         else:
             self.line_color = Shape.line_color
 
+    @property
+    def points(self):
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        self._points = points
+        self._invalidate()
+
+    def _invalidate(self):
+        """Drop the geometry cached from the points, called whenever they change."""
+        self._path = None
+        self._linePath = None
+        self._boundingRect = None
+        self._centroid = None
+
+    def __getstate__(self):
+        # QPainterPath can not be copied by deepcopy, the caches are rebuilt on demand
+        state = self.__dict__.copy()
+        state.update(_path=None, _linePath=None, _boundingRect=None, _centroid=None)
+        return state
+
     def rotate(self, theta):
         for i, p in enumerate(self.points):
             self.points[i] = self.rotatePoint(p, theta)
+        self._invalidate()
         self.direction -= theta
         self.direction = self.direction % (2 * math.pi)
 
@@ -112,6 +134,9 @@ class Shape(object):
             )
         except:
             self.center = None
+            # ppocr imports paddle, only load it on this rare path
+            from ppocr.utils.logging import get_logger
+
             logger = get_logger()
             logger.warning("The XY coordinates of QPointF are not detectable!")
         self._closed = True
@@ -126,13 +151,16 @@ class Shape(object):
             self.close()
         else:
             self.points.append(point)
+            self._invalidate()
 
     def closeEnough(self, p1, p2):
         return distance(p1 - p2) < self.epsilon
 
     def popPoint(self):
         if self.points:
-            return self.points.pop()
+            point = self.points.pop()
+            self._invalidate()
+            return point
         return None
 
     def isClosed(self):
@@ -149,63 +177,36 @@ class Shape(object):
             # pen.setWidth(max(1, int(round(2.0 / self.scale))))
             painter.setPen(pen)
 
-            line_path = QPainterPath()
+            line_path = self.linePath()
             vrtx_path = QPainterPath()
-
-            line_path.moveTo(self.points[0])
-            # Uncommenting the following line will draw 2 paths
-            # for the 1st vertex, and make it non-filled, which
-            # may be desirable.
-            # self.drawVertex(vrtx_path, 0)
-
-            for i, p in enumerate(self.points):
-                line_path.lineTo(p)
+            for i in range(len(self.points)):
                 self.drawVertex(vrtx_path, i)
-            if self.isClosed():
-                line_path.lineTo(self.points[0])
 
             painter.drawPath(line_path)
             painter.drawPath(vrtx_path)
             painter.fillPath(vrtx_path, self.vertex_fill_color)
 
             # Draw text at the top-left
+            rect = self.boundingRect()
             if self.paintLabel:
-                min_x = sys.maxsize
-                min_y = sys.maxsize
-                for point in self.points:
-                    min_x = min(min_x, point.x())
-                    min_y = min(min_y, point.y())
-                if min_x != sys.maxsize and min_y != sys.maxsize:
-                    font = QFont()
-                    if self.font_family is not None:
-                        font.setFamily(self.font_family)
-                    font.setPointSize(self.fontsize)
-                    font.setBold(True)
-                    painter.setFont(font)
-                    if self.label is None:
-                        self.label = ""
-                    if min_y < MIN_Y_LABEL:
-                        min_y += MIN_Y_LABEL
-                    painter.drawText(min_x, min_y, self.label)
+                min_x, min_y = rect.left(), rect.top()
+                painter.setFont(labelFont(self.fontsize, True, self.font_family))
+                if self.label is None:
+                    self.label = ""
+                if min_y < MIN_Y_LABEL:
+                    min_y += MIN_Y_LABEL
+                painter.drawText(QPointF(min_x, min_y), self.label)
 
             # Draw number at the top-right
             if self.paintIdx:
-                min_x = sys.maxsize
-                min_y = sys.maxsize
-                for point in self.points:
-                    min_x = min(min_x, point.x())
-                    min_y = min(min_y, point.y())
-                if min_x != sys.maxsize and min_y != sys.maxsize:
-                    font = QFont()
-                    font.setPointSize(self.fontsize)
-                    font.setBold(True)
-                    painter.setFont(font)
-                    text = ""
-                    if self.idx != None:
-                        text = str(self.idx)
-                    if min_y < MIN_Y_LABEL:
-                        min_y += MIN_Y_LABEL
-                    painter.drawText(int(min_x), int(min_y), text)
+                min_x, min_y = rect.left(), rect.top()
+                painter.setFont(labelFont(self.fontsize, True))
+                text = ""
+                if self.idx != None:
+                    text = str(self.idx)
+                if min_y < MIN_Y_LABEL:
+                    min_y += MIN_Y_LABEL
+                painter.drawText(int(min_x), int(min_y), text)
 
             if self.fill:
                 color = self.select_fill_color if self.selected else self.fill_color
@@ -239,19 +240,50 @@ class Shape(object):
         return self.makePath().contains(point)
 
     def makePath(self):
-        path = QPainterPath(self.points[0])
-        for p in self.points[1:]:
-            path.lineTo(p)
-        return path
+        """Polygon path of the points, cached until the points change. Do not modify it."""
+        if self._path is None:
+            path = QPainterPath(self.points[0])
+            for p in self.points[1:]:
+                path.lineTo(p)
+            self._path = path
+        return self._path
+
+    def linePath(self):
+        """Outline drawn by paint(), closed back to the first point if the shape is closed."""
+        if self._linePath is None or self._linePath[0] != self.isClosed():
+            path = QPainterPath()
+            path.moveTo(self.points[0])
+            for p in self.points:
+                path.lineTo(p)
+            if self.isClosed():
+                path.lineTo(self.points[0])
+            self._linePath = (self.isClosed(), path)
+        return self._linePath[1]
 
     def boundingRect(self):
-        return self.makePath().boundingRect()
+        if self._boundingRect is None:
+            xs = [p.x() for p in self.points]
+            ys = [p.y() for p in self.points]
+            self._boundingRect = QRectF(
+                min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+            )
+        return QRectF(self._boundingRect)
+
+    def centroid(self):
+        """Mean of the points."""
+        if self._centroid is None:
+            n = len(self.points)
+            self._centroid = QPointF(
+                sum(p.x() for p in self.points) / n, sum(p.y() for p in self.points) / n
+            )
+        return QPointF(self._centroid)
 
     def moveBy(self, offset):
         self.points = [p + offset for p in self.points]
 
     def moveVertexBy(self, i, offset):
         self.points[i] = self.points[i] + offset
+        self._invalidate()
 
     def highlightVertex(self, i, action):
         self._highlightIndex = i
@@ -284,3 +316,4 @@ class Shape(object):
 
     def __setitem__(self, key, value):
         self.points[key] = value
+        self._invalidate()
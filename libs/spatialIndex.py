@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+DEFAULT_CELL_SIZE = 64
+
+
+class GridIndex(object):
+    """
+    Uniform grid over the bounding boxes of shapes.
+
+    Every shape is registered in the cells its bounding box overlaps, so a
+    point query only returns the shapes of the cells around the point
+    instead of all shapes on the canvas.
+    """
+
+    def __init__(self, cellSize=DEFAULT_CELL_SIZE):
+        self.cellSize = cellSize
+        self._cells = {}  # (col, row) -> set of id(shape)
+        self._shapes = {}  # id(shape) -> (shape, cells of its bounding box)
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def __contains__(self, shape):
+        return id(shape) in self._shapes
+
+    def _cellRange(self, x0, y0, x1, y1):
+        size = self.cellSize
+        return [
+            (col, row)
+            for col in range(int(x0 // size), int(x1 // size) + 1)
+            for row in range(int(y0 // size), int(y1 // size) + 1)
+        ]
+
+    def _cellsOf(self, shape):
+        if not shape.points:
+            return []
+        rect = shape.boundingRect()
+        return self._cellRange(rect.left(), rect.top(), rect.right(), rect.bottom())
+
+    def insert(self, shape):
+        if shape in self:
+            self.remove(shape)
+        cells = self._cellsOf(shape)
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(id(shape))
+        # keep a reference, the id of an indexed shape can not be reused
+        self._shapes[id(shape)] = (shape, cells)
+
+    def remove(self, shape):
+        entry = self._shapes.pop(id(shape), None)
+        if entry is None:
+            return
+        for cell in entry[1]:
+            ids = self._cells.get(cell)
+            if ids is not None:
+                ids.discard(id(shape))
+                if not ids:
+                    del self._cells[cell]
+
+    def update(self, shape):
+        """Re-register a shape after its points moved, ignores shapes not indexed."""
+        if shape in self:
+            self.insert(shape)
+
+    def rebuild(self, shapes):
+        self._cells = {}
+        self._shapes = {}
+        for shape in shapes:
+            self.insert(shape)
+
+    def query(self, point, margin=0.0):
+        """Return the ids of the shapes whose bounding box is within margin of point."""
+        x, y = point.x(), point.y()
+        found = set()
+        for cell in self._cellRange(x - margin, y - margin, x + margin, y + margin):
+            ids = self._cells.get(cell)
+            if ids:
+                found |= ids
+        return found
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import json
+import sqlite3
+import threading
+
+from libs.atomicFile import atomicWrite
+
+STORE_FILE_NAME = "annotations.db"
+# PPlabel (Label.txt) and Cachelabel (Cache.cach) shapes
+LABEL, CACHE = "label", "cache"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    key TEXT PRIMARY KEY,
+    state INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS shapes (
+    image TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    transcription TEXT,
+    points TEXT NOT NULL,
+    difficult INTEGER NOT NULL DEFAULT 0,
+    extra TEXT,
+    PRIMARY KEY (image, kind, seq)
+);
+"""
+_COLUMNS = ("transcription", "points", "difficult")
+
+
+def _writeLines(path, lines):
+    with atomicWrite(path, backup=True) as f:
+        f.writelines(lines)
+
+
+class AnnotationStore(object):
+    """
+    SQLite file holding the labels, auto recognition results and check state
+    of one dataset directory.
+
+    Every image is saved in its own transaction, so a save costs the size of
+    one image instead of rewriting Label.txt, Cache.cach and fileState.txt,
+    and a crash loses at most the image being written. The database runs in
+    WAL mode. The text files are only written by the export methods, in the
+    formats of savePPlabel, saveCacheLabel and saveFilestate. Image keys are
+    the "dir/name" keys of MainWindow.getImglabelidx.
+    """
+
+    def __init__(self, dbPath):
+        self.dbPath = dbPath
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(dbPath, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def isEmpty(self):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT EXISTS(SELECT 1 FROM images) OR EXISTS(SELECT 1 FROM shapes)"
+            ).fetchone()
+        return not row[0]
+
+    def saveShapes(self, key, boxes, kinds=(LABEL,)):
+        """Replace the shapes of an image, boxes are the dicts of PPlabel."""
+        rows = []
+        for seq, box in enumerate(boxes):
+            extra = {k: v for k, v in box.items() if k not in _COLUMNS}
+            rows.append(
+                (
+                    box.get("transcription"),
+                    json.dumps(box["points"]),
+                    int(bool(box.get("difficult", False))),
+                    json.dumps(extra, ensure_ascii=False) if extra else None,
+                    seq,
+                )
+            )
+        with self._lock, self._db:
+            self._db.execute("INSERT OR IGNORE INTO images (key) VALUES (?)", (key,))
+            for kind in kinds:
+                self._db.execute(
+                    "DELETE FROM shapes WHERE image = ? AND kind = ?", (key, kind)
+                )
+                self._db.executemany(
+                    "INSERT INTO shapes (transcription, points, difficult, extra, seq,"
+                    " image, kind) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [row + (key, kind) for row in rows],
+                )
+
+    def setState(self, key, state=1):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO images (key, state) VALUES (?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET state = excluded.state",
+                (key, state),
+            )
+
+    def removeImage(self, key):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM shapes WHERE image = ?", (key,))
+            self._db.execute("DELETE FROM images WHERE key = ?", (key,))
+
+    def importDicts(self, labels, cache, states):
+        """Fill an empty store from the dicts loaded from the text files."""
+        for key, boxes in cache.items():
+            self.saveShapes(key, boxes, (CACHE,))
+        for key, boxes in labels.items():
+            self.saveShapes(key, boxes, (LABEL,))
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO images (key, state) VALUES (?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET state = excluded.state",
+                list(states.items()),
+            )
+
+    def labels(self, kind=LABEL, checkedOnly=False):
+        """{key: [box dict]} of one kind of shapes, in the order they were saved."""
+        query = (
+            "SELECT s.image, s.transcription, s.points, s.difficult, s.extra"
+            " FROM shapes s JOIN images i ON i.key = s.image WHERE s.kind = ?"
+        )
+        if checkedOnly:
+            query += " AND i.state = 1"
+        query += " ORDER BY i.rowid, s.seq"
+        result = {}
+        with self._lock:
+            rows = self._db.execute(query, (kind,)).fetchall()
+        for key, transcription, points, difficult, extra in rows:
+            box = {
+                "transcription": transcription,
+                "points": json.loads(points),
+                "difficult": bool(difficult),
+            }
+            if extra:
+                box.update(json.loads(extra))
+            result.setdefault(key, []).append(box)
+        return result
+
+    def states(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, state FROM images WHERE state != 0 ORDER BY rowid"
+            ).fetchall()
+        return dict(rows)
+
+    def exportLabels(self, path, kind=LABEL, checkedOnly=True):
+        """Write "key\tjson" lines like savePPlabel (or saveCacheLabel for CACHE)."""
+        labels = self.labels(kind, checkedOnly)
+        _writeLines(
+            path,
+            (
+                key + "\t" + json.dumps(boxes, ensure_ascii=False) + "\n"
+                for key, boxes in labels.items()
+            ),
+        )
+
+    def exportFileState(self, path):
+        """Write fileState.txt like saveFilestate."""
+        _writeLines(
+            path,
+            (key + "\t" + str(state) + "\n" for key, state in self.states().items()),
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import openpyxl
+
+from libs.atomicFile import atomicWrite
+from libs.utils import convert_token, expand_list
+
+TABLE_EXCEL_DIR_NAME = "tableRec_excel_output"
+TOKEN_CACHE_NAME = ".tokens.json"
+
+
+def fileStamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def readTableTokens(task):
+    """
+    Convert the first sheet of a table recognition workbook into structure
+    tokens. Runs in a worker process, return (path, stamp, tokens, error).
+    """
+    path, stamp = task
+    try:
+        excel = openpyxl.load_workbook(path, data_only=True)
+        sheet0 = excel.worksheets[0]  # only sheet 0
+        html_list = [["td"] * sheet0.max_column for i in range(sheet0.max_row)]
+        for merged in sheet0.merged_cells.ranges:
+            # Convert merged cell range to start row, end row, start col, end col
+            sr = merged.min_row - 1
+            er = merged.max_row - 1
+            sc = merged.min_col - 1
+            ec = merged.max_col - 1
+            html_list = expand_list((sr, er, sc, ec), html_list)
+        return path, stamp, convert_token(html_list), None
+    except Exception:
+        return path, stamp, None, traceback.format_exc()
+
+
+class TableTokenReader(object):
+    """
+    Read the structure tokens of many table workbooks with a process pool.
+
+    The tokens are cached in .tokens.json of the excel directory with the
+    mtime and size of each workbook, only new or edited workbooks are parsed
+    again. run() is a generator yielding the number of workbooks done so the
+    caller can show progress, the tokens are in self.tokens afterwards.
+    """
+
+    def __init__(self, excelDir, workers=None):
+        self.excelDir = excelDir
+        self.cachePath = os.path.join(excelDir, TOKEN_CACHE_NAME)
+        self.workers = workers
+        self.tokens = {}  # workbook path -> tokens
+        self.failed = []  # workbooks that could not be read
+        self.parsed = 0
+
+    def loadCache(self):
+        try:
+            with open(self.cachePath, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def saveCache(self, cache):
+        with atomicWrite(self.cachePath) as f:
+            json.dump(cache, f, ensure_ascii=False)
+
+    def run(self, paths):
+        """
+        paths are the workbooks to read, yield the number done so far, cached
+        workbooks included, up to len(paths).
+        """
+        old = self.loadCache()
+        cache = {}
+        self.tokens = {}
+        self.failed = []
+        self.parsed = 0
+        tasks = []
+        for path in paths:
+            name = os.path.basename(path)
+            stamp = fileStamp(path)
+            entry = old.get(name)
+            if entry is not None and entry["stamp"] == stamp:
+                cache[name] = entry
+                self.tokens[path] = entry["tokens"]
+            else:
+                tasks.append((path, stamp))
+        cached = len(paths) - len(tasks)
+        if cached:
+            yield cached
+        if not tasks:
+            return
+
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            results = executor.map(readTableTokens, tasks)
+            for done, (path, stamp, tokens, error) in enumerate(results, 1):
+                if error is not None:
+                    print("Can not read table of", path)
+                    print(error)
+                    self.failed.append(path)
+                else:
+                    cache[os.path.basename(path)] = {"stamp": stamp, "tokens": tokens}
+                    self.tokens[path] = tokens
+                self.parsed = done
+                yield cached + done
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # entries of workbooks not asked for this time stay for later exports
+            for name, entry in old.items():
+                cache.setdefault(name, entry)
+            self.saveCache(cache)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage
+
+THUMBNAIL_SIZE = 100
+THUMBNAIL_PACK_NAME = ".thumbnails.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumbnails (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    png BLOB NOT NULL
+)
+"""
+
+
+def makeThumbnail(path, size=THUMBNAIL_SIZE):
+    """Return the PNG bytes of a size x size thumbnail of path, or None."""
+    data = np.fromfile(path, dtype=np.uint8)
+    # JPEG is decoded at 1/4 resolution directly, much faster for large photos
+    img = cv2.imdecode(data, cv2.IMREAD_REDUCED_COLOR_4)
+    if img is None or min(img.shape[:2]) < size:
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    # same stretched square as the previous QPixmap.scaled(IgnoreAspectRatio)
+    thumb = cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".png", thumb)
+    return buf.tobytes() if ok else None
+
+
+class ThumbnailCache(QObject):
+    """
+    Thumbnails of the images of a folder, persisted in one SQLite pack file
+    per folder and keyed by path, mtime and size. The pack only holds PNG
+    bytes, so opening a shared dataset can not run code from it.
+
+    request() returns the thumbnails that are ready and generates the others
+    on a thread pool, thumbnailReady is emitted for each of them. New
+    thumbnails are written to the pack once the queue is empty and by close().
+    """
+
+    thumbnailReady = pyqtSignal(str, QImage)
+
+    def __init__(self, size=THUMBNAIL_SIZE, workers=2):
+        super(ThumbnailCache, self).__init__()
+        self.size = size
+        self.packPath = None
+        self._entries = {}  # path -> (mtime_ns, size, png bytes)
+        self._unsaved = {}  # entries not in the pack yet, None for removed ones
+        self._pending = {}  # path -> future generating its thumbnail
+        self._generation = 0  # bumped by open(), drops results of the old folder
+        self._lock = threading.Lock()
+        self._saveLock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def open(self, dirpath):
+        packPath = os.path.join(dirpath, THUMBNAIL_PACK_NAME)
+        if packPath == self.packPath:
+            return
+        self.save()
+        entries = {}
+        if os.path.exists(packPath):
+            try:
+                conn = sqlite3.connect(packPath)
+                try:
+                    for path, mtime, size, png in conn.execute(
+                        "SELECT path, mtime_ns, size, png FROM thumbnails"
+                    ):
+                        entries[path] = (mtime, size, bytes(png))
+                finally:
+                    conn.close()
+            except sqlite3.OperationalError as e:
+                print("Can not read thumbnails from", packPath, e)
+            except sqlite3.DatabaseError as e:
+                # not a database, it is only a cache so start a new pack
+                print("Can not read thumbnails from", packPath, e)
+                try:
+                    os.remove(packPath)
+                except OSError:
+                    pass
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending = {}
+            self._generation += 1
+            self.packPath = packPath
+            self._entries = entries
+            self._unsaved = {}
+
+    @staticmethod
+    def _stamp(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def request(self, paths):
+        """Return {path: QImage} of the cached thumbnails, queue the missing ones."""
+        ready = {}
+        for path in paths:
+            try:
+                stamp = self._stamp(path)
+            except OSError:
+                continue
+            with self._lock:
+                entry = self._entries.get(path)
+                if entry is not None and entry[:2] == stamp:
+                    ready[path] = QImage.fromData(entry[2])
+                    continue
+                if path in self._pending:
+                    continue
+                self._pending[path] = self._executor.submit(
+                    self._generate, path, stamp, self._generation
+                )
+        return ready
+
+    def forget(self, path):
+        """Drop the thumbnail of a deleted image, from memory and from the pack."""
+        with self._lock:
+            future = self._pending.pop(path, None)
+            if future is not None:
+                future.cancel()
+            if self._entries.pop(path, None) is not None:
+                self._unsaved[path] = None
+
+    def _generate(self, path, stamp, generation):
+        try:
+            png = makeThumbnail(path, self.size)
+        except Exception as e:
+            print("Can not make thumbnail of", path, e)
+            png = None
+        with self._lock:
+            if generation != self._generation:
+                # another folder was opened meanwhile
+                return
+            self._pending.pop(path, None)
+            if png is not None:
+                entry = (stamp[0], stamp[1], png)
+                self._entries[path] = entry
+                self._unsaved[path] = entry
+            idle = not self._pending
+        if png is not None:
+            # QImage can be used off the GUI thread, the queued signal delivers it there
+            self.thumbnailReady.emit(path, QImage.fromData(png))
+        if idle:
+            self.save()
+
+    def save(self):
+        # saves run one at a time, so a newer entry is never overwritten by an older one
+        with self._saveLock:
+            with self._lock:
+                if not self._unsaved or self.packPath is None:
+                    return
+                packPath = self.packPath
+                unsaved = self._unsaved
+                self._unsaved = {}
+            try:
+                self._write(packPath, unsaved)
+            except sqlite3.Error as e:
+                print("Can not save thumbnails to", packPath, e)
+                with self._lock:
+                    if packPath == self.packPath:
+                        for path, entry in unsaved.items():
+                            self._unsaved.setdefault(path, entry)
+
+    @staticmethod
+    def _write(packPath, unsaved):
+        conn = sqlite3.connect(packPath, timeout=30)
+        try:
+            with conn:
+                conn.execute(_SCHEMA)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?, ?)",
+                    [(path,) + entry for path, entry in unsaved.items() if entry],
+                )
+                conn.executemany(
+                    "DELETE FROM thumbnails WHERE path = ?",
+                    [(path,) for path, entry in unsaved.items() if entry is None],
+                )
+        finally:
+            conn.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.save()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import math
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QRect, QRectF, QSize
+from PyQt5.QtGui import QImage, QPixmap
+
+TILE_SIZE = 512
+# images with more pixels are drawn from tiles, smaller ones as one QPixmap
+TILED_MIN_PIXELS = 40 * 1000 * 1000
+DEFAULT_TILE_CACHE_MB = 256
+
+
+class TiledImage(object):
+    """
+    Multi-resolution tile pyramid over a decoded image buffer.
+
+    Level 0 is the buffer itself, every further level halves the size and
+    is only computed when a zoom needs it. Tiles are converted to QPixmap on
+    demand and kept in an LRU bounded by maxBytes, so a huge scan never
+    exists as one full size QPixmap. The object answers the QPixmap calls
+    Canvas makes (width, height, size, rect, isNull, truth value) and paints
+    itself with paint().
+    """
+
+    def __init__(
+        self,
+        buffer,
+        fmt,
+        tileSize=TILE_SIZE,
+        maxBytes=DEFAULT_TILE_CACHE_MB * 1024 * 1024,
+    ):
+        self._levels = [buffer]  # ndarray per level, built lazily
+        self._format = fmt
+        self.tileSize = tileSize
+        self.maxBytes = maxBytes
+        self._tiles = OrderedDict()  # (level, col, row) -> QPixmap
+        self._bytes = 0
+        self._width = buffer.shape[1]
+        self._height = buffer.shape[0]
+        # the coarsest level still spans more than one tile
+        self.maxLevel = max(
+            0, int(math.ceil(math.log2(max(self._width, self._height) / tileSize)))
+        )
+
+    @staticmethod
+    def wants(image):
+        """Whether image is large enough to be drawn from tiles."""
+        return image.width() * image.height() >= TILED_MIN_PIXELS
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def size(self):
+        return QSize(self._width, self._height)
+
+    def rect(self):
+        return QRect(0, 0, self._width, self._height)
+
+    def isNull(self):
+        return self._width == 0 or self._height == 0
+
+    def __bool__(self):
+        return not self.isNull()
+
+    def levelFor(self, scale):
+        """Coarsest level that still has at least one pixel per screen pixel."""
+        if scale <= 0:
+            return self.maxLevel
+        return min(self.maxLevel, max(0, int(math.floor(math.log2(1.0 / scale)))))
+
+    def _level(self, level):
+        while len(self._levels) <= level:
+            prev = self._levels[-1]
+            h, w = prev.shape[:2]
+            self._levels.append(
+                cv2.resize(
+                    prev, (max(1, w // 2), max(1, h // 2)), interpolation=cv2.INTER_AREA
+                )
+            )
+        return self._levels[level]
+
+    def _tile(self, level, col, row):
+        key = (level, col, row)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+        ts = self.tileSize
+        tile = np.ascontiguousarray(
+            self._level(level)[row * ts : (row + 1) * ts, col * ts : (col + 1) * ts]
+        )
+        h, w = tile.shape[:2]
+        image = QImage(tile.data, w, h, tile.strides[0], self._format)
+        pixmap = QPixmap.fromImage(image)  # copies the pixels out of tile
+        self._tiles[key] = pixmap
+        self._bytes += w * h * 4
+        while self._bytes > self.maxBytes and len(self._tiles) > 1:
+            _, old = self._tiles.popitem(last=False)
+            self._bytes -= old.width() * old.height() * 4
+        return pixmap
+
+    def paint(self, painter, rect, scale):
+        """Draw the tiles of the level matching scale that cover rect, in image coordinates."""
+        rect = rect.intersected(QRectF(0, 0, self._width, self._height))
+        if rect.isEmpty():
+            return
+        level = self.levelFor(scale)
+        levelImage = self._level(level)
+        lh, lw = levelImage.shape[:2]
+        # level pixels map back to image coordinates by the exact size ratio
+        fx, fy = self._width / float(lw), self._height / float(lh)
+        ts = self.tileSize
+        col0 = int(rect.left() / fx) // ts
+        col1 = int(min(lw - 1, rect.right() / fx)) // ts
+        row0 = int(rect.top() / fy) // ts
+        row1 = int(min(lh - 1, rect.bottom() / fy)) // ts
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                pixmap = self._tile(level, col, row)
+                target = QRectF(
+                    col * ts * fx,
+                    row * ts * fy,
+                    pixmap.width() * fx,
+                    pixmap.height() * fy,
+                )
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+    def clear(self):
+        self._tiles.clear()
+        self._bytes = 0
+        del self._levels[1:]
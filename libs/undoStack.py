@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+from PyQt5.QtCore import QPointF
+from PyQt5.QtGui import QColor
+
+UNDO_MEMORY_MB = 64
+
+
+def shapeState(shape):
+    """Immutable snapshot of the editable fields of a shape, without Qt objects."""
+    center = shape.center
+    return (
+        shape.label,
+        tuple((p.x(), p.y()) for p in shape.points),
+        shape.difficult,
+        shape.key_cls,
+        shape.idx,
+        shape.locked,
+        shape.direction,
+        None if center is None else (center.x(), center.y()),
+        shape.isClosed(),
+        shape.line_color.getRgb(),
+        shape.fill_color.getRgb(),
+    )
+
+
+def applyShapeState(shape, state):
+    (
+        shape.label,
+        points,
+        shape.difficult,
+        shape.key_cls,
+        shape.idx,
+        shape.locked,
+        shape.direction,
+        center,
+        closed,
+        lineColor,
+        fillColor,
+    ) = state
+    shape.points = [QPointF(x, y) for x, y in points]
+    shape.center = None if center is None else QPointF(*center)
+    shape._closed = closed
+    shape.line_color = QColor(*lineColor)
+    shape.fill_color = QColor(*fillColor)
+
+
+def stateSize(state):
+    """Rough number of bytes held by a shape state."""
+    return 400 + 64 * len(state[1]) + 2 * len(state[0] or "")
+
+
+class UndoRecord(object):
+    """
+    The difference between two recorded states of a page.
+
+    changes holds (shape, before, after) for every shape whose state changed,
+    before is None for an added shape and after is None for a deleted one.
+    The shape order is only kept when it changed.
+    """
+
+    __slots__ = ("changes", "orderBefore", "orderAfter", "size")
+
+    def __init__(self, changes, orderBefore, orderAfter):
+        self.changes = changes
+        self.orderBefore = orderBefore
+        self.orderAfter = orderAfter
+        size = 100
+        for _, before, after in changes:
+            size += sum(stateSize(s) for s in (before, after) if s is not None)
+        if orderBefore is not None:
+            size += 8 * (len(orderBefore) + len(orderAfter))
+        self.size = size
+
+
+class UndoStack(object):
+    """
+    Undo and redo history of the shapes of one page.
+
+    record() compares the shapes with the last recorded state and pushes only
+    what changed: moved or edited vertices, relabels, added and deleted shapes
+    and reordering. Unchanged shapes are shared between all the records
+    instead of being copied into every snapshot. The first record after
+    reset() is the baseline that can not be undone. The history is not
+    limited in depth, the oldest records are dropped once they use more than
+    maxBytes.
+    """
+
+    def __init__(self, maxBytes=UNDO_MEMORY_MB * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.reset()
+
+    def reset(self):
+        self._undo = []
+        self._redo = []
+        self._bytes = 0
+        self._states = None  # shape -> state of the last record
+        self._order = ()
+
+    def canUndo(self):
+        return bool(self._undo)
+
+    def canRedo(self):
+        return bool(self._redo)
+
+    def record(self, shapes):
+        """Push the changes since the last record, return whether there were any."""
+        order = tuple(shapes)
+        states = {shape: shapeState(shape) for shape in order}
+        if self._states is None:
+            self._states, self._order = states, order
+            return False
+
+        changes = []
+        for shape, state in states.items():
+            before = self._states.get(shape)
+            if before != state:
+                changes.append((shape, before, state))
+        for shape, before in self._states.items():
+            if shape not in states:
+                changes.append((shape, before, None))
+        orderChanged = order != self._order
+        if not changes and not orderChanged:
+            return False
+
+        if orderChanged:
+            record = UndoRecord(changes, self._order, order)
+        else:
+            record = UndoRecord(changes, None, None)
+        self._undo.append(record)
+        self._bytes += record.size
+        for dropped in self._redo:
+            self._bytes -= dropped.size
+        self._redo = []
+        while self._bytes > self.maxBytes and len(self._undo) > 1:
+            self._bytes -= self._undo.pop(0).size
+        self._states, self._order = states, order
+        return True
+
+    def undo(self):
+        """Revert the last record on its shapes, return the shapes of the page."""
+        if not self._undo:
+            return list(self._order)
+        record = self._undo.pop()
+        self._apply(record, 1, record.orderBefore)
+        self._redo.append(record)
+        return list(self._order)
+
+    def redo(self):
+        if not self._redo:
+            return list(self._order)
+        record = self._redo.pop()
+        self._apply(record, 2, record.orderAfter)
+        self._undo.append(record)
+        return list(self._order)
+
+    def _apply(self, record, which, order):
+        for change in record.changes:
+            shape, state = change[0], change[which]
+            if state is None:
+                self._states.pop(shape, None)
+            else:
+                applyShapeState(shape, state)
+                self._states[shape] = state
+        if order is not None:
+            self._order = order
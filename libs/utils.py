@@ -121,6 +121,9 @@ def have_qstring():
     return not (sys.version_info.major >= 3 or QT_VERSION_STR.startswith("5."))
 
 
+_DIGITS = re.compile("([0-9]+)")
+
+
 def natural_sort(list, key=lambda s: s):
     """
     Sort the list into natural alphanumeric order.
@@ -128,7 +131,7 @@ def natural_sort(list, key=lambda s: s):
 
     def get_alphanum_key_func(key):
         convert = lambda text: int(text) if text.isdigit() else text
-        return lambda s: [convert(c) for c in re.split("([0-9]+)", key(s))]
+        return lambda s: [convert(c) for c in _DIGITS.split(key(s))]
 
     sort_key = get_alphanum_key_func(key)
     list.sort(key=sort_key)
@@ -185,6 +188,60 @@ def get_rotate_crop_image(img, points):
         print(e)
 
 
+def sorted_boxes(dt_boxes):
+    """
+    Sort text boxes in order from top to bottom, left to right,
+    the same order PaddleOCR uses for det + rec results.
+    """
+    _boxes = sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0]))
+    for i in range(len(_boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(_boxes[j + 1][0][1] - _boxes[j][0][1]) < 10 and (
+                _boxes[j + 1][0][0] < _boxes[j][0][0]
+            ):
+                _boxes[j], _boxes[j + 1] = _boxes[j + 1], _boxes[j]
+            else:
+                break
+    return _boxes
+
+
+DEFAULT_REC_BATCH_NUM = 6
+
+
+def batch_recognize(ocr, crops, batch_size=DEFAULT_REC_BATCH_NUM):
+    """
+    Recognise text crops in batches of similar width.
+    Return one (text, score) per crop, in the order of crops.
+
+    Only paddleocr >= 2.7 recognises a list of crops in one call, older
+    versions return a result for the first crop only. When the result does
+    not match the batch, the crops are recognised one call each.
+    """
+    results = [("", 0.0)] * len(crops)
+    # crops of close aspect ratio pad to the same width inside a batch
+    order = sorted(
+        range(len(crops)), key=lambda i: crops[i].shape[1] / float(crops[i].shape[0])
+    )
+    batch_size = max(1, batch_size)
+    batched = True
+    for start in range(0, len(order), batch_size):
+        chunk = order[start : start + batch_size]
+        rec = None
+        if batched:
+            rec = ocr.ocr([crops[i] for i in chunk], det=False, cls=True)[0]
+            if rec is None or len(rec) != len(chunk):
+                batched = False
+                rec = None
+        if rec is None:
+            rec = []
+            for i in chunk:
+                res = ocr.ocr(crops[i], det=False, cls=True)[0]
+                rec.append(res[0] if res else ("", 0.0))
+        for i, res in zip(chunk, rec):
+            results[i] = (res[0], res[1])
+    return results
+
+
 def boxPad(box, imgShape, pad: int) -> np.array:
     """
     Pad a box with [pad] pixels on each side.
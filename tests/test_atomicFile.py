@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.atomicFile import atomicWrite, isComplete, isKeyValueLine, recoverFile
+from libs.labelIndex import LabelIndex, isLabelFileLine
+
+BLOCK_LABEL = (
+    "# /data/a.jpg\n"
+    "1\t2\t3\t4\thello\n"
+    "5,6,7,8,world\n"
+    "9,9,9,9,tab\tin label\n"
+    "\n"
+)
+PPLABEL = (
+    "imgs/a.jpg\t"
+    + json.dumps(
+        [{"transcription": "a b", "points": [[0, 0]], "difficult": False}],
+        ensure_ascii=False,
+    )
+    + "\n"
+    "imgs/b.jpg\t\n"
+)
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "Label.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, path=None):
+        with open(path or self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def write(self, text, path=None):
+        with open(path or self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_write(self):
+        with atomicWrite(self.path) as f:
+            f.write("new\n")
+        self.assertEqual(self.read(), "new\n")
+        self.assertEqual(os.listdir(self.dir), ["Label.txt"])
+
+    def test_no_backup_by_default(self):
+        self.write("old\n")
+        with atomicWrite(self.path) as f:
+            f.write("new\n")
+        self.assertFalse(os.path.exists(self.path + ".bak"))
+
+    def test_backup(self):
+        self.write("old\n")
+        with atomicWrite(self.path, backup=True) as f:
+            f.write("new\n")
+        self.assertEqual(self.read(), "new\n")
+        self.assertEqual(self.read(self.path + ".bak"), "old\n")
+
+    def test_failed_write_keeps_old_content(self):
+        self.write("old\n")
+        with self.assertRaises(RuntimeError):
+            with atomicWrite(self.path) as f:
+                f.write("partial")
+                raise RuntimeError
+        self.assertEqual(self.read(), "old\n")
+        self.assertEqual(os.listdir(self.dir), ["Label.txt"])
+
+
+class TestRecoverFile(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "Label.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, path=None):
+        with open(path or self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def write(self, text, path=None):
+        with open(path or self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_tab_separated_blocks_are_complete(self):
+        self.write(BLOCK_LABEL)
+        self.assertTrue(isComplete(self.path, isLabelFileLine))
+        self.assertFalse(recoverFile(self.path, isLabelFileLine))
+        self.assertEqual(self.read(), BLOCK_LABEL)
+        self.assertFalse(os.path.exists(self.path + ".broken"))
+        boxes = LabelIndex(self.path).boxes("/data/a.jpg")
+        self.assertEqual([b[4] for b in boxes], ["hello", "world", "tab\tin label"])
+
+    def test_tab_separated_blocks_without_last_newline(self):
+        self.write(BLOCK_LABEL.rstrip("\n"))
+        self.assertFalse(recoverFile(self.path, isLabelFileLine))
+
+    def test_old_backup_does_not_replace_tab_separated_blocks(self):
+        self.write(BLOCK_LABEL)
+        self.write("# /data/a.jpg\n", self.path + ".bak")
+        self.assertFalse(recoverFile(self.path, isLabelFileLine))
+        self.assertEqual(self.read(), BLOCK_LABEL)
+
+    def test_pplabel_lines_are_complete(self):
+        self.write(PPLABEL)
+        for isLine in (isLabelFileLine, isKeyValueLine):
+            self.assertFalse(recoverFile(self.path, isLine))
+        self.assertEqual(self.read(), PPLABEL)
+
+    def test_other_line_breaks_in_labels(self):
+        text = (
+            "imgs/a.jpg\t"
+            + json.dumps([{"transcription": "a\u2028b\x0cc"}], ensure_ascii=False)
+            + "\n"
+        )
+        self.write(text)
+        self.assertFalse(recoverFile(self.path, isKeyValueLine))
+        self.assertEqual(self.read(), text)
+
+    def test_truncated_block_line_is_dropped(self):
+        self.write(BLOCK_LABEL + "# /data/b.jpg\n1,2,3")
+        self.assertTrue(recoverFile(self.path, isLabelFileLine))
+        self.assertEqual(self.read(), BLOCK_LABEL + "# /data/b.jpg\n")
+        self.assertTrue(os.path.exists(self.path + ".broken"))
+
+    def test_truncated_json_line_is_dropped(self):
+        self.write(PPLABEL + 'imgs/c.jpg\t[{"transcription": "c"')
+        self.assertTrue(recoverFile(self.path, isLabelFileLine))
+        self.assertEqual(self.read(), PPLABEL)
+
+    def test_truncated_file_state(self):
+        path = os.path.join(self.dir, "fileState.txt")
+        self.write("/data/a.jpg\t1\n/data/b.j", path)
+        self.assertTrue(recoverFile(path, isKeyValueLine))
+        self.assertEqual(self.read(path), "/data/a.jpg\t1\n")
+
+    def test_nul_bytes_are_dropped(self):
+        self.write("/data/a.jpg\t1\n\x00\x00\x00\n")
+        self.assertTrue(recoverFile(self.path, isKeyValueLine))
+        self.assertEqual(self.read(), "/data/a.jpg\t1\n")
+
+    def test_restore_from_backup(self):
+        self.write(PPLABEL, self.path + ".bak")
+        self.write(PPLABEL + "imgs/c.jpg\t[{")
+        self.assertTrue(recoverFile(self.path, isKeyValueLine))
+        self.assertEqual(self.read(), PPLABEL)
+        self.assertEqual(self.read(self.path + ".broken"), PPLABEL + "imgs/c.jpg\t[{")
+
+    def test_restore_missing_file_from_backup(self):
+        self.write(PPLABEL, self.path + ".bak")
+        self.assertTrue(recoverFile(self.path, isKeyValueLine))
+        self.assertEqual(self.read(), PPLABEL)
+
+    def test_leftover_temporary_file_is_removed(self):
+        self.write(PPLABEL)
+        self.write("partial", self.path + ".tmp")
+        self.assertFalse(recoverFile(self.path, isKeyValueLine))
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+    def test_json_file(self):
+        path = os.path.join(self.dir, "a.json")
+        self.write('{"a": [1, 2', path)
+        self.assertFalse(isComplete(path))
+        self.assertFalse(recoverFile(path))
+        self.write('{"a": [1, 2]}', path)
+        self.assertTrue(isComplete(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QDialogButtonBox, QWidget
+
+from libs.autoDialog import AutoDialog
+from libs.autoPipeline import AutoLabelPipeline
+
+BOX = [[4.0, 4.0], [60.0, 4.0], [60.0, 30.0], [4.0, 30.0]]
+
+
+class StubOCR(object):
+    """Finds one box per image and reads the gray value of a crop as text."""
+
+    drop_score = 0.5
+
+    def __init__(self):
+        self.detCalls = 0
+        self.recCalls = []
+
+    def ocr(self, img, det=True, rec=True, cls=False):
+        if det:
+            self.detCalls += 1
+            return [[BOX]]
+        crops = img if isinstance(img, list) else [img]
+        self.recCalls.append(len(crops))
+        return [[(str(int(crop.mean())), 0.9) for crop in crops]]
+
+
+def writeImage(path, value, size=64):
+    cv2.imwrite(path, np.full((size, size, 3), value, dtype=np.uint8))
+
+
+class TestAutoLabelPipeline(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(7):
+            path = os.path.join(self.dir, "%d.png" % i)
+            writeImage(path, 10 * i)
+            self.paths.append(path)
+        self.ocr = StubOCR()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_results_follow_input_order(self):
+        pipeline = AutoLabelPipeline(
+            self.ocr, self.paths, batchSize=3, decodeWorkers=4, recBatchNum=2
+        )
+        results = list(pipeline.run())
+        self.assertEqual([path for path, _ in results], self.paths)
+        for i, (_, result) in enumerate(results):
+            self.assertEqual(result, [[BOX, (str(10 * i), 0.9)]])
+        self.assertEqual(self.ocr.detCalls, len(self.paths))
+        # one box per image, recognised in batches of recBatchNum crops
+        self.assertEqual(max(self.ocr.recCalls), 2)
+        self.assertEqual(sum(self.ocr.recCalls), len(self.paths))
+
+    def test_stop_ends_the_run(self):
+        pipeline = AutoLabelPipeline(self.ocr, self.paths, batchSize=2)
+        results = []
+        for path, result in pipeline.run():
+            results.append(path)
+            if len(results) == 3:
+                pipeline.stop()
+        self.assertEqual(results, self.paths[:3])
+        # the batch of the fourth image is never detected
+        self.assertLess(self.ocr.detCalls, len(self.paths))
+
+    def test_unreadable_and_small_images_give_none(self):
+        broken = os.path.join(self.dir, "broken.png")
+        with open(broken, "wb") as f:
+            f.write(b"not an image")
+        small = os.path.join(self.dir, "small.png")
+        writeImage(small, 100, size=32)
+        paths = [broken, self.paths[1], small]
+        results = list(AutoLabelPipeline(self.ocr, paths).run())
+        self.assertEqual([path for path, _ in results], paths)
+        self.assertIsNone(results[0][1])
+        self.assertEqual(results[1][1], [[BOX, ("10", 0.9)]])
+        self.assertIsNone(results[2][1])
+        self.assertEqual(self.ocr.detCalls, 1)
+
+    def test_low_score_is_dropped(self):
+        self.ocr.drop_score = 0.95
+        results = list(AutoLabelPipeline(self.ocr, self.paths[:2]).run())
+        self.assertEqual([result for _, result in results], [[], []])
+
+
+class MainWindowStub(QWidget):
+    recBatchNum = 6
+
+    def __init__(self):
+        super(MainWindowStub, self).__init__()
+        self.saved = []
+
+    def saveAutoResult(self, imgPath, result):
+        self.saved.append((imgPath, result))
+
+
+class TestAutoDialog(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(5):
+            path = os.path.join(self.dir, "%d.png" % i)
+            writeImage(path, 10 * i)
+            self.paths.append(path)
+        # nothing is found in a too small image, it is not saved
+        self.small = os.path.join(self.dir, "small.png")
+        writeImage(self.small, 100, size=16)
+        self.paths.insert(2, self.small)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_result_is_saved_per_image(self):
+        parent = MainWindowStub()
+        dialog = AutoDialog(
+            parent=parent, ocr=StubOCR(), mImgList=self.paths, lenbar=len(self.paths)
+        )
+        okButton = dialog.buttonBox.button(QDialogButtonBox.Ok)
+        dialog.thread_1.start()
+        deadline = time.time() + 10
+        while not okButton.isEnabled() and time.time() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+        dialog.thread_1.quit()
+        dialog.thread_1.wait()
+        self.assertTrue(okButton.isEnabled())
+
+        expected = [path for path in self.paths if path != self.small]
+        self.assertEqual([path for path, _ in parent.saved], expected)
+        for path, result in parent.saved:
+            value = os.path.splitext(os.path.basename(path))[0]
+            self.assertEqual(result, [[BOX, (str(10 * int(value)), 0.9)]])
+        self.assertEqual(dialog.pb.value(), len(self.paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.autoSaver import AutoSaveScheduler
+
+
+class TestAutoSaveScheduler(unittest.TestCase):
+    def setUp(self):
+        self.writes = []
+        self.lock = threading.Lock()
+
+    def write(self, key, value):
+        with self.lock:
+            self.writes.append((key, value))
+
+    def test_saves_of_one_key_are_merged(self):
+        saver = AutoSaveScheduler(delay=10)
+        try:
+            for i in range(5):
+                saver.schedule("label", self.write, "label", i)
+            saver.schedule("state", self.write, "state", 0)
+            self.assertEqual(saver.pending(), 2)
+            self.assertEqual(self.writes, [])
+            saver.flush()
+            self.assertEqual(self.writes, [("label", 4), ("state", 0)])
+            self.assertEqual((saver.written, saver.merged, saver.failed), (2, 4, 0))
+            self.assertEqual(saver.pending(), 0)
+        finally:
+            saver.close()
+
+    def test_writes_run_in_the_order_keys_were_last_scheduled(self):
+        saver = AutoSaveScheduler(delay=10)
+        try:
+            saver.schedule("a", self.write, "a", 1)
+            saver.schedule("b", self.write, "b", 1)
+            saver.schedule("a", self.write, "a", 2)
+            saver.flush()
+            self.assertEqual(self.writes, [("b", 1), ("a", 2)])
+        finally:
+            saver.close()
+
+    def test_write_after_delay(self):
+        saver = AutoSaveScheduler(delay=0.05)
+        try:
+            saver.schedule("a", self.write, "a", 1)
+            deadline = time.time() + 5
+            while saver.pending() and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(self.writes, [("a", 1)])
+        finally:
+            saver.close()
+
+    def test_flush_waits_for_a_running_write(self):
+        started = threading.Event()
+
+        def slowWrite():
+            started.set()
+            time.sleep(0.2)
+            self.write("slow", 1)
+
+        saver = AutoSaveScheduler(delay=0)
+        try:
+            saver.schedule("slow", slowWrite)
+            started.wait(5)
+            saver.flush()
+            self.assertEqual(self.writes, [("slow", 1)])
+        finally:
+            saver.close()
+
+    def test_failed_write(self):
+        def failingWrite():
+            raise OSError("disk full")
+
+        saver = AutoSaveScheduler(delay=10)
+        try:
+            saver.schedule("a", failingWrite)
+            saver.schedule("b", self.write, "b", 1)
+            saver.flush()
+            self.assertEqual(self.writes, [("b", 1)])
+            self.assertEqual(saver.failed, 1)
+        finally:
+            saver.close()
+
+    def test_close_writes_pending_saves(self):
+        saver = AutoSaveScheduler(delay=10)
+        saver.schedule("a", self.write, "a", 1)
+        saver.close()
+        self.assertEqual(self.writes, [("a", 1)])
+        self.assertFalse(saver._thread.is_alive())
+
+    def test_metrics_signal(self):
+        metrics = []
+        saver = AutoSaveScheduler(delay=10)
+        saver.metricsChanged.connect(lambda *m: metrics.append(m))
+        try:
+            saver.schedule("a", self.write, "a", 1)
+            saver.schedule("a", self.write, "a", 2)
+            self.assertEqual(metrics, [(1, 0, 0, 0), (1, 0, 1, 0)])
+        finally:
+            saver.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QPointF
+from PyQt5.QtWidgets import QApplication
+
+import PPOCRLabel
+from libs.shape import Shape
+
+
+def rectShape(x0, y0, x1, y1):
+    shape = Shape(label="a")
+    for x, y in ((x0, y0), (x1, y0), (x1, y1), (x0, y1)):
+        shape.addPoint(QPointF(x, y))
+    shape.close()
+    return shape
+
+
+class TestCanvasShapeIndex(unittest.TestCase):
+    """shapesAt finds shapes whose points the main window replaced."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        # no model is built, the tests do not recognise anything
+        with mock.patch.object(PPOCRLabel, "build_ocr"), mock.patch.object(
+            PPOCRLabel, "build_table_ocr"
+        ):
+            self.win = PPOCRLabel.MainWindow(
+                lang="en",
+                gpu=False,
+                kie_mode=False,
+                default_predefined_class_file=os.path.join(
+                    dir_name, "..", "data", "predefined_classes.txt"
+                ),
+            )
+        self.canvas = self.win.canvas
+        # the right border lies just inside the first cell of the grid
+        self.shape = rectShape(10, 10, 62, 30)
+        self.win.loadShapes([self.shape])
+        # build the index before the points change
+        self.assertEqual(self.canvas.shapesAt(QPointF(20, 20)), [self.shape])
+
+    def tearDown(self):
+        self.win.models.shutdown()
+        self.win.deleteLater()
+        shutil.rmtree(self.dir)
+
+    def test_box_item_changed(self):
+        item = self.win.shapesToItemsbox[self.shape]
+        item.setText(str([(200, 200), (260, 200), (260, 240), (200, 240)]))
+        self.assertEqual(self.canvas.shapesAt(QPointF(20, 20)), [])
+        self.assertEqual(self.canvas.shapesAt(QPointF(230, 220)), [self.shape])
+
+    def test_expand_selected_shape(self):
+        self.win.filePath = os.path.join(self.dir, "a.png")
+        cv2.imwrite(self.win.filePath, np.zeros((100, 100, 3), dtype=np.uint8))
+        self.canvas.selectedShapes = [self.shape]
+        self.win.expandSelectedShape()
+        # the padding moves the right border into the next cell
+        self.assertEqual(max(p.x() for p in self.shape.points), 65)
+        self.assertEqual(self.canvas.shapesAt(QPointF(75, 20)), [self.shape])
+
+
+if __name__ == "__main__":
+    unittest.main()
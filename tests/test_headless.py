@@ -0,0 +1,134 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+import PPOCRLabel
+from PPOCRLabel import (
+    headless_main,
+    parse_shard,
+    read_label_dict,
+    write_file_state,
+    write_label_dict,
+)
+
+BOX = [[4.0, 4.0], [60.0, 4.0], [60.0, 30.0], [4.0, 30.0]]
+
+
+class StubOCR(object):
+    """Finds one box per image and reads the gray value of a crop as text."""
+
+    drop_score = 0.5
+
+    def __init__(self):
+        self.detected = 0
+
+    def ocr(self, img, det=True, rec=True, cls=False):
+        if det:
+            self.detected += 1
+            return [[BOX]]
+        crops = img if isinstance(img, list) else [img]
+        return [[(str(int(crop.mean())), 0.9) for crop in crops]]
+
+
+def label(value):
+    return [{"transcription": str(value), "points": BOX, "difficult": False}]
+
+
+class TestParseShard(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_shard("0/4"), (0, 4))
+        self.assertEqual(parse_shard("3/4"), (3, 4))
+
+    def test_invalid(self):
+        for value in ("4/4", "-1/4", "1", "a/b", "1/0"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+
+class TestHeadless(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.imgDir = os.path.join(self.dir, "imgs")
+        os.mkdir(self.imgDir)
+        for i in range(6):
+            cv2.imwrite(
+                self.path("%d.png" % i), np.full((64, 64, 3), 10 * i, dtype=np.uint8)
+            )
+        self.ocr = StubOCR()
+        patcher = mock.patch.object(PPOCRLabel, "build_ocr", return_value=self.ocr)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.imgDir, name)
+
+    def run_main(self, *args):
+        self.assertEqual(headless_main([self.imgDir, "--gpu", "false"] + list(args)), 0)
+
+    def expected(self, indices):
+        return {"imgs/%d.png" % i: label(10 * i) for i in indices}
+
+    def test_label_directory(self):
+        self.run_main()
+        self.assertEqual(
+            read_label_dict(self.path("Cache.cach")), self.expected(range(6))
+        )
+        self.assertFalse(os.path.exists(self.path("Label.txt")))
+
+    def test_shard_output(self):
+        self.run_main("--shard", "1/3")
+        self.assertEqual(
+            read_label_dict(self.path("Cache.cach.shard-1-of-3")), self.expected([1, 4])
+        )
+        self.assertFalse(os.path.exists(self.path("Cache.cach")))
+
+    def test_merge_shards(self):
+        for shard in ("0/2", "1/2"):
+            self.run_main("--shard", shard, "--label_txt")
+        # shards never write Label.txt, only the merge does
+        self.assertFalse(os.path.exists(self.path("Label.txt")))
+        write_label_dict(self.path("Label.txt"), {"imgs/0.png": label("checked")})
+        write_file_state(self.path("fileState.txt"), {self.path("0.png"): 1})
+
+        self.run_main("--merge", "--label_txt")
+        self.assertEqual(
+            read_label_dict(self.path("Cache.cach")), self.expected(range(6))
+        )
+        labels = self.expected(range(6))
+        labels["imgs/0.png"] = label("checked")
+        self.assertEqual(read_label_dict(self.path("Label.txt")), labels)
+        self.assertEqual([f for f in os.listdir(self.imgDir) if ".shard-" in f], [])
+
+    def test_resume_skips_done_images(self):
+        write_label_dict(self.path("Cache.cach"), self.expected([0, 1]))
+        write_file_state(self.path("fileState.txt"), {self.path("2.png"): 1})
+        self.run_main()
+        self.assertEqual(self.ocr.detected, 3)
+        labels = read_label_dict(self.path("Cache.cach"))
+        self.assertEqual(labels, self.expected([0, 1, 3, 4, 5]))
+
+    def test_resume_shard(self):
+        write_label_dict(self.path("Cache.cach.shard-0-of-2"), self.expected([0]))
+        self.run_main("--shard", "0/2")
+        self.assertEqual(self.ocr.detected, 2)
+        self.assertEqual(
+            read_label_dict(self.path("Cache.cach.shard-0-of-2")),
+            self.expected([0, 2, 4]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
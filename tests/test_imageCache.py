@@ -0,0 +1,105 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.imageCache import ImageCache, decodeImage
+
+IMAGE_BYTES = 10 * 10 * 3
+
+
+class TestImageCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = {}
+        for i, name in enumerate("abc"):
+            path = os.path.join(self.dir, name + ".png")
+            cv2.imwrite(path, np.full((10, 10, 3), 50 * i, dtype=np.uint8))
+            self.paths[name] = path
+        # room for two images
+        self.cache = ImageCache(maxBytes=2 * IMAGE_BYTES + 10, workers=1)
+
+    def tearDown(self):
+        self.cache.shutdown()
+        shutil.rmtree(self.dir)
+
+    def cached(self):
+        return [os.path.basename(key[0])[0] for key in self.cache._entries]
+
+    def test_decode(self):
+        image, buffer = decodeImage(self.paths["b"])
+        self.assertEqual((image.width(), image.height()), (10, 10))
+        self.assertEqual(buffer.nbytes, IMAGE_BYTES)
+        self.assertEqual(image.pixelColor(0, 0).red(), 50)
+
+    def test_invalid_image(self):
+        path = os.path.join(self.dir, "broken.png")
+        with open(path, "wb") as f:
+            f.write(b"not an image")
+        image, buffer = self.cache.load(path)
+        self.assertTrue(image.isNull())
+        self.assertIsNone(buffer)
+        self.assertEqual(self.cached(), [])
+
+    def test_eviction_by_byte_budget(self):
+        for name in "abc":
+            self.cache.load(self.paths[name])
+        self.assertEqual(self.cached(), ["b", "c"])
+        self.assertEqual(self.cache._bytes, 2 * IMAGE_BYTES)
+
+    def test_lru_order(self):
+        self.cache.load(self.paths["a"])
+        self.cache.load(self.paths["b"])
+        first = self.cache.load(self.paths["a"])
+        self.cache.load(self.paths["c"])
+        self.assertEqual(self.cached(), ["a", "c"])
+        # a cache hit returns the same decoded buffer
+        self.assertIs(self.cache.load(self.paths["a"])[1], first[1])
+
+    def test_newest_entry_is_kept_over_budget(self):
+        cache = ImageCache(maxBytes=10, workers=1)
+        try:
+            cache.load(self.paths["a"])
+            cache.load(self.paths["b"])
+            self.assertEqual(len(cache._entries), 1)
+        finally:
+            cache.shutdown()
+
+    def test_prefetch(self):
+        self.cache.prefetch([self.paths["a"], self.paths["b"]])
+        for future in list(self.cache._futures.values()):
+            future.result()
+        self.assertEqual(sorted(self.cached()), ["a", "b"])
+        self.assertEqual(self.cache._futures, {})
+        self.cache.prefetch([self.paths["a"]])
+        self.assertEqual(self.cache._futures, {})
+
+    def test_changed_file_is_decoded_again(self):
+        old = self.cache.load(self.paths["a"])
+        cv2.imwrite(self.paths["a"], np.full((10, 10, 3), 200, dtype=np.uint8))
+        stat = os.stat(self.paths["a"])
+        os.utime(self.paths["a"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        image, buffer = self.cache.load(self.paths["a"])
+        self.assertIsNot(buffer, old[1])
+        self.assertEqual(image.pixelColor(0, 0).red(), 200)
+
+    def test_forget_and_clear(self):
+        self.cache.load(self.paths["a"])
+        self.cache.load(self.paths["b"])
+        self.cache.forget(self.paths["a"])
+        self.assertEqual(self.cached(), ["b"])
+        self.assertEqual(self.cache._bytes, IMAGE_BYTES)
+        self.cache.clear()
+        self.assertEqual(self.cached(), [])
+        self.assertEqual(self.cache._bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
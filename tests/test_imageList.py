@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.imageList import ImageList
+
+
+class TestImageList(unittest.TestCase):
+    def setUp(self):
+        self.images = ImageList(["a.jpg", "b.jpg", "c.jpg"])
+
+    def test_index(self):
+        self.assertEqual(self.images.index("c.jpg"), 2)
+        self.assertIn("b.jpg", self.images)
+        self.assertNotIn("d.jpg", self.images)
+        with self.assertRaises(ValueError):
+            self.images.index("d.jpg")
+
+    def test_index_with_bounds(self):
+        images = ImageList(["a.jpg", "b.jpg", "a.jpg"])
+        self.assertEqual(images.index("a.jpg"), 0)
+        self.assertEqual(images.index("a.jpg", 1), 2)
+
+    def test_unhashable(self):
+        self.assertNotIn(["a.jpg"], self.images)
+        with self.assertRaises(ValueError):
+            self.images.index(["a.jpg"])
+
+    def test_mutations_update_lookups(self):
+        self.assertEqual(self.images.index("c.jpg"), 2)
+        self.images.remove("a.jpg")
+        self.assertEqual(self.images.index("c.jpg"), 1)
+        self.images.insert(0, "z.jpg")
+        self.assertEqual(self.images.index("c.jpg"), 2)
+        self.images[2] = "y.jpg"
+        self.assertNotIn("c.jpg", self.images)
+        self.assertEqual(self.images.index("y.jpg"), 2)
+        del self.images[0]
+        self.assertEqual(self.images.index("b.jpg"), 0)
+        self.images.append("x.jpg")
+        self.images.sort()
+        self.assertEqual(list(self.images), ["b.jpg", "x.jpg", "y.jpg"])
+        self.assertEqual(self.images.index("x.jpg"), 1)
+        self.images.pop()
+        self.assertNotIn("y.jpg", self.images)
+        self.images += ["w.jpg"]
+        self.assertEqual(self.images.index("w.jpg"), 2)
+        self.images.clear()
+        self.assertNotIn("b.jpg", self.images)
+
+    def test_is_a_list(self):
+        self.assertIsInstance(self.images, list)
+        self.assertEqual(self.images, ["a.jpg", "b.jpg", "c.jpg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.imageScanner import forgetImage, scanImages
+
+
+class TestImageScanner(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for name in ("img10.png", "img2.JPG", "img1.png", "notes.txt"):
+            open(os.path.join(self.dir, name), "wb").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def names(self, paths):
+        return [os.path.basename(p) for p in paths]
+
+    def test_scan(self):
+        self.assertEqual(
+            self.names(scanImages(self.dir)), ["img1.png", "img2.JPG", "img10.png"]
+        )
+        self.assertEqual(
+            self.names(scanImages(self.dir, naturalSort=False)),
+            ["img1.png", "img10.png", "img2.JPG"],
+        )
+
+    def test_cached_scan_is_a_copy(self):
+        scanImages(self.dir).clear()
+        self.assertEqual(len(scanImages(self.dir)), 3)
+
+    def test_new_file_is_found(self):
+        scanImages(self.dir)
+        open(os.path.join(self.dir, "img3.png"), "wb").close()
+        stat = os.stat(self.dir)
+        # the folder mtime may not tick within the test, force it forward
+        os.utime(self.dir, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIn("img3.png", self.names(scanImages(self.dir)))
+
+    def test_forget_image(self):
+        scanImages(self.dir)
+        path = os.path.join(self.dir, "img2.JPG")
+        os.remove(path)
+        forgetImage(path)
+        self.assertEqual(self.names(scanImages(self.dir)), ["img1.png", "img10.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
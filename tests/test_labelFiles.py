@@ -0,0 +1,150 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from PPOCRLabel import (
+    iter_label_file,
+    read_label_dict,
+    write_checked_labels,
+    write_file_state,
+    write_image_json,
+    write_label_dict,
+    write_label_txt,
+)
+from libs.labelIndex import LabelIndex
+
+
+def box(text):
+    return {
+        "transcription": text,
+        "points": [[0, 0], [4, 0], [4, 2], [0, 2]],
+        "difficult": False,
+    }
+
+
+class TestLabelFiles(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.imgDir = os.path.join(self.dir, "imgs")
+        os.mkdir(self.imgDir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.imgDir, name)
+
+    def read(self, name):
+        with open(self.path(name), encoding="utf-8") as f:
+            return f.read()
+
+    def test_label_dict_round_trip(self):
+        labels = {"imgs/a.jpg": [box("一 二")], "imgs/b.jpg": []}
+        write_label_dict(self.path("Cache.cach"), labels)
+        self.assertEqual(read_label_dict(self.path("Cache.cach")), labels)
+        self.assertIn("一 二", self.read("Cache.cach"))
+
+    def test_label_dict_backup(self):
+        write_label_dict(self.path("Cache.cach"), {"imgs/a.jpg": [box("old")]})
+        write_label_dict(self.path("Cache.cach"), {"imgs/a.jpg": [box("new")]})
+        self.assertIn("old", self.read("Cache.cach.bak"))
+        write_label_dict(self.path("shard"), {}, backup=False)
+        write_label_dict(self.path("shard"), {}, backup=False)
+        self.assertFalse(os.path.exists(self.path("shard.bak")))
+
+    def test_iter_label_file_skips_invalid_lines(self):
+        with open(self.path("Label.txt"), "w", encoding="utf-8") as f:
+            f.write("imgs/a.jpg\t[]\nno tab\nimgs/b.jpg\t[{\nimgs/c.jpg\t\n")
+        self.assertEqual(
+            list(iter_label_file(self.path("Label.txt"))),
+            [("imgs/a.jpg", []), ("imgs/c.jpg", [])],
+        )
+        self.assertEqual(list(iter_label_file(self.path("missing.txt"))), [])
+
+    def test_write_file_state(self):
+        states = {"/data/imgs/a.jpg": 1, "/data/imgs/b.jpg": 1}
+        write_file_state(self.path("fileState.txt"), states)
+        self.assertEqual(
+            self.read("fileState.txt"), "/data/imgs/a.jpg\t1\n/data/imgs/b.jpg\t1\n"
+        )
+
+    def test_write_checked_labels(self):
+        labels = {"imgs/a.jpg": [box("a")], "imgs/b.jpg": [box("b")], "imgs/c.jpg": []}
+        checked = {"/data/imgs/a.jpg": 1, "/data/imgs/c.jpg": 1}
+        write_checked_labels(self.path("Label.txt"), labels, checked)
+        self.assertEqual(
+            read_label_dict(self.path("Label.txt")), {"imgs/a.jpg": [box("a")]}
+        )
+
+    def test_write_image_json(self):
+        jsonPath = self.path("a.json")
+        write_image_json(jsonPath, "/data/imgs/a.jpg", [{"text": "a"}])
+        write_image_json(jsonPath, "/data/imgs/a2.jpg", [{"text": "b"}])
+        with open(jsonPath, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual(
+            data,
+            {"/data/imgs/a.jpg": [{"text": "a"}], "/data/imgs/a2.jpg": [{"text": "b"}]},
+        )
+        # per image files do not keep a backup
+        self.assertFalse(os.path.exists(jsonPath + ".bak"))
+
+    def test_write_image_json_replaces_invalid_file(self):
+        jsonPath = self.path("a.json")
+        with open(jsonPath, "w", encoding="utf-8") as f:
+            f.write("{broken")
+        write_image_json(jsonPath, "/data/imgs/a.jpg", [])
+        with open(jsonPath, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"/data/imgs/a.jpg": []})
+
+    def test_write_label_txt(self):
+        write_label_txt(self.imgDir, {"imgs/a.jpg": [box("a")], "imgs/b.jpg": []})
+        self.assertEqual(
+            read_label_dict(self.path("Label.txt")), {"imgs/a.jpg": [box("a")]}
+        )
+        self.assertFalse(os.path.exists(self.path("Label.txt.log")))
+
+    def test_write_label_txt_keeps_checked_labels(self):
+        write_checked_labels(
+            self.path("Label.txt"),
+            {"imgs/a.jpg": [box("checked")], "imgs/b.jpg": [box("b")]},
+            ["/data/imgs/a.jpg", "/data/imgs/b.jpg"],
+        )
+        write_file_state(self.path("fileState.txt"), {"/data/imgs/a.jpg": 1})
+        write_label_txt(
+            self.imgDir,
+            {
+                "imgs/a.jpg": [box("auto")],
+                "imgs/b.jpg": [box("b2")],
+                "imgs/c.jpg": [box("c")],
+            },
+        )
+        self.assertEqual(
+            read_label_dict(self.path("Label.txt")),
+            {
+                "imgs/a.jpg": [box("checked")],
+                "imgs/b.jpg": [box("b2")],
+                "imgs/c.jpg": [box("c")],
+            },
+        )
+
+    def test_write_label_txt_keeps_label_blocks(self):
+        index = LabelIndex(self.path("Label.txt"))
+        index.update(self.path("x.jpg"), ["1,2,5,6,x"])
+        write_label_txt(self.imgDir, {"imgs/a.jpg": [box("a")]})
+        self.assertEqual(
+            read_label_dict(self.path("Label.txt")), {"imgs/a.jpg": [box("a")]}
+        )
+        index = LabelIndex(self.path("Label.txt"))
+        self.assertEqual(index.boxes(self.path("x.jpg")), [(1.0, 2.0, 5.0, 6.0, "x")])
+        self.assertNotIn(self.path("a.jpg"), index)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.labelIndex import LabelIndex, parseLabelLine
+
+LABEL_TEXT = (
+    "# /data/a.jpg\n"
+    "1,2,3,4,hello\n"
+    "5,6,7,8,world\n"
+    "\n"
+    "# /data/b.jpg\n"
+    "1.5\t2.5\t3.5\t4.5\ttab separated\n"
+    "\n"
+)
+
+
+class TestParseLabelLine(unittest.TestCase):
+    def test_comma_line(self):
+        self.assertEqual(parseLabelLine("1,2,3,4,hello"), (1.0, 2.0, 3.0, 4.0, "hello"))
+
+    def test_tab_line(self):
+        self.assertEqual(
+            parseLabelLine("1\t2\t3\t4\thello world"),
+            (1.0, 2.0, 3.0, 4.0, "hello world"),
+        )
+
+    def test_malformed_line(self):
+        self.assertIsNone(parseLabelLine("1,2,3"))
+        self.assertIsNone(parseLabelLine("a,b,c,d,hello"))
+
+
+class TestLabelIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.labelPath = os.path.join(self.dir, "Label.txt")
+        with open(self.labelPath, "w", encoding="utf-8") as f:
+            f.write(LABEL_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.labelPath, encoding="utf-8") as f:
+            return f.read()
+
+    def test_load(self):
+        index = LabelIndex(self.labelPath)
+        self.assertIn("/data/a.jpg", index)
+        self.assertIn(" /data/b.jpg ", index)
+        self.assertNotIn("/data/c.jpg", index)
+        self.assertEqual(index.lines("/data/a.jpg"), ["1,2,3,4,hello", "5,6,7,8,world"])
+        self.assertEqual(index.lines("/data/c.jpg"), [])
+        self.assertEqual(
+            index.boxes("/data/b.jpg"), [(1.5, 2.5, 3.5, 4.5, "tab separated")]
+        )
+
+    def test_missing_file(self):
+        index = LabelIndex(os.path.join(self.dir, "missing", "Label.txt"))
+        self.assertEqual(index.blocks, {})
+
+    def test_boxes_skip_invalid_lines(self):
+        with open(self.labelPath, "w", encoding="utf-8") as f:
+            f.write("# /data/a.jpg\n1,2,3,4,ok\nbroken\n")
+        index = LabelIndex(self.labelPath)
+        self.assertEqual(index.boxes("/data/a.jpg"), [(1.0, 2.0, 3.0, 4.0, "ok")])
+
+    def test_belongs_to(self):
+        index = LabelIndex(self.labelPath)
+        self.assertTrue(index.belongsTo(os.path.join(self.dir, "a.jpg")))
+        self.assertFalse(index.belongsTo(os.path.join(self.dir, "sub", "a.jpg")))
+
+    def test_update_writes_label_file(self):
+        index = LabelIndex(self.labelPath)
+        index.update("/data/a.jpg", [" 9,9,9,9,new "])
+        self.assertEqual(index.lines("/data/a.jpg"), ["9,9,9,9,new"])
+        self.assertIn("# /data/a.jpg\n9,9,9,9,new\n", self.read())
+        self.assertIn("tab separated", self.read())
+        self.assertEqual(LabelIndex(self.labelPath).blocks, index.blocks)
+
+    def test_update_without_persist(self):
+        index = LabelIndex(self.labelPath)
+        index.update("/data/c.jpg", ["1,1,2,2,c"], persist=False)
+        self.assertNotIn("/data/c.jpg", self.read())
+        index.persist()
+        self.assertIn("# /data/c.jpg\n1,1,2,2,c\n", self.read())
+
+    def test_remove(self):
+        index = LabelIndex(self.labelPath)
+        index.remove("/data/a.jpg")
+        self.assertNotIn("/data/a.jpg", index)
+        self.assertNotIn("/data/a.jpg", self.read())
+        self.assertIn("/data/b.jpg", LabelIndex(self.labelPath))
+
+    def test_persist_without_updates_does_not_write(self):
+        index = LabelIndex(self.labelPath)
+        mtime = os.stat(self.labelPath).st_mtime_ns
+        index.persist()
+        self.assertEqual(os.stat(self.labelPath).st_mtime_ns, mtime)
+        self.assertEqual(self.read(), LABEL_TEXT)
+
+
+class TestLabelIndexLogMode(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.labelPath = os.path.join(self.dir, "Label.txt")
+        with open(self.labelPath, "w", encoding="utf-8") as f:
+            f.write(LABEL_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self, path):
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_update_appends_to_log(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/a.jpg", ["9,9,9,9,first"])
+        index.update("/data/a.jpg", ["9,9,9,9,second"])
+        self.assertEqual(self.read(self.labelPath), LABEL_TEXT)
+        records = [json.loads(l) for l in self.read(index.logPath).splitlines()]
+        self.assertEqual([r["v"] for r in records], [1, 2])
+        self.assertEqual(records[-1]["lines"], ["9,9,9,9,second"])
+
+    def test_persist_merges_updates_of_one_image(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/a.jpg", ["9,9,9,9,first"], persist=False)
+        index.update("/data/a.jpg", ["9,9,9,9,second"], persist=False)
+        index.update("/data/c.jpg", ["1,1,2,2,c"], persist=False)
+        self.assertFalse(os.path.exists(index.logPath))
+        index.persist()
+        records = [json.loads(l) for l in self.read(index.logPath).splitlines()]
+        self.assertEqual(
+            [(r["path"], r["lines"]) for r in records],
+            [("/data/a.jpg", ["9,9,9,9,second"]), ("/data/c.jpg", ["1,1,2,2,c"])],
+        )
+
+    def test_log_is_replayed_on_load(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/a.jpg", ["9,9,9,9,new"])
+        index.update("/data/c.jpg", ["1,1,2,2,c"])
+        reloaded = LabelIndex(self.labelPath, logMode=True)
+        self.assertEqual(reloaded.blocks, index.blocks)
+        self.assertEqual(reloaded.version, 2)
+
+    def test_removal_is_replayed(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.remove("/data/a.jpg")
+        self.assertNotIn("/data/a.jpg", LabelIndex(self.labelPath, logMode=True))
+        index.close()
+        self.assertNotIn("/data/a.jpg", self.read(self.labelPath))
+
+    def test_truncated_log_record_is_ignored(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/a.jpg", ["9,9,9,9,new"])
+        with open(index.logPath, "a", encoding="utf-8") as f:
+            f.write('{"v": 2, "path": "/data/c.jp')
+        reloaded = LabelIndex(self.labelPath, logMode=True)
+        self.assertEqual(reloaded.lines("/data/a.jpg"), ["9,9,9,9,new"])
+        self.assertNotIn("/data/c.jpg", reloaded)
+
+    def test_close_compacts_log(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/a.jpg", ["9,9,9,9,new"])
+        index.close()
+        self.assertFalse(os.path.exists(index.logPath))
+        self.assertIn("# /data/a.jpg\n9,9,9,9,new\n", self.read(self.labelPath))
+        self.assertEqual(LabelIndex(self.labelPath).blocks, index.blocks)
+
+    def test_record_after_truncated_record_survives_restart(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/a.jpg", ["9,9,9,9,new"])
+        with open(index.logPath, "a", encoding="utf-8") as f:
+            f.write('{"v": 2, "path": "/data/b.jp')
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/c.jpg", ["1,1,2,2,c"])
+        reloaded = LabelIndex(self.labelPath, logMode=True)
+        self.assertEqual(reloaded.lines("/data/c.jpg"), ["1,1,2,2,c"])
+        self.assertEqual(reloaded.lines("/data/a.jpg"), ["9,9,9,9,new"])
+        self.assertEqual(len(self.read(index.logPath).splitlines()), 2)
+
+    def test_record_without_newline_is_kept(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/a.jpg", ["9,9,9,9,new"])
+        with open(index.logPath, "rb+") as f:
+            f.truncate(os.path.getsize(index.logPath) - 1)
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/c.jpg", ["1,1,2,2,c"])
+        reloaded = LabelIndex(self.labelPath, logMode=True)
+        self.assertEqual(reloaded.lines("/data/a.jpg"), ["9,9,9,9,new"])
+        self.assertEqual(reloaded.lines("/data/c.jpg"), ["1,1,2,2,c"])
+
+    def test_compaction_past_size_limit(self):
+        index = LabelIndex(self.labelPath, logMode=True, compactSize=1)
+        index.update("/data/a.jpg", ["9,9,9,9,new"])
+        index._compactThread.join()
+        self.assertFalse(os.path.exists(index.logPath))
+        self.assertIn("9,9,9,9,new", self.read(self.labelPath))
+
+    def test_save_drops_log(self):
+        index = LabelIndex(self.labelPath, logMode=True)
+        index.update("/data/a.jpg", ["9,9,9,9,new"])
+        index.save()
+        self.assertFalse(os.path.exists(index.logPath))
+        self.assertEqual(LabelIndex(self.labelPath, logMode=True).blocks, index.blocks)
+
+
+if __name__ == "__main__":
+    unittest.main()
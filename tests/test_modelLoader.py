@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.modelLoader import ModelLoader
+
+
+class TestModelLoader(unittest.TestCase):
+    def setUp(self):
+        self.loader = ModelLoader()
+        self.release = threading.Event()
+        self.built = []
+
+    def tearDown(self):
+        self.release.set()
+        self.loader.shutdown()
+
+    def factory(self, name, wait=False):
+        if wait:
+            self.release.wait(10)
+        self.built.append(name)
+        return "model " + name
+
+    def test_get_waits_for_the_model(self):
+        self.loader.submit("ocr", self.factory, "ocr", True)
+        self.assertFalse(self.loader.isReady("ocr"))
+        self.release.set()
+        self.assertEqual(self.loader.get("ocr"), "model ocr")
+        self.assertTrue(self.loader.isReady("ocr"))
+
+    def test_models_are_built_in_submit_order(self):
+        self.loader.submit("ocr", self.factory, "ocr", True)
+        self.loader.submit("table", self.factory, "table")
+        self.release.set()
+        self.assertEqual(self.loader.get("table"), "model table")
+        self.assertEqual(self.loader.get("ocr"), "model ocr")
+        self.assertEqual(self.built, ["ocr", "table"])
+
+    def test_build_error_is_raised_by_get(self):
+        def fail():
+            raise RuntimeError("no model files")
+
+        self.loader.submit("ocr", fail)
+        with self.assertRaisesRegex(RuntimeError, "no model files"):
+            self.loader.get("ocr")
+        self.assertTrue(self.loader.isReady("ocr"))
+        # the failed model does not stop the next one
+        self.loader.submit("table", self.factory, "table")
+        self.assertEqual(self.loader.get("table"), "model table")
+
+    def test_resubmit_replaces_a_queued_build(self):
+        self.loader.submit("busy", self.factory, "busy", True)
+        self.loader.submit("ocr", self.factory, "ocr-old")
+        self.loader.submit("ocr", self.factory, "ocr-new")
+        self.release.set()
+        self.assertEqual(self.loader.get("ocr"), "model ocr-new")
+        self.assertEqual(self.built, ["busy", "ocr-new"])
+
+    def test_unknown_model(self):
+        self.assertFalse(self.loader.isReady("ocr"))
+        with self.assertRaises(KeyError):
+            self.loader.get("ocr")
+
+
+if __name__ == "__main__":
+    unittest.main()
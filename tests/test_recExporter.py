@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.recExporter import CROP_DIR_NAME, RecExporter
+
+
+def box(x1, y1, x2, y2, text):
+    return {
+        "transcription": text,
+        "points": [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+        "difficult": False,
+    }
+
+
+class TestRecExporter(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.items = []
+        for name in ("a", "b", "c"):
+            path = os.path.join(self.dir, name + ".png")
+            cv2.imwrite(path, np.full((40, 80, 3), 255, dtype=np.uint8))
+            key = "imgs/" + name + ".png"
+            self.items.append((key, path, [box(5, 5, 60, 30, "text " + name)]))
+        self.exporter = RecExporter(self.dir, workers=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def readRecGt(self):
+        with open(self.exporter.recGtPath, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def test_export(self):
+        self.assertEqual(list(self.exporter.run(self.items)), [1, 2, 3])
+        self.assertEqual(
+            self.readRecGt(),
+            [CROP_DIR_NAME + "/%s_crop_0.jpg\ttext %s" % (n, n) for n in "abc"],
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.exporter.cropDir, "a_crop_0.jpg"))
+        )
+
+    def test_unchanged_images_are_skipped(self):
+        list(self.exporter.run(self.items))
+        list(self.exporter.run(self.items))
+        self.assertEqual(self.exporter.skipped, 3)
+        self.assertEqual(len(self.readRecGt()), 3)
+
+    def test_canceled_export_keeps_rec_gt(self):
+        list(self.exporter.run(self.items[:1]))
+        before = self.readRecGt()
+        export = self.exporter.run(self.items)
+        next(export)
+        export.close()
+        self.assertEqual(self.readRecGt(), before)
+        self.assertFalse(os.path.exists(self.exporter.recGtPath + ".tmp"))
+        # the next export resumes from the manifest
+        list(self.exporter.run(self.items))
+        self.assertEqual(len(self.readRecGt()), 3)
+
+    def test_failed_image(self):
+        items = self.items + [("imgs/d.png", os.path.join(self.dir, "d.png"), [])]
+        list(self.exporter.run(items))
+        self.assertEqual(self.exporter.failed, ["imgs/d.png"])
+        self.assertEqual(len(self.readRecGt()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.spatialIndex import GridIndex
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self._x, self._y = x, y
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+
+class Rect(object):
+    def __init__(self, x0, y0, x1, y1):
+        self.coords = x0, y0, x1, y1
+
+    def left(self):
+        return self.coords[0]
+
+    def top(self):
+        return self.coords[1]
+
+    def right(self):
+        return self.coords[2]
+
+    def bottom(self):
+        return self.coords[3]
+
+
+class Shape(object):
+    def __init__(self, x0, y0, x1, y1):
+        self.points = [Point(x0, y0), Point(x1, y1)]
+
+    def boundingRect(self):
+        return Rect(
+            self.points[0].x(),
+            self.points[0].y(),
+            self.points[1].x(),
+            self.points[1].y(),
+        )
+
+
+class TestGridIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = GridIndex(cellSize=10)
+        self.small = Shape(1, 1, 5, 5)
+        self.wide = Shape(0, 50, 100, 55)
+        self.index.rebuild([self.small, self.wide])
+
+    def test_query(self):
+        self.assertEqual(self.index.query(Point(3, 3)), {id(self.small)})
+        self.assertEqual(self.index.query(Point(95, 52)), {id(self.wide)})
+        self.assertEqual(self.index.query(Point(50, 20)), set())
+
+    def test_query_margin(self):
+        self.assertEqual(self.index.query(Point(3, 45), margin=6), {id(self.wide)})
+
+    def test_remove(self):
+        self.index.remove(self.wide)
+        self.assertNotIn(self.wide, self.index)
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(self.index.query(Point(95, 52)), set())
+        # removing twice is a no-op
+        self.index.remove(self.wide)
+
+    def test_update_after_move(self):
+        self.small.points = [Point(80, 80), Point(85, 85)]
+        self.index.update(self.small)
+        self.assertEqual(self.index.query(Point(3, 3)), set())
+        self.assertEqual(self.index.query(Point(82, 82)), {id(self.small)})
+
+    def test_update_ignores_unindexed_shape(self):
+        other = Shape(20, 20, 25, 25)
+        self.index.update(other)
+        self.assertNotIn(other, self.index)
+
+    def test_shape_without_points(self):
+        empty = Shape(0, 0, 0, 0)
+        empty.points = []
+        self.index.insert(empty)
+        self.assertIn(empty, self.index)
+        self.assertEqual(self.index.query(Point(0, 0)), {id(self.small)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.sqliteStore import CACHE, LABEL, STORE_FILE_NAME, AnnotationStore
+
+
+def box(text, x=0, **extra):
+    result = {
+        "transcription": text,
+        "points": [[x, 0], [x + 10, 0], [x + 10, 5], [x, 5]],
+        "difficult": False,
+    }
+    result.update(extra)
+    return result
+
+
+class TestAnnotationStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = AnnotationStore(os.path.join(self.dir, STORE_FILE_NAME))
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.dir)
+
+    def read(self, name):
+        with open(os.path.join(self.dir, name), encoding="utf-8") as f:
+            return f.read()
+
+    def test_empty(self):
+        self.assertTrue(self.store.isEmpty())
+        self.store.setState("imgs/a.jpg")
+        self.assertFalse(self.store.isEmpty())
+
+    def test_save_and_read_shapes(self):
+        boxes = [box("一", key_cls="name"), box("two", 20)]
+        self.store.saveShapes("imgs/a.jpg", boxes, (LABEL, CACHE))
+        self.assertEqual(self.store.labels(LABEL), {"imgs/a.jpg": boxes})
+        self.assertEqual(self.store.labels(CACHE), {"imgs/a.jpg": boxes})
+
+    def test_save_replaces_shapes_of_one_kind(self):
+        self.store.saveShapes("imgs/a.jpg", [box("old")], (LABEL, CACHE))
+        self.store.saveShapes("imgs/a.jpg", [box("new")])
+        self.assertEqual(self.store.labels(LABEL)["imgs/a.jpg"], [box("new")])
+        self.assertEqual(self.store.labels(CACHE)["imgs/a.jpg"], [box("old")])
+
+    def test_checked_only(self):
+        self.store.saveShapes("imgs/a.jpg", [box("a")])
+        self.store.saveShapes("imgs/b.jpg", [box("b")])
+        self.store.setState("imgs/b.jpg")
+        self.assertEqual(list(self.store.labels(checkedOnly=True)), ["imgs/b.jpg"])
+        self.assertEqual(self.store.states(), {"imgs/b.jpg": 1})
+        self.store.setState("imgs/b.jpg", 0)
+        self.assertEqual(self.store.states(), {})
+
+    def test_remove_image(self):
+        self.store.saveShapes("imgs/a.jpg", [box("a")])
+        self.store.setState("imgs/a.jpg")
+        self.store.removeImage("imgs/a.jpg")
+        self.assertEqual(self.store.labels(), {})
+        self.assertEqual(self.store.states(), {})
+
+    def test_import_and_export(self):
+        labels = {"imgs/a.jpg": [box("a")], "imgs/b.jpg": [box("b")]}
+        cache = {"imgs/c.jpg": [box("c")]}
+        self.store.importDicts(labels, cache, {"imgs/a.jpg": 1})
+
+        self.store.exportLabels(os.path.join(self.dir, "Label.txt"))
+        self.assertEqual(
+            self.read("Label.txt"),
+            "imgs/a.jpg\t"
+            + json.dumps(labels["imgs/a.jpg"], ensure_ascii=False)
+            + "\n",
+        )
+        self.store.exportLabels(
+            os.path.join(self.dir, "Cache.cach"), CACHE, checkedOnly=False
+        )
+        self.assertIn("imgs/c.jpg\t", self.read("Cache.cach"))
+        self.store.exportFileState(os.path.join(self.dir, "fileState.txt"))
+        self.assertEqual(self.read("fileState.txt"), "imgs/a.jpg\t1\n")
+
+    def test_data_survives_reopen(self):
+        self.store.saveShapes("imgs/a.jpg", [box("a")])
+        self.store.setState("imgs/a.jpg")
+        self.store.close()
+        self.store = AnnotationStore(os.path.join(self.dir, STORE_FILE_NAME))
+        self.assertEqual(
+            self.store.labels(checkedOnly=True), {"imgs/a.jpg": [box("a")]}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import openpyxl
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.tableExporter import TableTokenReader
+
+
+def workbook(path, rows, cols, merge=None):
+    excel = openpyxl.Workbook()
+    sheet = excel.active
+    for r in range(1, rows + 1):
+        for c in range(1, cols + 1):
+            sheet.cell(row=r, column=c, value="x")
+    if merge:
+        sheet.merge_cells(merge)
+    excel.save(path)
+
+
+class TestTableTokenReader(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = [os.path.join(self.dir, n + ".xlsx") for n in ("a", "b", "c")]
+        workbook(self.paths[0], 2, 2)
+        workbook(self.paths[1], 2, 3, "A1:B1")
+        workbook(self.paths[2], 1, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_read(self):
+        reader = TableTokenReader(self.dir, workers=1)
+        self.assertEqual(list(reader.run(self.paths)), [1, 2, 3])
+        self.assertEqual(reader.parsed, 3)
+        self.assertEqual(set(reader.tokens), set(self.paths))
+        self.assertIn(' colspan="2"', reader.tokens[self.paths[1]])
+
+    def test_cached_workbooks_count_as_done(self):
+        first = TableTokenReader(self.dir, workers=1)
+        list(first.run(self.paths))
+        # edit one workbook, the other two come from the cache
+        workbook(self.paths[2], 2, 1)
+        stat = os.stat(self.paths[2])
+        os.utime(self.paths[2], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        reader = TableTokenReader(self.dir, workers=1)
+        self.assertEqual(list(reader.run(self.paths)), [2, 3])
+        self.assertEqual(reader.parsed, 1)
+        for path in self.paths[:2]:
+            self.assertEqual(reader.tokens[path], first.tokens[path])
+        self.assertNotEqual(reader.tokens[self.paths[2]], first.tokens[self.paths[2]])
+
+    def test_all_cached(self):
+        list(TableTokenReader(self.dir, workers=1).run(self.paths))
+        reader = TableTokenReader(self.dir, workers=1)
+        self.assertEqual(list(reader.run(self.paths)), [3])
+        self.assertEqual(reader.parsed, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
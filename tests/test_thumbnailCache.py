@@ -0,0 +1,107 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+import cv2
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.thumbnailCache import THUMBNAIL_PACK_NAME, ThumbnailCache
+
+
+def packPaths(dirpath):
+    conn = sqlite3.connect(os.path.join(dirpath, THUMBNAIL_PACK_NAME))
+    try:
+        return {row[0] for row in conn.execute("SELECT path FROM thumbnails")}
+    finally:
+        conn.close()
+
+
+class TestThumbnailCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = []
+        for name in ("a.png", "b.png"):
+            path = os.path.join(self.dir, name)
+            cv2.imwrite(path, np.full((120, 160, 3), 200, dtype=np.uint8))
+            self.paths.append(path)
+        self.cache = ThumbnailCache(size=20)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.dir)
+
+    def wait(self, cache):
+        deadline = time.time() + 10
+        while cache._pending and time.time() < deadline:
+            time.sleep(0.01)
+        cache._executor.submit(lambda: None).result()
+        cache.save()
+
+    def test_thumbnails_are_kept_in_the_pack(self):
+        self.cache.open(self.dir)
+        self.assertEqual(self.cache.request(self.paths), {})
+        self.wait(self.cache)
+        self.assertEqual(packPaths(self.dir), set(self.paths))
+        self.assertEqual(packPaths(self.dir), set(self.paths))
+
+        other = ThumbnailCache(size=20)
+        try:
+            other.open(self.dir)
+            ready = other.request(self.paths)
+            self.assertEqual(set(ready), set(self.paths))
+            self.assertEqual(ready[self.paths[0]].width(), 20)
+            self.assertEqual(other._pending, {})
+        finally:
+            other.close()
+
+    def test_changed_image_is_regenerated(self):
+        self.cache.open(self.dir)
+        self.cache.request(self.paths)
+        self.wait(self.cache)
+        stat = os.stat(self.paths[0])
+        os.utime(self.paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertEqual(set(self.cache.request(self.paths)), {self.paths[1]})
+        self.wait(self.cache)
+
+    def test_forget(self):
+        self.cache.open(self.dir)
+        self.cache.request(self.paths)
+        self.wait(self.cache)
+        self.cache.forget(self.paths[0])
+        self.cache.save()
+        self.assertEqual(packPaths(self.dir), {self.paths[1]})
+
+    def test_open_drops_work_of_the_previous_folder(self):
+        otherDir = tempfile.mkdtemp()
+        try:
+            self.cache.open(self.dir)
+            self.cache.request(self.paths)
+            self.cache.open(otherDir)
+            self.assertEqual(self.cache._pending, {})
+            self.wait(self.cache)
+            self.cache.save()
+            self.assertNotIn(self.paths[0], self.cache._entries)
+            self.assertFalse(
+                os.path.exists(os.path.join(otherDir, THUMBNAIL_PACK_NAME))
+            )
+        finally:
+            shutil.rmtree(otherDir)
+
+    def test_invalid_pack_is_ignored(self):
+        with open(os.path.join(self.dir, THUMBNAIL_PACK_NAME), "wb") as f:
+            f.write(b"not a database")
+        self.cache.open(self.dir)
+        self.assertEqual(self.cache.request(self.paths), {})
+        self.wait(self.cache)
+        self.assertEqual(packPaths(self.dir), set(self.paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QRectF
+from PyQt5.QtGui import QColor, QImage
+from PyQt5.QtWidgets import QApplication
+
+from libs.tiledImage import TiledImage
+
+TILE_BYTES = 16 * 16 * 4
+
+
+class RecordingPainter(object):
+    """Records the tiles paint() draws instead of drawing them."""
+
+    def __init__(self):
+        self.drawn = []
+
+    def drawPixmap(self, target, pixmap, source):
+        self.drawn.append((target, pixmap, source))
+
+    def targets(self):
+        return [(t.x(), t.y(), t.width(), t.height()) for t, _, _ in self.drawn]
+
+
+class TestTiledImage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        # 100 x 40 image, the red channel holds the column, green the row
+        buffer = np.zeros((40, 100, 3), dtype=np.uint8)
+        buffer[:, :, 0] = np.arange(100)[None, :]
+        buffer[:, :, 1] = np.arange(40)[:, None]
+        self.image = TiledImage(buffer, QImage.Format_RGB888, tileSize=16)
+
+    def paint(self, rect, scale):
+        painter = RecordingPainter()
+        self.image.paint(painter, rect, scale)
+        return painter
+
+    def test_size(self):
+        self.assertEqual((self.image.width(), self.image.height()), (100, 40))
+        self.assertEqual(self.image.rect().width(), 100)
+        self.assertFalse(self.image.isNull())
+        self.assertTrue(self.image)
+
+    def test_level_for_scale(self):
+        # 100 / 16 needs three halvings to fit one tile
+        self.assertEqual(self.image.maxLevel, 3)
+        self.assertEqual(self.image.levelFor(2.0), 0)
+        self.assertEqual(self.image.levelFor(1.0), 0)
+        self.assertEqual(self.image.levelFor(0.6), 0)
+        self.assertEqual(self.image.levelFor(0.5), 1)
+        self.assertEqual(self.image.levelFor(0.3), 1)
+        self.assertEqual(self.image.levelFor(0.25), 2)
+        self.assertEqual(self.image.levelFor(0.01), 3)
+        self.assertEqual(self.image.levelFor(0), 3)
+
+    def test_level_sizes(self):
+        sizes = [self.image._level(i).shape[:2] for i in range(4)]
+        self.assertEqual(sizes, [(40, 100), (20, 50), (10, 25), (5, 12)])
+
+    def test_tiles_cover_full_image(self):
+        painter = self.paint(QRectF(0, 0, 100, 40), 1.0)
+        targets = painter.targets()
+        # 7 columns and 3 rows, the last ones cut off by the image border
+        self.assertEqual(len(targets), 21)
+        self.assertIn((0, 0, 16, 16), targets)
+        self.assertIn((96, 32, 4, 8), targets)
+        area = sum(w * h for _, _, w, h in targets)
+        self.assertEqual(area, 100 * 40)
+
+    def test_partial_rect(self):
+        painter = self.paint(QRectF(20, 20, 10, 10), 1.0)
+        self.assertEqual(painter.targets(), [(16, 16, 16, 16)])
+        pixel = QColor(painter.drawn[0][1].toImage().pixel(0, 0))
+        self.assertEqual((pixel.red(), pixel.green()), (16, 16))
+
+    def test_rect_outside_image(self):
+        self.assertEqual(self.paint(QRectF(200, 0, 10, 10), 1.0).drawn, [])
+
+    def test_coarse_level_maps_back_to_image(self):
+        # level 2 is 25 x 10, each level pixel covers 4 x 4 image pixels
+        painter = self.paint(QRectF(0, 0, 100, 40), 0.25)
+        self.assertEqual(painter.targets(), [(0, 0, 64, 40), (64, 0, 36, 40)])
+        self.assertEqual(painter.drawn[1][1].width(), 9)
+
+    def test_tile_cache_is_bounded(self):
+        self.image.maxBytes = 2 * TILE_BYTES
+        self.paint(QRectF(0, 0, 100, 40), 1.0)
+        # the cut off tiles of the last row are smaller than a full tile
+        self.assertLess(len(self.image._tiles), 21)
+        self.assertLessEqual(self.image._bytes, 2 * TILE_BYTES)
+        self.assertIn((0, 6, 2), self.image._tiles)
+
+    def test_clear(self):
+        self.paint(QRectF(0, 0, 100, 40), 0.25)
+        self.image.clear()
+        self.assertEqual(len(self.image._tiles), 0)
+        self.assertEqual(len(self.image._levels), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import unittest
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from PyQt5.QtCore import QPointF
+
+from libs.shape import Shape
+from libs.undoStack import UndoStack, shapeState
+
+
+def box(label, x=0, y=0):
+    shape = Shape(label=label)
+    for px, py in ((x, y), (x + 10, y), (x + 10, y + 5), (x, y + 5)):
+        shape.addPoint(QPointF(px, py))
+    shape.close()
+    return shape
+
+
+def labels(shapes):
+    return [s.label for s in shapes]
+
+
+class TestUndoStack(unittest.TestCase):
+    def setUp(self):
+        self.stack = UndoStack()
+        self.a, self.b = box("a"), box("b", 20)
+        self.stack.record([self.a, self.b])
+
+    def test_baseline_can_not_be_undone(self):
+        self.assertFalse(self.stack.canUndo())
+        self.assertFalse(self.stack.record([self.a, self.b]))
+        self.assertEqual(labels(self.stack.undo()), ["a", "b"])
+
+    def test_relabel_and_move(self):
+        self.a.label = "new"
+        self.assertTrue(self.stack.record([self.a, self.b]))
+        self.b.moveBy(QPointF(3, 4))
+        self.stack.record([self.a, self.b])
+
+        self.stack.undo()
+        self.assertEqual(self.b.points[0], QPointF(20, 0))
+        self.assertEqual(self.a.label, "new")
+        self.stack.undo()
+        self.assertEqual(self.a.label, "a")
+        self.assertFalse(self.stack.canUndo())
+
+        self.stack.redo()
+        self.stack.redo()
+        self.assertEqual(self.a.label, "new")
+        self.assertEqual(self.b.points[0], QPointF(23, 4))
+        self.assertFalse(self.stack.canRedo())
+
+    def test_add_and_delete(self):
+        c = box("c", 40)
+        self.stack.record([self.a, self.b, c])
+        self.stack.record([self.b, c])
+        self.assertEqual(labels(self.stack.undo()), ["a", "b", "c"])
+        self.assertEqual(labels(self.stack.undo()), ["a", "b"])
+        self.assertEqual(labels(self.stack.redo()), ["a", "b", "c"])
+
+    def test_reorder(self):
+        self.stack.record([self.b, self.a])
+        self.assertEqual(labels(self.stack.undo()), ["a", "b"])
+        self.assertEqual(labels(self.stack.redo()), ["b", "a"])
+
+    def test_new_record_clears_redo(self):
+        self.a.label = "x"
+        self.stack.record([self.a, self.b])
+        self.stack.undo()
+        self.assertTrue(self.stack.canRedo())
+        self.a.label = "y"
+        self.stack.record([self.a, self.b])
+        self.assertFalse(self.stack.canRedo())
+
+    def test_undo_restores_full_state(self):
+        before = shapeState(self.a)
+        self.a.difficult = True
+        self.a.locked = True
+        self.a.key_cls = "key"
+        self.stack.record([self.a, self.b])
+        self.stack.undo()
+        self.assertEqual(shapeState(self.a), before)
+
+    def test_memory_budget_drops_oldest_records(self):
+        stack = UndoStack(maxBytes=3000)
+        stack.record([self.a])
+        for i in range(50):
+            self.a.label = str(i)
+            stack.record([self.a])
+        self.assertLessEqual(stack._bytes, 3000)
+        undone = 0
+        while stack.canUndo():
+            stack.undo()
+            undone += 1
+        self.assertLess(undone, 50)
+        self.assertGreater(undone, 0)
+        # the oldest kept record restores its own before state
+        self.assertEqual(self.a.label, str(49 - undone))
+
+    def test_reset(self):
+        self.a.label = "x"
+        self.stack.record([self.a, self.b])
+        self.stack.reset()
+        self.assertFalse(self.stack.canUndo())
+        self.assertFalse(self.stack.record([self.a]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+dir_name = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(dir_name, ".."))
+
+from libs.utils import batch_recognize
+
+
+def crop(width, text):
+    img = np.zeros((10, width, 3), dtype=np.uint8)
+    img[0, 0, 0] = text
+    return img
+
+
+class FakeOCR(object):
+    """Recognises a crop as the character code stored in its first pixel."""
+
+    def __init__(self, batched):
+        self.batched = batched
+        self.calls = 0
+
+    def ocr(self, img, det=True, cls=False):
+        self.calls += 1
+        imgs = img if isinstance(img, list) else [img]
+        if not self.batched:
+            # paddleocr < 2.7 only answers for the first image of a list
+            imgs = imgs[:1]
+        return [[(chr(i[0, 0, 0]), 0.5) for i in imgs]]
+
+
+class TestBatchRecognize(unittest.TestCase):
+    def setUp(self):
+        self.crops = [crop(40, ord("a")), crop(10, ord("b")), crop(20, ord("c"))]
+
+    def test_batched(self):
+        ocr = FakeOCR(batched=True)
+        results = batch_recognize(ocr, self.crops, batch_size=2)
+        self.assertEqual([r[0] for r in results], ["a", "b", "c"])
+        self.assertEqual(ocr.calls, 2)
+
+    def test_falls_back_to_one_call_per_crop(self):
+        ocr = FakeOCR(batched=False)
+        results = batch_recognize(ocr, self.crops, batch_size=2)
+        self.assertEqual([r[0] for r in results], ["a", "b", "c"])
+        # one failed batch, then single calls only
+        self.assertEqual(ocr.calls, 4)
+
+    def test_empty(self):
+        self.assertEqual(batch_recognize(FakeOCR(batched=True), []), [])
+
+
+if __name__ == "__main__":
+    unittest.main()